@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import (Usuario, Cliente, Log, Produto, Estoque, Categoria, MovimentacaoEstoque)
+from .models import (Usuario, Cliente, Log, Produto, Estoque, Categoria, MovimentacaoEstoque,
+                     SaldoEstoque, SaldoSnapshot)
 from django.contrib.auth.admin import UserAdmin
 
 
@@ -33,3 +34,5 @@ admin.site.register(Produto)
 admin.site.register(Estoque)
 admin.site.register(Categoria)
 admin.site.register(MovimentacaoEstoque)
+admin.site.register(SaldoEstoque)
+admin.site.register(SaldoSnapshot)
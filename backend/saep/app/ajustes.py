@@ -0,0 +1,63 @@
+"""Padrões dos ajustes ``SAEP_*`` do app.
+
+O settings.py só precisa declarar as chaves que mudam; ``ler()`` completa o
+resto com os padrões daqui.
+"""
+from django.conf import settings
+
+PADROES = {
+    # cache do usuário autenticado pelo JWT (app/authentication.py)
+    "SAEP_CACHE_USUARIO": {
+        # segundos até uma desativação feita em outro processo valer
+        "TTL": 30,
+        # entradas no cache local de cada processo
+        "MAXIMO": 10000,
+        # alias em CACHES para compartilhar entre processos; None = só local
+        "CACHE": None,
+    },
+    # Server-Timing, histogramas por rota e log de N+1 (app/metricas.py)
+    "SAEP_METRICAS": {
+        "ATIVO": True,
+        # acima disto a requisição vai para o log
+        "MAX_CONSULTAS": 30,
+        # mesmo SQL (com quaisquer parâmetros) mais vezes que isto sugere N+1
+        "MAX_SEMELHANTES": 10,
+        # token fixo aceito em /api/v1/metrics/ além de usuários staff
+        "TOKEN": None,
+    },
+    # feed SSE de movimentações (app/eventos.py)
+    "SAEP_EVENTOS": {
+        # com vários workers use "app.eventos.BrokerBanco" ou um broker externo
+        "BROKER": "app.eventos.BrokerLocal",
+        # eventos pendentes por cliente; um cliente lento demais recupera pelo banco
+        "FILA": 1000,
+        # acima disto a reconexão recebe "reset" e deve recarregar pela API
+        "MAX_REPLAY": 1000,
+        # comentário enviado em conexões ociosas, para proxies não fecharem
+        "PING": 15,
+        "RETRY_MS": 3000,
+        # BrokerBanco: segundos entre as consultas
+        "INTERVALO": 1.0,
+    },
+    # previsão de demanda e ponto de reposição (app/previsao.py)
+    "SAEP_PREVISAO": {
+        "DIAS": 90,
+        # "media" ou "exponencial"
+        "METODO": "exponencial",
+        "ALFA": 0.1,
+        # dias entre o pedido de reposição e a chegada da mercadoria
+        "PRAZO_DIAS": 7,
+        # 1.65 ~ 95% de nível de serviço com demanda normal
+        "Z": 1.65,
+        "LOTE": 5000,
+    },
+    # leituras na réplica (app/roteamento.py)
+    "SAEP_REPLICA": {
+        # segundos no cache de respostas para o que foi lido da réplica
+        "TTL_CACHE": 5,
+    },
+}
+
+
+def ler(nome):
+    return {**PADROES[nome], **getattr(settings, nome, {})}
@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+from hmac import compare_digest
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import BaseAuthentication
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from . import ajustes
+
+Usuario = get_user_model()
+
+# campos carregados do usuário, na ordem do modelo (exigida por from_db); os
+# demais ficam adiados (deferred), então um save() no objeto grava só estes e
+# nunca sobrescreve a senha. Da senha o cache guarda só o hash do claim de
+# revogação (CHECK_REVOKE_TOKEN do simplejwt)
+CAMPOS_USUARIO = tuple(
+    f.attname
+    for f in Usuario._meta.concrete_fields
+    if f.attname in {"id", "email", "nome", "is_active", "is_staff", "is_superuser"}
+)
+
+class CacheLocalTTL:
+    """Dicionário com validade e tamanho máximo (descarta o menos usado)."""
+
+    def __init__(self):
+        self._dados = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave):
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None:
+                return None
+            valor, expira = item
+            if expira < time.monotonic():
+                del self._dados[chave]
+                return None
+            self._dados.move_to_end(chave)
+            return valor
+
+    def set(self, chave, valor, ttl, maximo):
+        with self._lock:
+            self._dados[chave] = (valor, time.monotonic() + ttl)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > maximo:
+                self._dados.popitem(last=False)
+
+    def delete(self, chave):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+
+usuarios_em_cache = CacheLocalTTL()
+
+
+def _chave(user_id):
+    return f"jwt:usuario:{user_id}"
+
+
+def esquecer_usuario(user_id):
+    # o claim do token traz o id como texto
+    user_id = str(user_id)
+    usuarios_em_cache.delete(user_id)
+    alias = ajustes.ler("SAEP_CACHE_USUARIO")["CACHE"]
+    if alias:
+        caches[alias].delete(_chave(user_id))
+
+
+def _consulta_usuario(user_id):
+    return Usuario.objects.filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(
+        *CAMPOS_USUARIO, "password"
+    )
+
+
+def _montar_usuario(valores):
+    usuario = Usuario.from_db(Usuario.objects.db, CAMPOS_USUARIO, valores[:-1])
+    usuario.hash_senha_token = valores[-1]
+    return usuario
+
+
+def carregar_usuario(user_id):
+    """Usuário pelo claim ``USER_ID_CLAIM`` do token (campo ``USER_ID_FIELD``)."""
+    user_id = str(user_id)
+    config = ajustes.ler("SAEP_CACHE_USUARIO")
+    valores = usuarios_em_cache.get(user_id)
+    if valores is None and config["CACHE"]:
+        valores = caches[config["CACHE"]].get(_chave(user_id))
+    if valores is None:
+        linha = _consulta_usuario(user_id).first()
+        if linha is None:
+            return None
+        valores = (*linha[:-1], get_md5_hash_password(linha[-1]))
+        if config["CACHE"]:
+            caches[config["CACHE"]].set(_chave(user_id), valores, config["TTL"])
+    usuarios_em_cache.set(user_id, valores, config["TTL"], config["MAXIMO"])
+    return _montar_usuario(valores)
+
+
+async def acarregar_usuario(user_id):
+    """carregar_usuario() para views async: só sai do loop de eventos na consulta."""
+    user_id = str(user_id)
+    config = ajustes.ler("SAEP_CACHE_USUARIO")
+    valores = usuarios_em_cache.get(user_id)
+    if valores is None and config["CACHE"]:
+        valores = await caches[config["CACHE"]].aget(_chave(user_id))
+    if valores is None:
+        linha = await _consulta_usuario(user_id).afirst()
+        if linha is None:
+            return None
+        valores = (*linha[:-1], get_md5_hash_password(linha[-1]))
+        if config["CACHE"]:
+            await caches[config["CACHE"]].aset(_chave(user_id), valores, config["TTL"])
+    usuarios_em_cache.set(user_id, valores, config["TTL"], config["MAXIMO"])
+    return _montar_usuario(valores)
+
+
+class JWTAuthenticationEmCache(JWTAuthentication):
+    """JWTAuthentication que resolve o usuário por um cache curto em vez de uma
+    consulta por requisição.
+
+    Um token emitido para usuário inativo (claim ``is_active``) é recusado sem
+    consulta; uma desativação posterior vale assim que o save() limpa o cache
+    deste processo, e nos demais em até ``SAEP_CACHE_USUARIO["TTL"]`` segundos
+    (ou na hora, com um cache compartilhado em ``SAEP_CACHE_USUARIO["CACHE"]``).
+    A troca de senha com ``CHECK_REVOKE_TOKEN`` segue a mesma regra.
+    """
+
+    def get_user(self, validated_token):
+        user = carregar_usuario(self.id_do_token(validated_token))
+        return self.conferir_usuario(user, validated_token)
+
+    async def aauthenticate(self, request):
+        """authenticate() das views async (fora do DRF)."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        user = await acarregar_usuario(self.id_do_token(validated_token))
+        return self.conferir_usuario(user, validated_token), validated_token
+
+    def id_do_token(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        if validated_token.get("is_active") is False:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        return user_id
+
+    def conferir_usuario(self, user, validated_token):
+        if user is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if (
+            api_settings.CHECK_REVOKE_TOKEN
+            and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != user.hash_senha_token
+        ):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+        return user
+
+
+class TokenStream(AccessToken):
+    """Token curto que só abre o stream de eventos.
+
+    Vai na URL (o EventSource do navegador não envia cabeçalhos) e por isso
+    acaba nos logs de acesso; com outro ``token_type`` não vale no Authorization
+    do resto da API, e um access token não vale no ``?token=``.
+    """
+
+    token_type = "stream"
+    lifetime = timedelta(seconds=60)
+
+
+class TokenStreamAuthentication(JWTAuthenticationEmCache):
+    """Autenticação pelo ``?token=`` com um ``TokenStream``."""
+
+    def get_header(self, request):
+        token = request.GET.get("token")
+        return token.encode() if token else None
+
+    def get_raw_token(self, header):
+        return header
+
+    def get_validated_token(self, raw_token):
+        try:
+            return TokenStream(raw_token)
+        except TokenError as e:
+            raise InvalidToken(e.args[0]) from e
+
+
+class TokenMetricasAuthentication(BaseAuthentication):
+    """Token fixo de ``SAEP_METRICAS["TOKEN"]`` para o coletor do Prometheus,
+    que não tem como renovar um JWT."""
+
+    def authenticate(self, request):
+        token = ajustes.ler("SAEP_METRICAS")["TOKEN"]
+        if token and compare_digest(
+            request.headers.get("Authorization", "").encode(), f"Bearer {token}".encode()
+        ):
+            return AnonymousUser(), None
+        return None
+
+    def authenticate_header(self, request):
+        return "Bearer"
@@ -0,0 +1,115 @@
+"""Índice invertido de produtos mantido em tabela (ProdutoTermo).
+
+Cada produto vira um conjunto de termos normalizados (minúsculas, sem acentos,
+só ``[0-9a-z]``) com peso por campo. A busca por prefixo de cada termo é uma
+faixa nos índices B-tree da tabela, sem LIKE com curinga à esquerda.
+
+O custo de uma busca não cresce com o catálogo: os candidatos saem de um trecho
+limitado da faixa do termo mais raro e só eles são pontuados. Quando todos os
+termos são muito comuns, a ordenação vale dentro desse trecho e o usuário
+precisa refinar a busca para ver o resto.
+"""
+import re
+import unicodedata
+
+from django.db.models import Exists, OuterRef, Q, Subquery, Sum
+
+PESOS = {"sku": 4, "nome": 2, "descricao": 1}
+TAMANHO_TERMO = 64
+MAXIMO_TERMOS_CONSULTA = 8
+# linhas lidas da faixa do termo mais raro e produtos ordenados por relevância
+LIMITE_VARREDURA = 1000
+MAXIMO_CANDIDATOS = 200
+
+_ALFABETO = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def normalizar(texto):
+    texto = unicodedata.normalize("NFKD", texto or "")
+    return "".join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def termos(texto):
+    return [t[:TAMANHO_TERMO] for t in re.findall(r"[0-9a-z]+", normalizar(texto))]
+
+
+def termos_do_produto(nome, descricao, sku):
+    pesos = {}
+    for campo, texto in (("sku", sku), ("nome", nome), ("descricao", descricao)):
+        for termo in set(termos(texto)):
+            pesos[termo] = pesos.get(termo, 0) + PESOS[campo]
+    return pesos
+
+
+def limite_prefixo(prefixo):
+    """Menor string maior que todas as que começam com ``prefixo`` no alfabeto dos termos."""
+    prefixo = prefixo.rstrip(_ALFABETO[-1])
+    if not prefixo:
+        return None
+    return prefixo[:-1] + _ALFABETO[_ALFABETO.index(prefixo[-1]) + 1]
+
+
+def faixa_prefixo(prefixo, campo="termo"):
+    condicao = Q(**{f"{campo}__gte": prefixo})
+    limite = limite_prefixo(prefixo)
+    if limite is not None:
+        condicao &= Q(**{f"{campo}__lt": limite})
+    return condicao
+
+
+def candidatos(condicoes):
+    """ids dos produtos com todos os termos, em ordem de id.
+
+    Percorre no máximo ``LIMITE_VARREDURA`` linhas da faixa do primeiro termo (o
+    mais raro) e confere os outros pelo índice ``(id_produto, termo, ...)``; só
+    uma busca em que todos os termos são comuns fica limitada a esse trecho.
+    """
+    from .models import Produto, ProdutoTermo
+
+    # listas e não subconsultas: o MySQL não aceita LIMIT dentro de IN (...)
+    ids = list(
+        ProdutoTermo.objects.filter(condicoes[0])
+        .order_by()
+        .values_list("id_produto", flat=True)[:LIMITE_VARREDURA]
+    )
+    if ids and len(condicoes) > 1:
+        # um EXISTS por termo amarrado ao produto: o banco usa o índice por
+        # id_produto em vez de ler a faixa (às vezes enorme) dos outros termos
+        ids = Produto.objects.filter(
+            *[
+                Exists(ProdutoTermo.objects.filter(condicao, id_produto=OuterRef("pk")))
+                for condicao in condicoes[1:]
+            ],
+            pk__in=set(ids),
+        ).values_list("pk", flat=True)
+    return sorted(set(ids))[:MAXIMO_CANDIDATOS]
+
+
+def buscar(queryset, texto):
+    """Filtra ``queryset`` de Produto pelos produtos que têm todos os termos de
+    ``texto`` (por prefixo) e anota ``relevancia`` com a soma dos pesos.
+
+    O trabalho é limitado: os candidatos saem de ``candidatos()`` e a relevância
+    é calculada para no máximo ``MAXIMO_CANDIDATOS`` deles.
+    """
+    from .models import ProdutoTermo
+
+    consulta = list(dict.fromkeys(termos(texto)))[:MAXIMO_TERMOS_CONSULTA]
+    if not consulta:
+        return queryset.none()
+    condicoes = [faixa_prefixo(termo) for termo in consulta]
+    if len(condicoes) > 1:
+        # o mais raro primeiro; acima do limite da varredura tanto faz
+        tamanhos = [
+            ProdutoTermo.objects.filter(condicao).values("id_produto")[:LIMITE_VARREDURA].count()
+            for condicao in condicoes
+        ]
+        condicoes = [condicao for _, condicao in sorted(zip(tamanhos, condicoes), key=lambda par: par[0])]
+    relevancia = (
+        ProdutoTermo.objects.filter(Q(*condicoes, _connector=Q.OR), id_produto=OuterRef("pk"))
+        .order_by()
+        .values("id_produto")
+        .annotate(total=Sum("peso"))
+        .values("total")
+    )
+    return queryset.filter(pk__in=candidatos(condicoes)).annotate(relevancia=Subquery(relevancia))
@@ -0,0 +1,127 @@
+"""Cache das respostas de leitura da API com invalidação por recurso.
+
+Cada recurso (``produtos``, ``movimentacoes``...) tem uma versão guardada no
+cache; as chaves das respostas incluem essa versão, então trocar a versão
+invalida de uma vez todas as respostas do recurso. As versões são trocadas
+pelos sinais de gravação (ver ``DEPENDENCIAS``) depois do commit.
+"""
+import hashlib
+import uuid
+
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import quote_etag
+from django.utils.http import parse_etags
+
+# modelo gravado -> recursos cujas respostas mostram dados dele
+DEPENDENCIAS = {
+    "Categoria": ("categorias",),
+    "Cliente": ("clientes", "movimentacoes"),
+    "Estoque": ("estoques", "movimentacoes", "produtos"),
+    "Log": ("logs",),
+    "Produto": ("produtos", "movimentacoes", "estoques"),
+    "MovimentacaoEstoque": ("movimentacoes", "produtos", "estoques"),
+    "PrevisaoReposicao": ("produtos",),
+}
+
+
+def _chave_versao(recurso):
+    return f"api:versao:{recurso}"
+
+
+def versao(recurso):
+    chave = _chave_versao(recurso)
+    atual = cache.get(chave)
+    if atual is None:
+        # versão nova (e não um contador) para que uma versão despejada do cache
+        # nunca volte a apontar para respostas antigas
+        atual = uuid.uuid4().hex
+        cache.add(chave, atual, timeout=None)
+        atual = cache.get(chave, atual)
+    return atual
+
+
+def invalidar(*recursos):
+    def trocar_versoes():
+        cache.set_many({_chave_versao(r): uuid.uuid4().hex for r in recursos}, timeout=None)
+
+    # troca já e de novo no commit: uma leitura concorrente feita antes do commit
+    # pode ter guardado a resposta antiga com a versão intermediária
+    trocar_versoes()
+    transaction.on_commit(trocar_versoes)
+
+
+def invalidar_modelo(modelo):
+    recursos = DEPENDENCIAS.get(modelo.__name__)
+    if recursos:
+        invalidar(*recursos)
+
+
+class _RespostaEmCache(Exception):
+    def __init__(self, resposta):
+        self.resposta = resposta
+
+
+class CacheRespostaMixin:
+    """Guarda as respostas 200 das ações de leitura de uma ViewSet.
+
+    A consulta ao cache acontece depois da autenticação e das permissões. As
+    respostas levam ``ETag``; um ``If-None-Match`` igual devolve 304 sem montar
+    o corpo.
+    """
+
+    recurso_cache = None
+    acoes_em_cache = ("list", "retrieve")
+
+    def chave_cache(self, request):
+        consulta = "&".join(sorted(request.GET.urlencode().split("&")))
+        bruto = f"{request.path}?{consulta}|{request.accepted_media_type}"
+        return (
+            f"api:resposta:{self.recurso_cache}:{versao(self.recurso_cache)}:"
+            f"{hashlib.md5(bruto.encode()).hexdigest()}"
+        )
+
+    def tempo_cache(self):
+        return DEFAULT_TIMEOUT
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        self._chave_cache = None
+        if request.method != "GET" or self.action not in self.acoes_em_cache:
+            return
+        chave = self.chave_cache(request)
+        entrada = cache.get(chave)
+        if entrada is None:
+            self._chave_cache = chave
+        else:
+            raise _RespostaEmCache(self.resposta_em_cache(request, entrada))
+
+    def resposta_em_cache(self, request, entrada):
+        if entrada["etag"] in parse_etags(request.headers.get("If-None-Match", "")):
+            resposta = HttpResponseNotModified()
+        else:
+            resposta = HttpResponse(entrada["conteudo"], content_type=entrada["content_type"])
+        resposta["ETag"] = entrada["etag"]
+        return resposta
+
+    def handle_exception(self, exc):
+        if isinstance(exc, _RespostaEmCache):
+            return exc.resposta
+        return super().handle_exception(exc)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if getattr(self, "_chave_cache", None) and response.status_code == 200:
+            response.render()
+            entrada = {
+                "conteudo": response.content,
+                "content_type": response["Content-Type"],
+                "etag": quote_etag(hashlib.md5(response.content).hexdigest()),
+            }
+            cache.set(self._chave_cache, entrada, self.tempo_cache())
+            response["ETag"] = entrada["etag"]
+            if entrada["etag"] in parse_etags(request.headers.get("If-None-Match", "")):
+                response = self.resposta_em_cache(request, entrada)
+        return response
@@ -0,0 +1,233 @@
+"""Feed de movimentações em tempo real (Server-Sent Events).
+
+Cada movimentação gravada é publicada depois do commit, já com o estoque do
+produto, para os clientes conectados em ``/api/v1/movimentacoes/stream/``. O id
+do evento é o id da movimentação: um cliente que reconecta com
+``Last-Event-ID`` recebe do banco o que perdeu (os eventos recuperados trazem o
+estoque atual do produto, não o daquele momento).
+
+O navegador autentica com ``?token=``, que fica nos logs de acesso: o token
+aceito ali é um ``TokenStream`` de um minuto, pedido em
+``POST /api/v1/movimentacoes/stream/token/`` antes de cada conexão, e não o
+access token. O stream precisa do servidor ASGI (``saep.asgi``); num worker
+WSGI a view responde 501.
+
+O broker é escolhido em ``SAEP_EVENTOS["BROKER"]`` e precisa de:
+
+- ``ativo()``: se vale a pena montar os eventos ao gravar;
+- ``publicar(eventos)``: chamado na thread que gravou, depois do commit, com a
+  lista de eventos ou ``None`` ("há movimentações novas, consulte o banco");
+- ``assinar(maximo)``: context manager async que devolve uma ``Assinatura``.
+
+``BrokerLocal`` distribui só dentro do processo. Com vários workers use
+``BrokerBanco`` (cada processo consulta as movimentações novas enquanto tiver
+assinantes) ou um broker externo que repasse os eventos a ``entregar()``.
+"""
+import asyncio
+import json
+import logging
+import threading
+from contextlib import asynccontextmanager
+from functools import lru_cache
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F, Max
+from django.utils.module_loading import import_string
+
+from . import ajustes
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def _broker(caminho):
+    return import_string(caminho)()
+
+
+def broker():
+    return _broker(ajustes.ler("SAEP_EVENTOS")["BROKER"])
+
+
+def consulta_eventos():
+    """Movimentações no formato do evento, com o estoque atual do produto."""
+    from .models import MovimentacaoEstoque, estoque_do_produto
+
+    return (
+        MovimentacaoEstoque.objects.annotate(
+            estoque_atual=estoque_do_produto("id_produto"),
+            estoque_minimo=F("id_produto__estoque_minimo"),
+        )
+        .order_by("id")
+        .values(
+            "id",
+            "id_produto",
+            "id_estoque",
+            "id_cliente",
+            "tipo",
+            "quantidade",
+            "movimentedAt",
+            "estoque_atual",
+            "estoque_minimo",
+        )
+    )
+
+
+def publicar_movimentacoes(ids):
+    """Publica movimentações recém-gravadas; use em ``transaction.on_commit``."""
+    atual = broker()
+    if not ids or not atual.ativo():
+        return
+    if None in ids:
+        # bulk_create sem ids (MySQL): os assinantes buscam no banco
+        atual.publicar(None)
+        return
+    atual.publicar(list(consulta_eventos().filter(pk__in=ids)))
+
+
+def formatar(evento):
+    evento = dict(evento, estoque_abaixo_minimo=evento["estoque_atual"] < evento["estoque_minimo"])
+    dados = json.dumps(evento, cls=DjangoJSONEncoder)
+    return f"id: {evento['id']}\nevent: movimentacao\ndata: {dados}\n\n"
+
+
+class Assinatura:
+    def __init__(self, maximo):
+        self.loop = asyncio.get_running_loop()
+        self.fila = asyncio.Queue(maxsize=maximo)
+        self.perdeu = False
+
+    def entregar(self, eventos):
+        # sempre no loop da assinatura (call_soon_threadsafe)
+        try:
+            self.fila.put_nowait(eventos)
+        except asyncio.QueueFull:
+            self.perdeu = True
+
+
+class BrokerLocal:
+    def __init__(self):
+        self._assinaturas = set()
+        self._lock = threading.Lock()
+
+    def ativo(self):
+        return bool(self._assinaturas)
+
+    def publicar(self, eventos):
+        self.entregar(eventos)
+
+    def entregar(self, eventos):
+        with self._lock:
+            assinaturas = list(self._assinaturas)
+        for assinatura in assinaturas:
+            try:
+                assinatura.loop.call_soon_threadsafe(assinatura.entregar, eventos)
+            except RuntimeError:
+                # loop já encerrado
+                self._remover(assinatura)
+
+    @asynccontextmanager
+    async def assinar(self, maximo):
+        assinatura = Assinatura(maximo)
+        with self._lock:
+            self._assinaturas.add(assinatura)
+        try:
+            yield assinatura
+        finally:
+            self._remover(assinatura)
+
+    def _remover(self, assinatura):
+        with self._lock:
+            self._assinaturas.discard(assinatura)
+
+
+class BrokerBanco(BrokerLocal):
+    """Sem broker externo e com vários workers: enquanto houver assinantes, cada
+    processo consulta as movimentações novas a cada ``INTERVALO`` segundos (uma
+    consulta por processo, não por cliente)."""
+
+    def __init__(self):
+        super().__init__()
+        self._tarefas = {}
+
+    def ativo(self):
+        return False
+
+    def publicar(self, eventos):
+        pass
+
+    @asynccontextmanager
+    async def assinar(self, maximo):
+        loop = asyncio.get_running_loop()
+        tarefa, pronto = self._tarefas.get(loop, (None, None))
+        if tarefa is None or tarefa.done():
+            pronto = asyncio.Event()
+            tarefa = loop.create_task(self._consultar(loop, pronto))
+            self._tarefas[loop] = (tarefa, pronto)
+        async with super().assinar(maximo) as assinatura:
+            # o assinante só consulta o banco depois que a consulta periódica
+            # fixou o ponto de partida: nada fica entre as duas
+            await pronto.wait()
+            yield assinatura
+
+    async def _consultar(self, loop, pronto):
+        config = ajustes.ler("SAEP_EVENTOS")
+        try:
+            ultimo = await ultimo_id()
+        finally:
+            pronto.set()
+        while any(a.loop is loop for a in list(self._assinaturas)):
+            await asyncio.sleep(config["INTERVALO"])
+            try:
+                eventos = [e async for e in consulta_eventos().filter(id__gt=ultimo)[: config["FILA"]]]
+            except Exception:
+                logger.exception("Falha ao consultar movimentações novas")
+                continue
+            if eventos:
+                ultimo = eventos[-1]["id"]
+                self.entregar(eventos)
+        self._tarefas.pop(loop, None)
+
+
+async def ultimo_id():
+    from .models import MovimentacaoEstoque
+
+    return (await MovimentacaoEstoque.objects.aaggregate(ultimo=Max("id")))["ultimo"] or 0
+
+
+async def recuperar(desde, maximo):
+    """Eventos perdidos depois de ``desde``: (texto SSE, último id enviado)."""
+    eventos = [e async for e in consulta_eventos().filter(id__gt=desde)[: maximo + 1]]
+    if len(eventos) > maximo:
+        yield "event: reset\ndata: {}\n\n", await ultimo_id()
+        return
+    for evento in eventos:
+        yield formatar(evento), evento["id"]
+
+
+async def fluxo(desde=None):
+    """Gerador do corpo da resposta SSE; ``desde`` é o Last-Event-ID."""
+    config = ajustes.ler("SAEP_EVENTOS")
+    # o ponto de partida é lido antes de assinar e o banco é relido depois: o que
+    # for gravado no meio chega pela releitura ou pela fila (repetidos são ignorados)
+    ultimo = await ultimo_id() if desde is None else desde
+    async with broker().assinar(config["FILA"]) as assinatura:
+        yield f"retry: {config['RETRY_MS']}\n\n"
+        async for texto, ultimo in recuperar(ultimo, config["MAX_REPLAY"]):
+            yield texto
+        while True:
+            try:
+                eventos = await asyncio.wait_for(assinatura.fila.get(), config["PING"])
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if eventos is None or assinatura.perdeu:
+                assinatura.perdeu = False
+                while not assinatura.fila.empty():
+                    assinatura.fila.get_nowait()
+                async for texto, ultimo in recuperar(ultimo, config["MAX_REPLAY"]):
+                    yield texto
+                continue
+            for evento in eventos:
+                if evento["id"] > ultimo:
+                    ultimo = evento["id"]
+                    yield formatar(evento)
@@ -0,0 +1,331 @@
+import json
+import statistics
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries, transaction
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from app.models import Categoria, Cliente, Estoque, Log, MovimentacaoEstoque
+from app.urls import router
+
+ESCALA_PADRAO = {
+    "produtos": 2000,
+    "movimentacoes": 20000,
+    "clientes": 200,
+    "seed": 1,
+    "repeticoes": 20,
+}
+LOGIN = {"email": "admin1@mail.com", "password": "admin123"}
+
+
+@contextmanager
+def banco_de_benchmark(banco_atual=False):
+    """Banco de teste descartável ou, com ``banco_atual``, uma transação desfeita
+    no final. DEBUG fica desligado como em produção: sem log de SQL pesando nas
+    medições."""
+    with override_settings(DEBUG=False, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        if banco_atual:
+            with transaction.atomic():
+                yield
+                transaction.set_rollback(True)
+        else:
+            nome_banco = connection.settings_dict["NAME"]
+            connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                yield
+            finally:
+                connection.creation.destroy_test_db(nome_banco, verbosity=0)
+
+
+def popular(escala):
+    call_command(
+        "seed",
+        produtos=escala["produtos"],
+        movimentacoes=escala["movimentacoes"],
+        clientes=escala["clientes"],
+        seed=escala["seed"],
+        stdout=StringIO(),
+    )
+    # snapshots mensais para o ?as_of= não cair só no histórico
+    mes = timezone.localdate().replace(day=1)
+    meses = []
+    for _ in range(3):
+        meses.append(mes)
+        mes = (mes - timedelta(days=1)).replace(day=1)
+    for mes in reversed(meses):
+        call_command("gerar_snapshots", periodo="mensal", data=mes.isoformat(), stdout=StringIO())
+    call_command("calcular_reposicao", stdout=StringIO())
+
+
+class Command(BaseCommand):
+    help = (
+        "Popula um banco de teste com a carga do seed, chama cada rota da API (e o login) "
+        "pelo cliente de teste do Django e compara p50/p95, número de consultas e pico de "
+        "memória com a linha de base gravada em benchmark_api.json. Em SQLite o banco de "
+        "teste fica em memória."
+    )
+
+    def add_arguments(self, parser):
+        for nome in ESCALA_PADRAO:
+            parser.add_argument(
+                f"--{nome}",
+                type=int,
+                help=f"Padrão: o da linha de base, ou {ESCALA_PADRAO[nome]}.",
+            )
+        parser.add_argument(
+            "--orcamento",
+            default=str(Path(settings.BASE_DIR) / "benchmark_api.json"),
+            help="Arquivo com a linha de base.",
+        )
+        parser.add_argument(
+            "--atualizar",
+            action="store_true",
+            help="Grava as medições como nova linha de base em vez de comparar.",
+        )
+        parser.add_argument(
+            "--tolerancia",
+            type=float,
+            default=2.0,
+            help="Multiplicador aceito sobre latência e memória da linha de base.",
+        )
+        parser.add_argument("--folga-ms", type=float, default=5.0)
+        parser.add_argument("--folga-kb", type=int, default=256)
+        parser.add_argument(
+            "--banco-atual",
+            action="store_true",
+            help="Usa o banco configurado dentro de uma transação desfeita no final.",
+        )
+
+    def handle(self, *args, **options):
+        caminho = Path(options["orcamento"])
+        linha_base = json.loads(caminho.read_text()) if caminho.exists() else None
+        if linha_base is None and not options["atualizar"]:
+            raise CommandError(f"{caminho} não existe; rode com --atualizar para criá-lo.")
+
+        escala = dict(ESCALA_PADRAO, **(linha_base or {}).get("escala", {}))
+        escala.update({nome: options[nome] for nome in ESCALA_PADRAO if options[nome] is not None})
+        if linha_base and escala != linha_base.get("escala") and not options["atualizar"]:
+            self.stdout.write(self.style.WARNING("Escala diferente da linha de base."))
+
+        with banco_de_benchmark(options["banco_atual"]):
+            medicoes = self.executar(escala)
+
+        if options["atualizar"]:
+            self.relatorio(medicoes, {})
+            caminho.write_text(
+                json.dumps({"escala": escala, "endpoints": medicoes}, indent=2, sort_keys=True) + "\n"
+            )
+            self.stdout.write(self.style.SUCCESS(f"Linha de base gravada em {caminho}."))
+            return
+
+        orcamentos = linha_base.get("endpoints", {})
+        problemas = {
+            nome: self.comparar(medicao, orcamentos.get(nome), options)
+            for nome, medicao in medicoes.items()
+        }
+        self.relatorio(medicoes, problemas)
+        regressoes = [nome for nome, lista in problemas.items() if lista]
+        if regressoes:
+            raise CommandError(
+                f"{len(regressoes)} endpoint(s) acima do orçamento: {', '.join(regressoes)}."
+            )
+        self.stdout.write(self.style.SUCCESS("Todos os endpoints dentro do orçamento."))
+
+    def executar(self, escala):
+        popular(escala)
+        cliente = Client()
+        resposta = cliente.post(reverse("login_view"), LOGIN, content_type="application/json")
+        if resposta.status_code != 200:
+            raise CommandError(f"Login do benchmark falhou: {resposta.status_code}.")
+        cliente = Client(headers={"authorization": f"Bearer {resposta.json()['access']}"})
+
+        cenarios = self.cenarios()
+        faltando = {url.name for url in router.urls} - {c["rota"] for c in cenarios}
+        if faltando:
+            raise CommandError(f"Rotas sem cenário de benchmark: {', '.join(sorted(faltando))}.")
+
+        medicoes = {}
+        for cenario in cenarios:
+            medicoes[cenario["nome"]] = self.medir(cliente, cenario, escala["repeticoes"])
+        return medicoes
+
+    def cenarios(self):
+        # o produto mais movimentado é o pior caso para saldos e estoque aninhado
+        produto = (
+            MovimentacaoEstoque.objects.values("id_produto")
+            .annotate(total=Count("id"))
+            .order_by("-total", "id_produto")
+            .values_list("id_produto", flat=True)
+            .first()
+        )
+        estoque = Estoque.objects.order_by("id").values_list("id", flat=True).first()
+        cliente = Cliente.objects.order_by("id").values_list("id", flat=True).first()
+        categoria = Categoria.objects.order_by("id").values_list("id", flat=True).first()
+        log = Log.objects.order_by("id").values_list("id", flat=True).first()
+        movimentacao = MovimentacaoEstoque.objects.order_by("id").values_list("id", flat=True).first()
+        mes_passado = (timezone.localdate() - timedelta(days=30)).isoformat()
+        entrada = {"id_produto": produto, "id_estoque": estoque, "quantidade": 1, "tipo": "E"}
+        return [
+            {"nome": "login", "rota": "login_view", "metodo": "post", "dados": LOGIN},
+            {"nome": "api-root", "rota": "api-root"},
+            {"nome": "clientes-list", "rota": "clientes-list"},
+            {"nome": "clientes-detail", "rota": "clientes-detail", "args": [cliente]},
+            {"nome": "logs-list", "rota": "logs-list"},
+            {"nome": "logs-detail", "rota": "logs-detail", "args": [log]},
+            {
+                "nome": "logs-ativar-desativar",
+                "rota": "logs-ativar-desativar",
+                "args": [log],
+                "metodo": "put",
+                "dados": {"is_activate": True},
+            },
+            {"nome": "produtos-list", "rota": "produtos-list"},
+            {"nome": "produtos-list-search", "rota": "produtos-list", "params": {"search": "produto 1"}},
+            {"nome": "produtos-list-as-of", "rota": "produtos-list", "params": {"as_of": mes_passado}},
+            {"nome": "produtos-detail", "rota": "produtos-detail", "args": [produto]},
+            {
+                "nome": "produtos-detail-patch",
+                "rota": "produtos-detail",
+                "args": [produto],
+                "metodo": "patch",
+                "dados": {"estoque_minimo": 10},
+            },
+            {"nome": "produtos-abaixo-minimo", "rota": "produtos-abaixo-minimo"},
+            {"nome": "produtos-saldos", "rota": "produtos-saldos", "args": [produto]},
+            {"nome": "produtos-reposicao", "rota": "produtos-reposicao"},
+            {"nome": "produtos-reposicao-abaixo", "rota": "produtos-reposicao", "params": {"abaixo": "true"}},
+            {"nome": "estoques-list", "rota": "estoques-list"},
+            {"nome": "estoques-detail", "rota": "estoques-detail", "args": [estoque]},
+            {"nome": "estoques-saldos", "rota": "estoques-saldos", "args": [estoque]},
+            {"nome": "categorias-list", "rota": "categorias-list"},
+            {"nome": "categorias-detail", "rota": "categorias-detail", "args": [categoria]},
+            {"nome": "movimentacoes-list", "rota": "movimentacoes-list"},
+            {
+                "nome": "movimentacoes-list-expand",
+                "rota": "movimentacoes-list",
+                "params": {"expand": "produto,estoque,cliente"},
+            },
+            {"nome": "movimentacoes-detail", "rota": "movimentacoes-detail", "args": [movimentacao]},
+            {
+                "nome": "movimentacoes-create",
+                "rota": "movimentacoes-list",
+                "metodo": "post",
+                "dados": entrada,
+                "status": 201,
+            },
+            {
+                "nome": "movimentacoes-bulk",
+                "rota": "movimentacoes-bulk",
+                "metodo": "post",
+                "dados": [entrada] * 100,
+                "status": 201,
+            },
+            {
+                "nome": "relatorios-movimentacoes",
+                "rota": "relatorios-movimentacoes-list",
+                "params": {"periodo": "semana"},
+            },
+            {
+                "nome": "relatorios-movimentacoes-produto",
+                "rota": "relatorios-movimentacoes-list",
+                "params": {"agrupar": "produto,estoque", "periodo": "mes"},
+            },
+            {"nome": "painel-estoque-produto", "rota": "painel-estoque-produto", "args": [produto]},
+            {"nome": "painel-abaixo-minimo", "rota": "painel-abaixo-minimo"},
+            {"nome": "painel-movimentacoes", "rota": "painel-movimentacoes"},
+            {
+                "nome": "movimentacoes-export",
+                "rota": "movimentacoes-export",
+                "params": {"format": "csv", "from": mes_passado},
+            },
+        ]
+
+    def requisitar(self, cliente, cenario):
+        url = reverse(cenario["rota"], args=cenario.get("args", ()))
+        metodo = cenario.get("metodo", "get")
+        if metodo == "get":
+            resposta = cliente.get(url, cenario.get("params", {}))
+        else:
+            resposta = getattr(cliente, metodo)(
+                url, json.dumps(cenario["dados"]), content_type="application/json"
+            )
+        if resposta.streaming:
+            b"".join(resposta.streaming_content)
+        if resposta.status_code != cenario.get("status", 200):
+            raise CommandError(
+                f"{cenario['nome']}: status {resposta.status_code} inesperado."
+            )
+
+    def medir(self, cliente, cenario, repeticoes):
+        # sempre sem o cache de respostas: mede o trabalho do endpoint, não o acerto no cache
+        cache.clear()
+        reset_queries()
+        with CaptureQueriesContext(connection) as consultas:
+            self.requisitar(cliente, cenario)
+        total_consultas = len(consultas)
+
+        rastreando = tracemalloc.is_tracing()
+        if not rastreando:
+            tracemalloc.start()
+        cache.clear()
+        tracemalloc.reset_peak()
+        antes = tracemalloc.get_traced_memory()[0]
+        self.requisitar(cliente, cenario)
+        pico = tracemalloc.get_traced_memory()[1] - antes
+        if not rastreando:
+            tracemalloc.stop()
+
+        tempos = []
+        for _ in range(repeticoes):
+            cache.clear()
+            inicio = time.perf_counter()
+            self.requisitar(cliente, cenario)
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        tempos.sort()
+        return {
+            "consultas": total_consultas,
+            "memoria_kb": round(pico / 1024),
+            "p50_ms": round(statistics.median(tempos), 2),
+            "p95_ms": round(tempos[int(len(tempos) * 0.95) - 1], 2),
+        }
+
+    def comparar(self, medicao, orcamento, options):
+        if orcamento is None:
+            return ["sem orçamento na linha de base"]
+        problemas = []
+        # consultas são determinísticas: qualquer aumento é regressão (ex.: N+1)
+        if medicao["consultas"] > orcamento["consultas"]:
+            problemas.append(f"consultas {medicao['consultas']} > {orcamento['consultas']}")
+        for campo in ("p50_ms", "p95_ms"):
+            limite = orcamento[campo] * options["tolerancia"] + options["folga_ms"]
+            if medicao[campo] > limite:
+                problemas.append(f"{campo} {medicao[campo]:.1f} > {limite:.1f}")
+        limite = orcamento["memoria_kb"] * options["tolerancia"] + options["folga_kb"]
+        if medicao["memoria_kb"] > limite:
+            problemas.append(f"memoria_kb {medicao['memoria_kb']} > {limite:.0f}")
+        return problemas
+
+    def relatorio(self, medicoes, problemas):
+        self.stdout.write(f"{'endpoint':<28} {'p50':>9} {'p95':>9} {'sql':>4} {'memória':>9}")
+        for nome, medicao in medicoes.items():
+            linha = (
+                f"{nome:<28} {medicao['p50_ms']:>7.1f}ms {medicao['p95_ms']:>7.1f}ms "
+                f"{medicao['consultas']:>4} {medicao['memoria_kb']:>7}KB"
+            )
+            if problemas.get(nome):
+                self.stdout.write(self.style.ERROR(f"{linha}  {'; '.join(problemas[nome])}"))
+            else:
+                self.stdout.write(linha)
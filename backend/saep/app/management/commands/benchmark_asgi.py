@@ -0,0 +1,163 @@
+import asyncio
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.models import MovimentacaoEstoque, Usuario
+
+from .benchmark_api import LOGIN, banco_de_benchmark, popular
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga em processo das leituras quentes: views DRF sob WSGI (pool de "
+        "threads), as mesmas views sob ASGI e as views async do painel sob ASGI. "
+        "Mostra requisições/s por processo e a latência."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--produtos", type=int, default=2000)
+        parser.add_argument("--movimentacoes", type=int, default=20000)
+        parser.add_argument("--clientes", type=int, default=200)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--requisicoes", type=int, default=3000)
+        parser.add_argument("--concorrencia", type=int, default=32, help="Requisições simultâneas.")
+        parser.add_argument("--threads", type=int, default=8, help="Threads do worker WSGI.")
+
+    def handle(self, *args, **options):
+        escala = {nome: options[nome] for nome in ("produtos", "movimentacoes", "clientes", "seed")}
+        # sem o cache de respostas, que só as ViewSets usam
+        cache_desligado = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+        with banco_de_benchmark(), override_settings(CACHES=cache_desligado):
+            popular(escala)
+            token = str(AccessToken.for_user(Usuario.objects.get(email=LOGIN["email"])))
+            produto = (
+                MovimentacaoEstoque.objects.values("id_produto")
+                .annotate(total=Count("id"))
+                .order_by("-total", "id_produto")
+                .values_list("id_produto", flat=True)
+                .first()
+            )
+            drf = [
+                f"/api/v1/produtos/{produto}/saldos/",
+                "/api/v1/produtos/abaixo-minimo/",
+                "/api/v1/movimentacoes/",
+            ]
+            painel = [
+                f"/api/v1/painel/produtos/{produto}/estoque/",
+                "/api/v1/painel/produtos/abaixo-minimo/",
+                "/api/v1/painel/movimentacoes/",
+            ]
+            modos = [
+                ("wsgi + DRF", lambda: self.wsgi(drf, token, options)),
+                ("asgi + DRF", lambda: asyncio.run(self.asgi(drf, token, options))),
+                ("asgi + async", lambda: asyncio.run(self.asgi(painel, token, options))),
+            ]
+            self.stdout.write(f"{'modo':<14} {'req/s':>8} {'p50':>9} {'p95':>9}")
+            for nome, executar in modos:
+                inicio = time.perf_counter()
+                tempos = sorted(executar())
+                vazao = len(tempos) / (time.perf_counter() - inicio)
+                self.stdout.write(
+                    f"{nome:<14} {vazao:>8.0f} {statistics.median(tempos):>7.1f}ms "
+                    f"{tempos[int(len(tempos) * 0.95) - 1]:>7.1f}ms"
+                )
+
+    def wsgi(self, caminhos, token, options):
+        aplicacao = WSGIHandler()
+
+        def requisitar(indice):
+            caminho, _, consulta = caminhos[indice % len(caminhos)].partition("?")
+            environ = {
+                "REQUEST_METHOD": "GET",
+                "SCRIPT_NAME": "",
+                "PATH_INFO": caminho,
+                "QUERY_STRING": consulta,
+                "SERVER_NAME": "testserver",
+                "SERVER_PORT": "80",
+                "SERVER_PROTOCOL": "HTTP/1.1",
+                "HTTP_HOST": "testserver",
+                "HTTP_AUTHORIZATION": f"Bearer {token}",
+                "wsgi.input": BytesIO(),
+                "wsgi.errors": sys.stderr,
+                "wsgi.url_scheme": "http",
+                "wsgi.multithread": True,
+                "wsgi.multiprocess": False,
+            }
+            estado = []
+            inicio = time.perf_counter()
+            resposta = aplicacao(environ, lambda status, headers: estado.append(status))
+            try:
+                b"".join(resposta)
+            finally:
+                resposta.close()
+            self.conferir(caminho, int(estado[0].split()[0]))
+            return (time.perf_counter() - inicio) * 1000
+
+        with ThreadPoolExecutor(max_workers=options["threads"]) as pool:
+            return list(pool.map(requisitar, range(options["requisicoes"])))
+
+    async def asgi(self, caminhos, token, options):
+        aplicacao = ASGIHandler()
+        restantes = iter(range(options["requisicoes"]))
+        tempos = []
+
+        async def requisitar(indice):
+            caminho, _, consulta = caminhos[indice % len(caminhos)].partition("?")
+            scope = {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "path": caminho,
+                "raw_path": caminho.encode(),
+                "query_string": consulta.encode(),
+                "root_path": "",
+                "headers": [
+                    (b"host", b"testserver"),
+                    (b"authorization", f"Bearer {token}".encode()),
+                ],
+                "client": ("127.0.0.1", 50000),
+                "server": ("testserver", 80),
+            }
+            enviado = False
+
+            async def receive():
+                nonlocal enviado
+                if not enviado:
+                    enviado = True
+                    return {"type": "http.request", "body": b"", "more_body": False}
+                # o cliente nunca desconecta; o Django cancela esta espera no fim
+                await asyncio.Future()
+
+            estado = []
+
+            async def send(mensagem):
+                if mensagem["type"] == "http.response.start":
+                    estado.append(mensagem["status"])
+
+            inicio = time.perf_counter()
+            await aplicacao(scope, receive, send)
+            self.conferir(caminho, estado[0])
+            tempos.append((time.perf_counter() - inicio) * 1000)
+
+        async def cliente():
+            for indice in restantes:
+                await requisitar(indice)
+
+        await asyncio.gather(*(cliente() for _ in range(options["concorrencia"])))
+        return tempos
+
+    def conferir(self, caminho, status):
+        if status != 200:
+            raise CommandError(f"{caminho}: status {status} inesperado.")
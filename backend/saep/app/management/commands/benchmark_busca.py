@@ -0,0 +1,93 @@
+import itertools
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app import busca
+from app.models import Produto, ProdutoTermo, Usuario
+
+SILABAS = "ba be bi bo bu ca ce ci co cu da de di do du fa fe fi fo fu la le li lo lu ma me mi mo mu na ne ni no nu pa pe pi po pu ra re ri ro ru sa se si so su ta te ti to tu va ve vi vo vu xa xe xi".split()
+
+
+def vocabulario(aleatorio, tamanho):
+    palavras = set()
+    while len(palavras) < tamanho:
+        palavras.add("".join(aleatorio.choices(SILABAS, k=aleatorio.randint(2, 4))))
+    return sorted(palavras)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latência da busca de produtos sobre dados sintéticos criados dentro "
+        "de uma transação que é desfeita no final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--produtos", type=int, default=1000000)
+        parser.add_argument("--consultas", type=int, default=200)
+        parser.add_argument("--vocabulario", type=int, default=20000)
+        parser.add_argument("--seed", type=int, default=42)
+        parser.add_argument("--p95-maximo", type=float, default=20.0, help="Limite em ms.")
+
+    def handle(self, *args, **options):
+        aleatorio = random.Random(options["seed"])
+        palavras = vocabulario(aleatorio, options["vocabulario"])
+        # popularidade das palavras com cauda longa (Zipf s=1), como pesos acumulados
+        pesos = list(itertools.accumulate(1 / (i + 1) for i in range(len(palavras))))
+        with transaction.atomic():
+            usuario = Usuario.objects.create_user(f"benchmark-busca-{options['seed']}@example.com")
+            inicio = time.perf_counter()
+            nomes = self.popular(usuario, options["produtos"], aleatorio, palavras, pesos)
+            self.stdout.write(
+                f"{options['produtos']} produto(s) indexado(s) em {time.perf_counter() - inicio:.1f}s"
+            )
+
+            tempos = []
+            for _ in range(options["consultas"]):
+                # consultas parecidas com as de um usuário: termos do nome de um produto,
+                # às vezes só o início da palavra
+                nome = aleatorio.choice(nomes).split()
+                texto = " ".join(aleatorio.sample(nome, aleatorio.randint(1, 2)))
+                if aleatorio.random() < 0.3:
+                    texto = texto[: aleatorio.randint(4, 6)]
+                inicio = time.perf_counter()
+                list(
+                    busca.buscar(Produto.objects.all(), texto)
+                    .order_by("-relevancia", "id")
+                    .values_list("id", flat=True)[:50]
+                )
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            transaction.set_rollback(True)
+
+        tempos.sort()
+        p50 = statistics.median(tempos)
+        p95 = tempos[int(len(tempos) * 0.95) - 1]
+        mensagem = f"busca: p50={p50:.1f}ms p95={p95:.1f}ms ({len(tempos)} consultas)"
+        if p95 > options["p95_maximo"]:
+            raise CommandError(f"{mensagem}: acima de {options['p95_maximo']:.1f}ms.")
+        self.stdout.write(self.style.SUCCESS(mensagem))
+
+    def popular(self, usuario, quantidade, aleatorio, palavras, pesos, lote=5000):
+        nomes = []
+        for base in range(0, quantidade, lote):
+            produtos = Produto.objects.bulk_create(
+                [
+                    Produto(
+                        nome=" ".join(aleatorio.choices(palavras, cum_weights=pesos, k=3)),
+                        descricao=" ".join(aleatorio.choices(palavras, cum_weights=pesos, k=12)),
+                        sku=f"BENCH-{i:08d}",
+                        id_usuario=usuario,
+                    )
+                    for i in range(base, min(base + lote, quantidade))
+                ]
+            )
+            nomes.extend(aleatorio.sample([p.nome for p in produtos], min(20, len(produtos))))
+            if produtos[0].pk is None:
+                produtos = Produto.objects.filter(
+                    sku__gte=f"BENCH-{base:08d}", sku__lt=f"BENCH-{base + lote:08d}"
+                )
+            ProdutoTermo.indexar(produtos)
+        return nomes
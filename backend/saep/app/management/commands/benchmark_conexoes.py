@@ -0,0 +1,100 @@
+import statistics
+import sys
+import time
+from io import BytesIO
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from app.models import Usuario
+
+MODOS = (
+    ("por requisição", {"CONN_MAX_AGE": 0, "CONN_HEALTH_CHECKS": False}),
+    ("persistente", {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": False}),
+    ("persistente + check", {"CONN_MAX_AGE": 600, "CONN_HEALTH_CHECKS": True}),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latência de uma rota pequena sob WSGI abrindo uma conexão por "
+        "requisição e reaproveitando a conexão (com e sem health check). Usa o banco "
+        "configurado e só faz leituras; rode depois do seed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requisicoes", type=int, default=500)
+        parser.add_argument("--caminho", default="/api/v1/categorias/")
+
+    def handle(self, *args, **options):
+        usuario = Usuario.objects.filter(is_active=True).order_by("pk").first()
+        if usuario is None:
+            raise CommandError("Nenhum usuário ativo no banco; rode o seed antes.")
+        token = str(AccessToken.for_user(usuario))
+        conexao = connections["default"]
+        original = {chave: conexao.settings_dict[chave] for chave in MODOS[0][1]}
+        self.stdout.write(
+            f"{conexao.vendor}, configurado: {getattr(settings, 'SAEP_DB_CONEXOES', '-')} "
+            f"(CONN_MAX_AGE={original['CONN_MAX_AGE']}, "
+            f"CONN_HEALTH_CHECKS={original['CONN_HEALTH_CHECKS']})"
+        )
+        self.stdout.write(f"{'modo':<22} {'p50':>8} {'p95':>8} {'economia/req':>13}")
+
+        # sem o cache de respostas, senão a rota não chega ao banco
+        cache_desligado = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+        base = None
+        try:
+            with override_settings(CACHES=cache_desligado, ALLOWED_HOSTS=["testserver"]):
+                aplicacao = WSGIHandler()
+                for nome, valores in MODOS:
+                    conexao.settings_dict.update(valores)
+                    conexao.close()
+                    # aquece: a primeira requisição monta URLs, serializers etc.
+                    self.requisitar(aplicacao, options["caminho"], token)
+                    tempos = sorted(
+                        self.requisitar(aplicacao, options["caminho"], token)
+                        for _ in range(options["requisicoes"])
+                    )
+                    media = statistics.fmean(tempos)
+                    base = media if base is None else base
+                    self.stdout.write(
+                        f"{nome:<22} {statistics.median(tempos):>6.2f}ms "
+                        f"{tempos[int(len(tempos) * 0.95) - 1]:>6.2f}ms "
+                        f"{base - media:>11.2f}ms"
+                    )
+        finally:
+            conexao.settings_dict.update(original)
+            conexao.close()
+
+    def requisitar(self, aplicacao, caminho, token):
+        environ = {
+            "REQUEST_METHOD": "GET",
+            "SCRIPT_NAME": "",
+            "PATH_INFO": caminho,
+            "QUERY_STRING": "",
+            "SERVER_NAME": "testserver",
+            "SERVER_PORT": "80",
+            "SERVER_PROTOCOL": "HTTP/1.1",
+            "HTTP_HOST": "testserver",
+            "HTTP_AUTHORIZATION": f"Bearer {token}",
+            "wsgi.input": BytesIO(),
+            "wsgi.errors": sys.stderr,
+            "wsgi.url_scheme": "http",
+            "wsgi.multithread": False,
+            "wsgi.multiprocess": True,
+        }
+        estado = []
+        inicio = time.perf_counter()
+        resposta = aplicacao(environ, lambda status, headers: estado.append(status))
+        try:
+            b"".join(resposta)
+        finally:
+            # dispara request_finished, que fecha a conexão vencida
+            resposta.close()
+        if not estado[0].startswith("200"):
+            raise CommandError(f"{caminho}: status {estado[0]} inesperado.")
+        return (time.perf_counter() - inicio) * 1000
@@ -0,0 +1,68 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# roda num processo novo: importa o módulo de entrada como o gunicorn/uvicorn faria
+FILHO = """
+import json, sys
+from saep import {tipo} as entrada
+print(json.dumps(entrada.numeros))
+"""
+
+PERFIS = ("desenvolvimento", "producao")
+
+
+class Command(BaseCommand):
+    help = (
+        "Sobe o worker (import de saep.wsgi ou saep.asgi) em processos novos com cada "
+        "perfil de settings e compara o tempo de subida, a memória residente e os "
+        "módulos carregados."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--repeticoes", type=int, default=5)
+        parser.add_argument("--tipo", choices=("wsgi", "asgi"), default="wsgi")
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'perfil':<16} {'processo':>9} {'importacao':>11} {'pronto':>8} "
+            f"{'RSS':>8} {'modulos':>8}"
+        )
+        for perfil in PERFIS:
+            medidas = [self.subir(perfil, options["tipo"]) for _ in range(options["repeticoes"])]
+
+            def mediana(chave):
+                return statistics.median(medida[chave] for medida in medidas)
+
+            rss = "-" if medidas[0]["rss_mb"] is None else f"{mediana('rss_mb'):.1f}MB"
+            self.stdout.write(
+                f"{perfil:<16} {mediana('processo_ms'):>7.0f}ms {mediana('importacao_ms'):>9.0f}ms "
+                f"{mediana('pronto_ms'):>6.0f}ms {rss:>8} {mediana('modulos'):>8.0f}"
+            )
+
+    def subir(self, perfil, tipo):
+        ambiente = {**os.environ, "SAEP_PERFIL": perfil}
+        if perfil == "producao":
+            # só para subir: o worker não atende nada aqui
+            ambiente.setdefault("SAEP_SECRET_KEY", "benchmark-inicializacao")
+            ambiente.setdefault("SAEP_ALLOWED_HOSTS", "localhost")
+        inicio = time.perf_counter()
+        resultado = subprocess.run(
+            [sys.executable, "-c", FILHO.format(tipo=tipo)],
+            cwd=settings.BASE_DIR,
+            env=ambiente,
+            capture_output=True,
+            text=True,
+        )
+        processo = (time.perf_counter() - inicio) * 1000
+        if resultado.returncode != 0:
+            raise CommandError(f"Perfil {perfil} não subiu:\n{resultado.stderr}")
+        medida = json.loads(resultado.stdout.strip().splitlines()[-1])
+        medida["processo_ms"] = processo
+        return medida
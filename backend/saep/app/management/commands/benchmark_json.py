@@ -0,0 +1,96 @@
+import gzip
+import io
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from app.models import MovimentacaoEstoque
+from app.parsers import JSONRapidoParser
+from app.renderers import JSONRapidoRenderer, orjson
+from app.serializers import MovimentacaoEstoqueSerializer
+
+from .benchmark_api import banco_de_benchmark, popular
+
+
+class Command(BaseCommand):
+    help = (
+        "Serializa uma lista de movimentações com produto, estoque e cliente aninhados "
+        "(MovimentacaoEstoqueSerializer) e compara o JSONRenderer/JSONParser do DRF com "
+        "os de app/renderers.py e app/parsers.py: tempo e tamanho do corpo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--linhas", type=int, default=10000)
+        parser.add_argument("--repeticoes", type=int, default=10)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument(
+            "--banco-atual",
+            action="store_true",
+            help="Usa as movimentações do banco configurado (dentro de uma transação desfeita).",
+        )
+
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(self.style.WARNING("orjson não instalado: os dois lados usam o json da stdlib."))
+        with banco_de_benchmark(options["banco_atual"]):
+            if not options["banco_atual"]:
+                popular({
+                    "produtos": 2000,
+                    "movimentacoes": options["linhas"],
+                    "clientes": 200,
+                    "seed": options["seed"],
+                })
+            request = Request(RequestFactory().get("/api/v1/movimentacoes/"))
+            movimentacoes = list(
+                MovimentacaoEstoque.objects.select_related("id_produto", "id_estoque", "id_cliente")
+                .com_estoque_produto()
+                .order_by("-pk")[: options["linhas"]]
+            )
+            inicio = time.perf_counter()
+            dados = MovimentacaoEstoqueSerializer(
+                movimentacoes, many=True, context={"request": request}
+            ).data
+            serializacao = (time.perf_counter() - inicio) * 1000
+
+        self.stdout.write(
+            f"{len(dados)} movimentações; serializer (igual nos dois): {serializacao:.0f}ms"
+        )
+        self.stdout.write(
+            f"{'':<10} {'render':>9} {'parse':>9} {'bytes':>10} {'gzip':>9}"
+        )
+        resultados = {}
+        for nome, renderer, parser in (
+            ("stdlib", JSONRenderer(), JSONParser()),
+            ("orjson", JSONRapidoRenderer(), JSONRapidoParser()),
+        ):
+            corpo = renderer.render(dados)
+            render = self.mediana(lambda: renderer.render(dados), options["repeticoes"])
+            parse = self.mediana(
+                lambda: parser.parse(io.BytesIO(corpo), "application/json", {}),
+                options["repeticoes"],
+            )
+            resultados[nome] = (render, corpo)
+            self.stdout.write(
+                f"{nome:<10} {render:>7.1f}ms {parse:>7.1f}ms {len(corpo):>10} "
+                f"{len(gzip.compress(corpo)):>9}"
+            )
+
+        (render_padrao, corpo_padrao), (render_rapido, corpo_rapido) = resultados.values()
+        mensagem = f"render {render_padrao / render_rapido:.1f}x mais rápido"
+        if corpo_padrao == corpo_rapido:
+            self.stdout.write(self.style.SUCCESS(f"{mensagem}; corpos idênticos."))
+        else:
+            self.stdout.write(self.style.WARNING(f"{mensagem}; os corpos diferem."))
+
+    def mediana(self, funcao, repeticoes):
+        tempos = []
+        for _ in range(repeticoes):
+            inicio = time.perf_counter()
+            funcao()
+            tempos.append((time.perf_counter() - inicio) * 1000)
+        return statistics.median(tempos)
@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from app import previsao
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula a demanda diária e o ponto de reposição sugerido de todos os produtos "
+        "a partir das saídas recentes e grava o resultado (GET /api/v1/produtos/reposicao/)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dias", type=int, help="Dias de histórico considerados.")
+        parser.add_argument("--metodo", choices=previsao.METODOS)
+        parser.add_argument("--alfa", type=float, help="Peso do dia mais recente na suavização.")
+        parser.add_argument("--prazo", type=int, help="Prazo de entrega em dias.")
+        parser.add_argument("--z", type=float, help="Fator do estoque de segurança.")
+        parser.add_argument("--lote", type=int, help="Produtos por lote.")
+        parser.add_argument("--hoje", help="Data de referência (AAAA-MM-DD); padrão: hoje.")
+        parser.add_argument(
+            "--atualizar-minimo",
+            action="store_true",
+            help="Grava o ponto sugerido em estoque_minimo.",
+        )
+
+    def handle(self, *args, **options):
+        hoje = None
+        if options["hoje"]:
+            hoje = parse_date(options["hoje"])
+            if hoje is None:
+                raise CommandError("--hoje deve ser uma data AAAA-MM-DD.")
+        valores = {
+            "DIAS": options["dias"],
+            "METODO": options["metodo"],
+            "ALFA": options["alfa"],
+            "PRAZO_DIAS": options["prazo"],
+            "Z": options["z"],
+            "LOTE": options["lote"],
+        }
+        inicio = time.perf_counter()
+        try:
+            total = previsao.recalcular(hoje, options["atualizar_minimo"], **valores)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        calculo = "NumPy" if previsao.np is not None else "Python puro"
+        self.stdout.write(self.style.SUCCESS(
+            f"{total} produto(s) em {time.perf_counter() - inicio:.2f}s ({calculo})."
+        ))
@@ -0,0 +1,77 @@
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from app.models import MovimentacaoEstoque, SaldoSnapshot, saldo_movimentado
+
+
+class Command(BaseCommand):
+    help = (
+        "Grava o saldo de cada (produto, estoque) no início do dia ou do mês, "
+        "a partir do snapshot anterior e das movimentações desde então."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--periodo",
+            choices=["diario", "mensal"],
+            default="diario",
+            help="Corte no início do dia (padrão) ou do mês.",
+        )
+        parser.add_argument(
+            "--data",
+            help="Dia de referência (AAAA-MM-DD); padrão: hoje.",
+        )
+
+    def handle(self, *args, **options):
+        dia = timezone.localdate()
+        if options["data"]:
+            dia = parse_date(options["data"])
+            if dia is None:
+                raise CommandError("Use --data no formato AAAA-MM-DD.")
+        if options["periodo"] == "mensal":
+            dia = dia.replace(day=1)
+        momento = timezone.make_aware(datetime.combine(dia, time.min))
+
+        with transaction.atomic():
+            SaldoSnapshot.objects.filter(momento=momento).delete()
+            anterior = SaldoSnapshot.objects.filter(momento__lt=momento).aggregate(
+                ultimo=Max("momento")
+            )["ultimo"]
+
+            saldos = {}
+            movimentacoes = MovimentacaoEstoque.objects.filter(movimentedAt__lt=momento)
+            if anterior is not None:
+                for produto, estoque, quantidade in SaldoSnapshot.objects.filter(
+                    momento=anterior
+                ).values_list("id_produto", "id_estoque", "quantidade"):
+                    saldos[(produto, estoque)] = quantidade
+                movimentacoes = movimentacoes.filter(movimentedAt__gte=anterior)
+            for linha in (
+                movimentacoes.order_by()
+                .values("id_produto", "id_estoque")
+                .annotate(total=saldo_movimentado())
+            ):
+                chave = (linha["id_produto"], linha["id_estoque"])
+                saldos[chave] = saldos.get(chave, 0) + linha["total"]
+
+            criados = SaldoSnapshot.objects.bulk_create(
+                [
+                    SaldoSnapshot(
+                        id_produto_id=produto,
+                        id_estoque_id=estoque,
+                        momento=momento,
+                        quantidade=quantidade,
+                    )
+                    for (produto, estoque), quantidade in saldos.items()
+                    if quantidade
+                ],
+                batch_size=1000,
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f"{len(criados)} saldo(s) gravado(s) em {momento.isoformat()}.")
+        )
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app.models import Produto, ProdutoTermo
+
+
+class Command(BaseCommand):
+    help = "Reconstrói o índice de busca de produtos (necessário após cargas com bulk_create)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lote", type=int, default=2000, help="Produtos por transação.")
+
+    def handle(self, *args, **options):
+        ultimo = 0
+        total = 0
+        while True:
+            produtos = list(
+                Produto.objects.filter(pk__gt=ultimo)
+                .order_by("pk")
+                .only("nome", "descricao", "sku")[: options["lote"]]
+            )
+            if not produtos:
+                break
+            ProdutoTermo.indexar(produtos)
+            ultimo = produtos[-1].pk
+            total += len(produtos)
+        self.stdout.write(self.style.SUCCESS(f"{total} produto(s) indexado(s)."))
@@ -0,0 +1,77 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app import cache_api
+from app.models import RESUMOS
+
+
+def linhas_do_historico(resumo):
+    return {
+        (*(linha[campo] for campo in resumo.dimensoes), linha["dia"], linha["tipo"]): (
+            linha["soma"],
+            linha["total"],
+        )
+        for linha in resumo.do_historico()
+    }
+
+
+def linhas_atuais(resumo):
+    campos = (*resumo.dimensoes, "dia", "tipo")
+    return {
+        linha[:-2]: linha[-2:]
+        for linha in resumo.objects.values_list(*campos, "quantidade", "ocorrencias")
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstrói os resumos diários das movimentações (relatórios) a partir do "
+        "histórico e confere o resultado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Apenas compara os resumos com o histórico, sem reconstruir.",
+        )
+
+    def handle(self, *args, **options):
+        divergencias = 0
+        for resumo in RESUMOS:
+            nome = resumo._meta.verbose_name_plural
+            if not options["verificar"]:
+                with transaction.atomic():
+                    resumo.objects.all().delete()
+                    resumo.objects.bulk_create(
+                        (
+                            resumo(
+                                **{f"{campo}_id": linha[campo] for campo in resumo.dimensoes},
+                                dia=linha["dia"],
+                                tipo=linha["tipo"],
+                                quantidade=linha["soma"],
+                                ocorrencias=linha["total"],
+                            )
+                            for linha in resumo.do_historico().iterator()
+                        ),
+                        batch_size=1000,
+                    )
+                    # os relatórios ficam no cache do recurso movimentacoes
+                    cache_api.invalidar("movimentacoes")
+                self.stdout.write(f"{nome} reconstruídos a partir das movimentações.")
+
+            esperado = linhas_do_historico(resumo)
+            atual = linhas_atuais(resumo)
+            diferentes = sorted(
+                chave for chave in esperado.keys() | atual.keys()
+                if atual.get(chave) != esperado.get(chave)
+            )
+            for chave in diferentes:
+                self.stdout.write(
+                    f"{nome} {chave}: resumo={atual.get(chave)} histórico={esperado.get(chave)}"
+                )
+            divergencias += len(diferentes)
+            self.stdout.write(f"{len(esperado)} linha(s) de {nome} conferida(s).")
+        if divergencias:
+            raise CommandError(f"{divergencias} linha(s) de resumo divergente(s) do histórico.")
+        self.stdout.write(self.style.SUCCESS("Resumos diários conferidos."))
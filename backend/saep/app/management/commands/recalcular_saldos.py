@@ -0,0 +1,61 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from app import cache_api
+from app.models import MovimentacaoEstoque, Produto, SaldoEstoque, saldo_movimentado
+
+
+def saldos_do_historico():
+    return {
+        (linha["id_produto"], linha["id_estoque"]): linha["total"]
+        for linha in MovimentacaoEstoque.objects.order_by()
+        .values("id_produto", "id_estoque")
+        .annotate(total=saldo_movimentado())
+    }
+
+
+class Command(BaseCommand):
+    help = "Reconstrói a tabela de saldos a partir das movimentações e confere o resultado."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--verificar",
+            action="store_true",
+            help="Apenas compara os saldos com o histórico, sem reconstruir.",
+        )
+
+    def handle(self, *args, **options):
+        if not options["verificar"]:
+            with transaction.atomic():
+                SaldoEstoque.objects.all().delete()
+                SaldoEstoque.objects.bulk_create(
+                    [
+                        SaldoEstoque(id_produto_id=produto, id_estoque_id=estoque, quantidade=total)
+                        for (produto, estoque), total in saldos_do_historico().items()
+                    ],
+                    batch_size=1000,
+                )
+                Produto.objects.marcar_abaixo_minimo()
+                # delete()/bulk_create em massa não passam pelos sinais do cache
+                cache_api.invalidar("produtos", "estoques", "movimentacoes")
+            self.stdout.write("Saldos reconstruídos a partir das movimentações.")
+
+        esperado = saldos_do_historico()
+        atual = {
+            (produto, estoque): quantidade
+            for produto, estoque, quantidade in SaldoEstoque.objects.values_list(
+                "id_produto", "id_estoque", "quantidade"
+            )
+        }
+        divergencias = [
+            (chave, atual.get(chave, 0), esperado.get(chave, 0))
+            for chave in esperado.keys() | atual.keys()
+            if atual.get(chave, 0) != esperado.get(chave, 0)
+        ]
+        for (produto, estoque), saldo, historico in sorted(divergencias):
+            self.stdout.write(
+                f"produto={produto} estoque={estoque}: saldo={saldo} histórico={historico}"
+            )
+        if divergencias:
+            raise CommandError(f"{len(divergencias)} saldo(s) divergente(s) do histórico.")
+        self.stdout.write(self.style.SUCCESS(f"{len(esperado)} saldo(s) conferido(s)."))
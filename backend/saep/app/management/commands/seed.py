@@ -1,6 +1,14 @@
-from django.core.management.base import BaseCommand
+import itertools
+import random
+import time
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 from django.utils import timezone
 
+from app import cache_api
 from app.models import (
     Usuario,
     Cliente,
@@ -10,13 +18,33 @@ from app.models import (
     Produto,
     EstoqueProduto,
     MovimentacaoEstoque,
+    SaldoSnapshot,
 )
 
 
 class Command(BaseCommand):
-    help = "Popula o banco com dados de exemplo (3 de cada entidade e 3 superusers)."
+    help = (
+        "Popula o banco com dados de exemplo (3 de cada entidade e 3 superusers). "
+        "Com --produtos/--movimentacoes/--clientes gera também uma carga sintética "
+        "determinística para testes de desempenho."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--produtos", type=int, default=0, help="Produtos de carga.")
+        parser.add_argument("--movimentacoes", type=int, default=0, help="Movimentações de carga.")
+        parser.add_argument("--clientes", type=int, default=0, help="Clientes de carga.")
+        parser.add_argument("--seed", type=int, default=1, help="Semente do gerador.")
+        parser.add_argument("--dias", type=int, default=365, help="Período coberto pelas movimentações.")
+        parser.add_argument("--zipf", type=float, default=1.1, help="Expoente da popularidade dos produtos.")
+        parser.add_argument("--lote", type=int, default=10000, help="Linhas por bulk_create/transação.")
 
     def handle(self, *args, **options):
+        admin1 = self.criar_exemplos()
+        self.stdout.write(self.style.SUCCESS("Dados iniciais criados com sucesso."))
+        if options["produtos"] or options["movimentacoes"] or options["clientes"]:
+            self.gerar_carga(admin1, options)
+
+    def criar_exemplos(self):
         # ---------- USUÁRIOS (3 SUPERUSERS) ----------
         admin1, created1 = Usuario.objects.get_or_create(
             email="admin1@mail.com",
@@ -170,4 +198,107 @@ class Command(BaseCommand):
             movimentedAt=timezone.now(),
         )
 
-        self.stdout.write(self.style.SUCCESS("Dados iniciais criados com sucesso."))
+        return admin1
+
+    # ---------- CARGA SINTÉTICA ----------
+    def progresso(self, rotulo, feitos, total, inicio):
+        decorrido = time.perf_counter() - inicio
+        self.stdout.write(
+            f"{rotulo}: {feitos}/{total} ({feitos / decorrido if decorrido else 0:,.0f}/s)"
+        )
+
+    def em_lotes(self, rotulo, total, tamanho, criar):
+        inicio = time.perf_counter()
+        for base in range(0, total, tamanho):
+            with transaction.atomic():
+                criar(base, min(base + tamanho, total))
+            self.progresso(rotulo, min(base + tamanho, total), total, inicio)
+
+    def gerar_carga(self, usuario, options):
+        aleatorio = random.Random(options["seed"])
+        prefixo = f"LOAD{options['seed']}-"
+        lote = options["lote"]
+        if Produto.objects.filter(sku__startswith=prefixo).exists():
+            raise CommandError(f"Já existe carga com --seed {options['seed']}; use outra semente.")
+
+        def criar_clientes(inicio, fim):
+            Cliente.objects.bulk_create(
+                [
+                    Cliente(
+                        nome=f"Cliente {i}",
+                        email=f"{prefixo.lower()}{i}@example.com",
+                        telefone=f"119{i:08d}"[-11:],
+                    )
+                    for i in range(inicio, fim)
+                ]
+            )
+
+        def criar_produtos(inicio, fim):
+            Produto.objects.bulk_create(
+                [
+                    Produto(
+                        nome=f"Produto {i}",
+                        descricao=f"Produto de carga {i} da semente {options['seed']}",
+                        sku=f"{prefixo}{i:08d}",
+                        id_usuario=usuario,
+                        estoque_minimo=aleatorio.choice((0, 5, 10, 20, 50)),
+                    )
+                    for i in range(inicio, fim)
+                ]
+            )
+
+        self.em_lotes("clientes", options["clientes"], lote, criar_clientes)
+        self.em_lotes("produtos", options["produtos"], lote, criar_produtos)
+
+        # a ordem do sku é a ordem de criação: o produto i tem popularidade 1/(i+1)^s
+        produtos = list(
+            Produto.objects.filter(sku__startswith=prefixo).order_by("sku").values_list("id", flat=True)
+        )
+        clientes = list(
+            Cliente.objects.filter(email__startswith=prefixo.lower()).values_list("id", flat=True)
+        )
+        estoques = list(Estoque.objects.values_list("id", flat=True))
+        if options["movimentacoes"] and not produtos:
+            raise CommandError("Use --produtos para gerar movimentações.")
+        pesos = list(
+            itertools.accumulate(1 / (i + 1) ** options["zipf"] for i in range(len(produtos)))
+        )
+
+        total = options["movimentacoes"]
+        fim_periodo = timezone.now()
+        passo = timedelta(days=options["dias"]) / max(total, 1)
+        saldos = {}
+
+        def criar_movimentacoes(inicio, fim):
+            movimentacoes = []
+            escolhidos = aleatorio.choices(produtos, cum_weights=pesos, k=fim - inicio)
+            for i, produto in zip(range(inicio, fim), escolhidos):
+                estoque = aleatorio.choice(estoques)
+                quantidade = aleatorio.randint(1, 20)
+                chave = (produto, estoque)
+                # saídas só até o saldo: a carga respeita a mesma regra da API
+                tipo = "S" if aleatorio.random() < 0.45 and saldos.get(chave, 0) >= quantidade else "E"
+                saldos[chave] = saldos.get(chave, 0) + (quantidade if tipo == "E" else -quantidade)
+                movimentacoes.append(
+                    MovimentacaoEstoque(
+                        id_produto_id=produto,
+                        id_estoque_id=estoque,
+                        id_cliente_id=aleatorio.choice(clientes) if clientes and tipo == "S" else None,
+                        quantidade=quantidade,
+                        tipo=tipo,
+                        movimentedAt=fim_periodo - passo * (total - i),
+                    )
+                )
+            # bulk_create direto: saldos e resumos são reconstruídos uma vez no final
+            MovimentacaoEstoque.objects.bulk_create(movimentacoes)
+
+        self.em_lotes("movimentações", total, lote, criar_movimentacoes)
+
+        if options["produtos"]:
+            call_command("indexar_produtos", stdout=self.stdout)
+            Produto.objects.filter(sku__startswith=prefixo).marcar_abaixo_minimo()
+        if total:
+            call_command("recalcular_saldos", stdout=self.stdout)
+            call_command("recalcular_resumos", stdout=self.stdout)
+            SaldoSnapshot.invalidar(fim_periodo - passo * total)
+            cache_api.invalidar_modelo(MovimentacaoEstoque)
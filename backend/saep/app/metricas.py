@@ -0,0 +1,236 @@
+"""Tempo total, tempo de banco e consultas por requisição.
+
+O middleware devolve os números no cabeçalho ``Server-Timing``, acumula
+histogramas por rota (expostos em ``/api/v1/metrics/`` no formato texto do
+Prometheus) e registra em log requisições com consultas demais ou SQL repetido.
+Os contadores são por processo e cumulativos; janelas ficam por conta do
+``rate()`` do Prometheus.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import connections
+
+from . import ajustes
+
+logger = logging.getLogger(__name__)
+
+LIMITES_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class ColetorSQL:
+    """execute_wrapper que conta e cronometra as consultas de uma requisição."""
+
+    def __init__(self):
+        self.consultas = 0
+        self.segundos = 0.0
+        self.semelhantes = Counter()
+        self.identicas = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.segundos += time.perf_counter() - inicio
+            self.consultas += 1
+            self.semelhantes[sql] += 1
+            if not many:
+                try:
+                    self.identicas[sql, tuple(params or ())] += 1
+                except TypeError:
+                    pass
+
+    def repetidas(self, max_semelhantes):
+        """SQL executado mais de ``max_semelhantes`` vezes: (sql, vezes, sempre com
+        os mesmos parâmetros?) ou None."""
+        if not self.semelhantes:
+            return None
+        sql, vezes = self.semelhantes.most_common(1)[0]
+        if vezes <= max_semelhantes:
+            return None
+        identica = any(
+            chave[0] == sql and total == vezes for chave, total in self.identicas.items()
+        )
+        return sql, vezes, identica
+
+
+class Histograma:
+    __slots__ = ("limites", "baldes", "soma", "total")
+
+    def __init__(self, limites):
+        self.limites = limites
+        self.baldes = [0] * (len(limites) + 1)
+        self.soma = 0
+        self.total = 0
+
+    def observar(self, valor):
+        self.baldes[bisect_left(self.limites, valor)] += 1
+        self.soma += valor
+        self.total += 1
+
+
+class Registro:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._rotas = {}
+        self._status = Counter()
+
+    def observar(self, rota, metodo, status, segundos, coletor):
+        with self._lock:
+            estatisticas = self._rotas.get((rota, metodo))
+            if estatisticas is None:
+                estatisticas = self._rotas[rota, metodo] = {
+                    "duracao": Histograma(LIMITES_SEGUNDOS),
+                    "consultas": Histograma(LIMITES_CONSULTAS),
+                    "banco": 0.0,
+                }
+            estatisticas["duracao"].observar(segundos)
+            estatisticas["consultas"].observar(coletor.consultas)
+            estatisticas["banco"] += coletor.segundos
+            self._status[rota, metodo, status] += 1
+
+    def limpar(self):
+        with self._lock:
+            self._rotas.clear()
+            self._status.clear()
+
+    def exportar(self):
+        with self._lock:
+            linhas = []
+            self._histograma(
+                linhas, "saep_requisicao_segundos", "Duração das requisições por rota.", "duracao"
+            )
+            self._histograma(
+                linhas, "saep_consultas_por_requisicao", "Consultas SQL por requisição.", "consultas"
+            )
+            linhas += [
+                "# HELP saep_banco_segundos_total Tempo gasto em SQL por rota.",
+                "# TYPE saep_banco_segundos_total counter",
+            ]
+            for (rota, metodo), estatisticas in sorted(self._rotas.items()):
+                linhas.append(
+                    f"saep_banco_segundos_total{_rotulos(rota=rota, metodo=metodo)} {estatisticas['banco']}"
+                )
+            linhas += [
+                "# HELP saep_requisicoes_total Requisições por rota e status.",
+                "# TYPE saep_requisicoes_total counter",
+            ]
+            for (rota, metodo, status), total in sorted(self._status.items()):
+                linhas.append(
+                    f"saep_requisicoes_total{_rotulos(rota=rota, metodo=metodo, status=status)} {total}"
+                )
+        return "\n".join(linhas) + "\n"
+
+    def _histograma(self, linhas, nome, descricao, campo):
+        linhas += [f"# HELP {nome} {descricao}", f"# TYPE {nome} histogram"]
+        for (rota, metodo), estatisticas in sorted(self._rotas.items()):
+            histograma = estatisticas[campo]
+            acumulado = 0
+            for limite, quantidade in zip((*histograma.limites, "+Inf"), histograma.baldes):
+                acumulado += quantidade
+                rotulos = _rotulos(rota=rota, metodo=metodo, le=limite)
+                linhas.append(f"{nome}_bucket{rotulos} {acumulado}")
+            rotulos = _rotulos(rota=rota, metodo=metodo)
+            linhas.append(f"{nome}_sum{rotulos} {histograma.soma}")
+            linhas.append(f"{nome}_count{rotulos} {histograma.total}")
+
+
+def _rotulos(**valores):
+    pares = []
+    for nome, valor in valores.items():
+        valor = str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pares.append(f'{nome}="{valor}"')
+    return "{" + ",".join(pares) + "}"
+
+
+registro = Registro()
+
+
+class MetricasMiddleware:
+    """Deve ficar no topo do MIDDLEWARE para medir a requisição inteira.
+
+    Em respostas em streaming o corpo é gerado depois daqui: os números cobrem
+    só até o primeiro byte.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        config = ajustes.ler("SAEP_METRICAS")
+        if not config["ATIVO"]:
+            return self.get_response(request)
+
+        coletor = ColetorSQL()
+        inicio = time.perf_counter()
+        with ExitStack() as pilha:
+            for conexao in connections.all():
+                pilha.enter_context(conexao.execute_wrapper(coletor))
+            response = self.get_response(request)
+        self.registrar(request, response, time.perf_counter() - inicio, coletor, config)
+        return response
+
+    async def __acall__(self, request):
+        config = ajustes.ler("SAEP_METRICAS")
+        if not config["ATIVO"]:
+            return await self.get_response(request)
+
+        # as conexões são por thread e o ORM async roda na thread da requisição
+        # (sync_to_async), então o wrapper é instalado lá
+        coletor = ColetorSQL()
+        inicio = time.perf_counter()
+        await sync_to_async(instalar_coletor)(coletor)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(remover_coletor)(coletor)
+        self.registrar(request, response, time.perf_counter() - inicio, coletor, config)
+        return response
+
+    def registrar(self, request, response, segundos, coletor, config):
+        response["Server-Timing"] = (
+            f"total;dur={segundos * 1000:.1f}, db;dur={coletor.segundos * 1000:.1f}, "
+            f'sql;desc="{coletor.consultas} consultas"'
+        )
+        match = request.resolver_match
+        rota = match.view_name if match else "nao_encontrada"
+        registro.observar(rota, request.method, response.status_code, segundos, coletor)
+
+        if coletor.consultas > config["MAX_CONSULTAS"]:
+            logger.warning(
+                "%s %s (%s): %d consultas em %.1fms de banco",
+                request.method, request.path, rota, coletor.consultas, coletor.segundos * 1000,
+            )
+        repetida = coletor.repetidas(config["MAX_SEMELHANTES"])
+        if repetida:
+            sql, vezes, identica = repetida
+            logger.warning(
+                "%s %s (%s): SQL %s executado %d vezes: %s",
+                request.method, request.path, rota,
+                "idêntico" if identica else "semelhante", vezes, sql[:300],
+            )
+
+
+def instalar_coletor(coletor):
+    for conexao in connections.all():
+        conexao.execute_wrappers.append(coletor)
+
+
+def remover_coletor(coletor):
+    for conexao in connections.all():
+        if coletor in conexao.execute_wrappers:
+            conexao.execute_wrappers.remove(coletor)
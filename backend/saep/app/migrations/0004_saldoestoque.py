@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:40
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Case, F, IntegerField, Sum, When
+
+
+def popular_saldos(apps, schema_editor):
+    MovimentacaoEstoque = apps.get_model('app', 'MovimentacaoEstoque')
+    SaldoEstoque = apps.get_model('app', 'SaldoEstoque')
+    linhas = (
+        MovimentacaoEstoque.objects.order_by()
+        .values('id_produto', 'id_estoque')
+        .annotate(total=Sum(
+            Case(When(tipo='E', then=F('quantidade')), default=-F('quantidade')),
+            output_field=IntegerField(),
+        ))
+    )
+    SaldoEstoque.objects.bulk_create(
+        [
+            SaldoEstoque(id_produto_id=l['id_produto'], id_estoque_id=l['id_estoque'], quantidade=l['total'])
+            for l in linhas
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_produto_estoque_minimo_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoEstoque',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantidade', models.IntegerField(default=0)),
+                ('id_estoque', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.estoque')),
+                ('id_produto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.produto')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('id_produto', 'id_estoque'), name='saldo_produto_estoque_unico')],
+            },
+        ),
+        migrations.RunPython(popular_saldos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:43
+
+from django.core.management import CommandError
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def conferir_skus_duplicados(apps, schema_editor):
+    # agrupa no banco, com a collation da coluna: é ela que decide o que o
+    # índice único considera igual (no MySQL, "abc" e "ABC ")
+    Produto = apps.get_model('app', 'Produto')
+    duplicados = list(
+        Produto.objects.order_by()
+        .values('sku')
+        .annotate(total=Count('id'))
+        .filter(total__gt=1)
+        .values_list('sku', 'total')[:20]
+    )
+    if duplicados:
+        lista = ', '.join(f'{sku!r} ({total} produtos)' for sku, total in duplicados)
+        raise CommandError(
+            'Há produtos com o mesmo SKU e o SKU vai passar a ser único: '
+            f'{lista}. Corrija os SKUs (ex.: no /admin/) e rode o migrate de novo.'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_indices_paginacao'),
+    ]
+
+    operations = [
+        migrations.RunPython(conferir_skus_duplicados, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='produto',
+            name='sku',
+            field=models.CharField(max_length=255, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaoestoque',
+            index=models.Index(fields=['id_produto', 'tipo', 'quantidade'], name='mov_produto_tipo_qtd_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaoestoque',
+            index=models.Index(fields=['id_estoque', 'movimentedAt'], name='mov_estoque_data_idx'),
+        ),
+    ]
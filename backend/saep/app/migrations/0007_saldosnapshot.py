@@ -0,0 +1,44 @@
+# Generated by Django 5.2.8 on 2026-10-17 02:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_indices_movimentacao_sku_unico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('momento', models.DateTimeField()),
+                ('quantidade', models.IntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='movimentacaoestoque',
+            index=models.Index(fields=['id_produto', 'movimentedAt'], name='mov_produto_data_idx'),
+        ),
+        migrations.AddField(
+            model_name='saldosnapshot',
+            name='id_estoque',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.estoque'),
+        ),
+        migrations.AddField(
+            model_name='saldosnapshot',
+            name='id_produto',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.produto'),
+        ),
+        migrations.AddIndex(
+            model_name='saldosnapshot',
+            index=models.Index(fields=['momento'], name='snapshot_momento_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='saldosnapshot',
+            constraint=models.UniqueConstraint(fields=('id_produto', 'momento', 'id_estoque'), name='snapshot_produto_momento_unico'),
+        ),
+    ]
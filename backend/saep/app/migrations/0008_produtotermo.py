@@ -0,0 +1,64 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:00
+
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# cópia de app.busca como estava nesta migração: mudanças futuras na
+# normalização não alteram o que ela grava
+PESOS = {"sku": 4, "nome": 2, "descricao": 1}
+
+
+def termos(texto):
+    texto = unicodedata.normalize("NFKD", texto or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c)).lower()
+    return [t[:64] for t in re.findall(r"[0-9a-z]+", texto)]
+
+
+def termos_do_produto(nome, descricao, sku):
+    pesos = {}
+    for campo, texto in (("sku", sku), ("nome", nome), ("descricao", descricao)):
+        for termo in set(termos(texto)):
+            pesos[termo] = pesos.get(termo, 0) + PESOS[campo]
+    return pesos
+
+
+def indexar_produtos(apps, schema_editor, lote=1000):
+    Produto = apps.get_model('app', 'Produto')
+    ProdutoTermo = apps.get_model('app', 'ProdutoTermo')
+    linhas = []
+    produtos = Produto.objects.only('nome', 'descricao', 'sku').iterator(chunk_size=lote)
+    for produto in produtos:
+        linhas.extend(
+            ProdutoTermo(termo=termo, id_produto_id=produto.pk, peso=peso)
+            for termo, peso in termos_do_produto(produto.nome, produto.descricao, produto.sku).items()
+        )
+        if len(linhas) >= lote:
+            ProdutoTermo.objects.bulk_create(linhas)
+            linhas = []
+    ProdutoTermo.objects.bulk_create(linhas)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_saldosnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProdutoTermo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('termo', models.CharField(max_length=64)),
+                ('peso', models.PositiveSmallIntegerField()),
+                ('id_produto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='app.produto')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['termo', 'id_produto', 'peso'], name='termo_produto_peso_idx'), models.Index(fields=['id_produto', 'termo', 'peso'], name='produto_termo_peso_idx')],
+            },
+        ),
+        migrations.RunPython(indexar_produtos, migrations.RunPython.noop),
+    ]
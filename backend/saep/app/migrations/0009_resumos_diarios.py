@@ -0,0 +1,77 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+
+def popular_resumos(apps, schema_editor):
+    MovimentacaoEstoque = apps.get_model('app', 'MovimentacaoEstoque')
+    for nome, dimensoes in (
+        ('MovimentacaoDiaria', ('id_produto', 'id_estoque')),
+        ('MovimentacaoClienteDiaria', ('id_cliente',)),
+    ):
+        Resumo = apps.get_model('app', nome)
+        linhas = (
+            MovimentacaoEstoque.objects.filter(**{f'{d}__isnull': False for d in dimensoes})
+            .order_by()
+            .values(*dimensoes, 'tipo', dia=TruncDate('movimentedAt'))
+            .annotate(soma=Sum('quantidade'), total=Count('id'))
+        )
+        Resumo.objects.bulk_create(
+            [
+                Resumo(
+                    **{f'{d}_id': l[d] for d in dimensoes},
+                    dia=l['dia'], tipo=l['tipo'], quantidade=l['soma'], ocorrencias=l['total'],
+                )
+                for l in linhas
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_produtotermo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MovimentacaoClienteDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('tipo', models.CharField(choices=[('E', 'Entrada'), ('S', 'Saída')], max_length=1)),
+                ('quantidade', models.BigIntegerField(default=0)),
+                ('ocorrencias', models.IntegerField(default=0)),
+                ('id_cliente', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='app.cliente')),
+            ],
+            options={
+                'verbose_name': 'movimentação diária por cliente',
+                'verbose_name_plural': 'movimentações diárias por cliente',
+                'indexes': [models.Index(fields=['dia', 'id_cliente'], name='cliente_diaria_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('id_cliente', 'dia', 'tipo'), name='cliente_diaria_chave_unica')],
+            },
+        ),
+        migrations.CreateModel(
+            name='MovimentacaoDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('tipo', models.CharField(choices=[('E', 'Entrada'), ('S', 'Saída')], max_length=1)),
+                ('quantidade', models.BigIntegerField(default=0)),
+                ('ocorrencias', models.IntegerField(default=0)),
+                ('id_estoque', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='app.estoque')),
+                ('id_produto', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to='app.produto')),
+            ],
+            options={
+                'verbose_name': 'movimentação diária',
+                'verbose_name_plural': 'movimentações diárias',
+                'indexes': [models.Index(fields=['dia', 'id_produto'], name='diaria_dia_produto_idx'), models.Index(fields=['id_estoque', 'dia'], name='diaria_estoque_dia_idx')],
+                'constraints': [models.UniqueConstraint(fields=('id_produto', 'id_estoque', 'dia', 'tipo'), name='diaria_chave_unica')],
+            },
+        ),
+        migrations.RunPython(popular_resumos, migrations.RunPython.noop),
+    ]
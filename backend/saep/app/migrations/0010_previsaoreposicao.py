@@ -0,0 +1,29 @@
+# Generated by Django 5.2.8 on 2026-10-17 03:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_resumos_diarios'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrevisaoReposicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('demanda_diaria', models.FloatField()),
+                ('desvio_diario', models.FloatField()),
+                ('ponto_reposicao', models.PositiveIntegerField()),
+                ('calculadoEm', models.DateTimeField()),
+                ('id_produto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='previsao', to='app.produto')),
+            ],
+            options={
+                'verbose_name': 'previsão de reposição',
+                'verbose_name_plural': 'previsões de reposição',
+            },
+        ),
+    ]
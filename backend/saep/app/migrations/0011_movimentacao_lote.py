@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_previsaoreposicao'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movimentacaoestoque',
+            name='lote',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:58
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_movimentacao_lote'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(django.db.models.functions.text.Upper('sku'), name='produto_sku_maiusculo_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.8 on 2026-10-17 05:38
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def marcar_abaixo_minimo(apps, schema_editor):
+    Produto = apps.get_model('app', 'Produto')
+    SaldoEstoque = apps.get_model('app', 'SaldoEstoque')
+    total = (
+        SaldoEstoque.objects.filter(id_produto=OuterRef('pk'))
+        .order_by()
+        .values('id_produto')
+        .annotate(total=Sum('quantidade'))
+        .values('total')
+    )
+    Produto.objects.filter(
+        estoque_minimo__gt=Coalesce(Subquery(total, output_field=models.IntegerField()), 0)
+    ).update(abaixo_minimo=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_produto_sku_maiusculo'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='produto',
+            name='abaixo_minimo',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='produto',
+            index=models.Index(fields=['abaixo_minimo', 'nome', 'id'], name='produto_abaixo_minimo_idx'),
+        ),
+        migrations.RunPython(marcar_abaixo_minimo, migrations.RunPython.noop),
+    ]
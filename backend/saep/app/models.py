@@ -1,11 +1,29 @@
-from django.db import models
+import uuid
+from functools import partial
+
+from django.db import connections, models, router, transaction, IntegrityError
+from django.db.models import F
 from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     PermissionsMixin,
     BaseUserManager,
 )
-from django.db.models import Sum
+from django.db.models import (
+    Sum,
+    Max,
+    OuterRef,
+    Subquery,
+    Q,
+    Case,
+    When,
+    Count,
+    Exists,
+    ExpressionWrapper,
+)
+from django.db.models.functions import Coalesce, TruncDate, Upper
+
+from . import cache_api, eventos
 
 
 class UsuarioManager(BaseUserManager):
@@ -82,30 +100,103 @@ class Estoque(models.Model):
         return f"{self.setor} - {self.descricao}"
 
 
+class EstoqueInsuficiente(Exception):
+    def __init__(self, produto_id, estoque_id, quantidade):
+        self.produto_id = produto_id
+        self.estoque_id = estoque_id
+        self.quantidade = quantidade
+        super().__init__(
+            f"Estoque insuficiente do produto {produto_id} no estoque {estoque_id} "
+            f"para retirar {quantidade}."
+        )
+
+
+def dia_local(momento):
+    """Dia do resumo diário: a data no fuso do projeto, como o TruncDate."""
+    if timezone.is_naive(momento):
+        return momento.date()
+    return timezone.localdate(momento)
+
+
+def saldo_movimentado():
+    """Soma das movimentações com sinal: entradas positivas, saídas negativas."""
+    return Sum(
+        Case(When(tipo="E", then=F("quantidade")), default=-F("quantidade")),
+        output_field=models.IntegerField(),
+    )
+
+
+def estoque_do_produto(referencia="pk", estoque=None):
+    saldos = SaldoEstoque.objects.filter(id_produto=OuterRef(referencia))
+    if estoque is not None:
+        saldos = saldos.filter(id_estoque=estoque)
+    total = (
+        saldos.order_by()
+        .values("id_produto")
+        .annotate(total=Sum("quantidade"))
+        .values("total")
+    )
+    return Coalesce(Subquery(total, output_field=models.IntegerField()), 0)
+
+
+class ProdutoQuerySet(models.QuerySet):
+    def com_estoque(self, estoque=None):
+        return self.annotate(estoque_atual=estoque_do_produto(estoque=estoque))
+
+    def abaixo_minimo(self, estoque=None):
+        if estoque is None:
+            # marcação mantida por SaldoEstoque.aplicar: só lê os produtos marcados
+            return self.filter(abaixo_minimo=True).com_estoque()
+        # parte dos saldos do estoque; produto sem saldo lá tem zero
+        suficiente = SaldoEstoque.objects.filter(
+            id_produto=OuterRef("pk"), id_estoque=estoque, quantidade__gte=OuterRef("estoque_minimo")
+        )
+        return self.filter(~Exists(suficiente), estoque_minimo__gt=0).com_estoque(estoque)
+
+    def marcar_abaixo_minimo(self):
+        return self.update(
+            abaixo_minimo=ExpressionWrapper(
+                Q(estoque_minimo__gt=estoque_do_produto()), output_field=models.BooleanField()
+            )
+        )
+
+
 class Produto(models.Model):
     nome = models.CharField(max_length=255)
     descricao = models.TextField()
-    sku = models.CharField(max_length=255)
+    sku = models.CharField(max_length=255, unique=True)
     id_usuario = models.ForeignKey(Usuario, on_delete=models.CASCADE)
     estoque_minimo = models.PositiveIntegerField(default=0)
+    # estoque total abaixo do mínimo; mantido por SaldoEstoque.aplicar e save()
+    abaixo_minimo = models.BooleanField(default=False, editable=False)
+
+    objects = ProdutoQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["nome", "id"], name="produto_nome_id_idx"),
+            # ?sku_prefixo= sem diferenciar maiúsculas
+            models.Index(Upper("sku"), name="produto_sku_maiusculo_idx"),
+            models.Index(fields=["abaixo_minimo", "nome", "id"], name="produto_abaixo_minimo_idx"),
+        ]
 
     def __str__(self):
         return self.nome
 
-    def calcular_estoque(self):
-        entradas = (
-            MovimentacaoEstoque.objects.filter(
-                id_produto=self, tipo="E"
-            ).aggregate(total=Sum("quantidade"))["total"]
-            or 0
-        )
-        saidas = (
-            MovimentacaoEstoque.objects.filter(
-                id_produto=self, tipo="S"
-            ).aggregate(total=Sum("quantidade"))["total"]
-            or 0
-        )
-        return entradas - saidas
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            super().save(*args, **kwargs)
+            # o mínimo pode ter mudado e a instância pode ter uma marcação antiga
+            Produto.objects.filter(pk=self.pk).marcar_abaixo_minimo()
+
+    def calcular_estoque(self, estoque=None, em=None):
+        if em is not None:
+            return SaldoSnapshot.estoques_em([self.pk], em, estoque).get(self.pk, 0)
+        saldos = SaldoEstoque.objects.filter(id_produto=self)
+        if estoque is not None:
+            saldo = saldos.filter(id_estoque=estoque).values_list("quantidade", flat=True).first()
+            return saldo or 0
+        return saldos.aggregate(total=Sum("quantidade"))["total"] or 0
 
 
 class EstoqueProduto(models.Model):
@@ -118,6 +209,50 @@ class EstoqueProduto(models.Model):
         return f"{self.id_produto} em {self.id_estoque} ({self.id_categoria})"
 
 
+class MovimentacaoEstoqueQuerySet(models.QuerySet):
+    def com_estoque_produto(self):
+        return self.annotate(estoque_produto=estoque_do_produto("id_produto"))
+
+    def criar_em_lote(self, movimentacoes, batch_size=1000):
+        """bulk_create não chama save(): saldos e resumos diários são aplicados aqui, uma
+        vez por chave. As movimentações voltam com o pk preenchido em qualquer banco."""
+        self._for_write = True
+        # saldo acumulado por par na ordem do lote e a maior queda dele: uma saída
+        # maior que o saldo não passa só porque uma entrada vem depois
+        deltas = {}
+        retiradas = {}
+        for movimentacao in movimentacoes:
+            chave = (movimentacao.id_produto_id, movimentacao.id_estoque_id)
+            deltas[chave] = deltas.get(chave, 0) + movimentacao.delta
+            retiradas[chave] = max(retiradas.get(chave, 0), -deltas[chave])
+        with transaction.atomic(using=self.db):
+            lote = None
+            if movimentacoes and not connections[self.db].features.can_return_rows_from_bulk_insert:
+                # o MySQL não devolve os ids de um INSERT com várias linhas: o lote é
+                # marcado e os ids lidos de volta numa faixa do pk, sem índice em "lote"
+                lote = uuid.uuid4()
+                ultimo = self.order_by().aggregate(ultimo=Max("pk"))["ultimo"] or 0
+                for movimentacao in movimentacoes:
+                    movimentacao.lote = lote
+            criadas = self.bulk_create(movimentacoes, batch_size=batch_size)
+            if lote is not None:
+                ids = self.filter(pk__gt=ultimo, lote=lote).order_by("pk").values_list("pk", flat=True)
+                for movimentacao, pk in zip(criadas, ids):
+                    movimentacao.pk = pk
+            for chave, delta in sorted(deltas.items()):
+                SaldoEstoque.aplicar(*chave, delta, marcar=False, retirada=retiradas[chave])
+            Produto.objects.filter(pk__in={produto for produto, _ in deltas}).marcar_abaixo_minimo()
+            registrar_resumos(movimentacoes)
+            if movimentacoes:
+                SaldoSnapshot.aplicar(movimentacoes)
+                cache_api.invalidar_modelo(MovimentacaoEstoque)
+                transaction.on_commit(
+                    partial(eventos.publicar_movimentacoes, [m.pk for m in criadas]),
+                    using=self.db,
+                )
+        return criadas
+
+
 class MovimentacaoEstoque(models.Model):
     TIPO_CHOICES = (
         ("E", "Entrada"),
@@ -132,6 +267,433 @@ class MovimentacaoEstoque(models.Model):
     quantidade = models.PositiveIntegerField()
     tipo = models.CharField(max_length=1, choices=TIPO_CHOICES, default="E")
     movimentedAt = models.DateTimeField(default=timezone.now)
+    # marca das linhas de um criar_em_lote em bancos sem RETURNING (MySQL)
+    lote = models.UUIDField(null=True, blank=True, editable=False)
+
+    objects = MovimentacaoEstoqueQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["movimentedAt", "id"], name="mov_data_id_idx"),
+            # cobre as somas por produto e tipo sem ler a tabela
+            models.Index(fields=["id_produto", "tipo", "quantidade"], name="mov_produto_tipo_qtd_idx"),
+            models.Index(fields=["id_estoque", "movimentedAt"], name="mov_estoque_data_idx"),
+            models.Index(fields=["id_produto", "movimentedAt"], name="mov_produto_data_idx"),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.id_produto} - {self.quantidade}"
+
+    @property
+    def delta(self):
+        return self.quantidade if self.tipo == "E" else -self.quantidade
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic(using=kwargs.get("using")):
+            anterior = None
+            if not self._state.adding and self.pk is not None:
+                anterior = (
+                    MovimentacaoEstoque.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if anterior is not None:
+                SaldoEstoque.aplicar(
+                    anterior.id_produto_id, anterior.id_estoque_id, -anterior.delta,
+                    marcar=anterior.id_produto_id != self.id_produto_id,
+                )
+                SaldoSnapshot.aplicar([anterior], sinal=-1)
+            SaldoEstoque.aplicar(self.id_produto_id, self.id_estoque_id, self.delta)
+            SaldoSnapshot.aplicar([self])
+            registrar_resumos([self], [anterior] if anterior is not None else ())
+
+
+class SaldoEstoque(models.Model):
+    """Saldo materializado por (produto, estoque), mantido pelas movimentações."""
+
+    id_produto = models.ForeignKey(Produto, on_delete=models.CASCADE)
+    id_estoque = models.ForeignKey(Estoque, on_delete=models.CASCADE)
+    quantidade = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["id_produto", "id_estoque"], name="saldo_produto_estoque_unico"
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.id_produto} em {self.id_estoque}: {self.quantidade}"
+
+    @classmethod
+    def aplicar(cls, produto_id, estoque_id, delta, marcar=True, retirada=None):
+        """``retirada`` é o saldo exigido antes de somar ``delta`` (nos lotes, a maior
+        queda do saldo ao longo das movimentações; por padrão a própria saída).
+        ``marcar=False`` deixa Produto.abaixo_minimo para quem chama (lotes)."""
+        if retirada is None:
+            retirada = max(-delta, 0)
+        saldos = cls.objects.filter(id_produto_id=produto_id, id_estoque_id=estoque_id)
+        if retirada > 0:
+            # UPDATE condicional: trava só a linha do par e confere o saldo no mesmo
+            # comando, sem janela entre a leitura e a escrita
+            if not saldos.filter(quantidade__gte=retirada).update(quantidade=F("quantidade") + delta):
+                raise EstoqueInsuficiente(produto_id, estoque_id, retirada)
+        elif not saldos.update(quantidade=F("quantidade") + delta):
+            try:
+                with transaction.atomic():
+                    cls.objects.create(
+                        id_produto_id=produto_id, id_estoque_id=estoque_id, quantidade=delta
+                    )
+            except IntegrityError:
+                # outra transação criou a linha entre o update e o create
+                saldos.update(quantidade=F("quantidade") + delta)
+        if marcar:
+            Produto.objects.filter(pk=produto_id).marcar_abaixo_minimo()
+
+
+class SaldoSnapshot(models.Model):
+    """Saldo de cada (produto, estoque) antes de ``momento``, gravado pelo comando
+    gerar_snapshots. Pares com saldo zero não são gravados."""
+
+    id_produto = models.ForeignKey(Produto, on_delete=models.CASCADE)
+    id_estoque = models.ForeignKey(Estoque, on_delete=models.CASCADE)
+    momento = models.DateTimeField()
+    quantidade = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["id_produto", "momento", "id_estoque"], name="snapshot_produto_momento_unico"
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["momento"], name="snapshot_momento_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.id_produto} em {self.id_estoque} antes de {self.momento}: {self.quantidade}"
+
+    @classmethod
+    def invalidar(cls, desde):
+        # carga em massa de histórico (seed): os cortes posteriores deixam de valer.
+        # Apaga o corte inteiro para que cada snapshot continue completo (ausente = zero)
+        cls.objects.filter(momento__gt=desde).delete()
+
+    @classmethod
+    def aplicar(cls, movimentacoes, sinal=1):
+        """Soma movimentações retroativas aos snapshots gravados depois delas, só nos
+        pares (produto, estoque) afetados; ``sinal=-1`` desfaz (exclusão e edição).
+
+        O caso comum, movimentação mais nova que o último corte, custa uma consulta.
+        """
+        deltas = {}
+        for movimentacao in movimentacoes:
+            chave = (movimentacao.id_produto_id, movimentacao.id_estoque_id, movimentacao.movimentedAt)
+            deltas[chave] = deltas.get(chave, 0) + sinal * movimentacao.delta
+        if not deltas:
+            return
+        cortes = list(
+            cls.objects.filter(momento__gt=min(chave[2] for chave in deltas))
+            .order_by("momento")
+            .values_list("momento", flat=True)
+            .distinct()
+        )
+        if not cortes:
+            return
+        for (produto_id, estoque_id, desde), delta in sorted(deltas.items()):
+            posteriores = [corte for corte in cortes if corte > desde]
+            if delta and posteriores:
+                cls._somar(produto_id, estoque_id, desde, posteriores, delta)
+
+    @classmethod
+    def _somar(cls, produto_id, estoque_id, desde, cortes, delta):
+        linhas = cls.objects.filter(id_produto_id=produto_id, id_estoque_id=estoque_id, momento__gt=desde)
+        linhas.update(quantidade=F("quantidade") + delta)
+        # ausente no corte = saldo zero: os cortes sem linha do par ganham a linha
+        # com o delta (os que já tinham foram somados acima e ficam como estão)
+        cls.objects.bulk_create(
+            [
+                cls(id_produto_id=produto_id, id_estoque_id=estoque_id, momento=corte, quantidade=delta)
+                for corte in cortes
+            ],
+            ignore_conflicts=True,
+        )
+        # pares com saldo zero não ficam no corte
+        linhas.filter(quantidade=0).delete()
+
+    @classmethod
+    def estoques_em(cls, produto_ids, momento, estoque=None):
+        """Estoque dos produtos antes de ``momento``: snapshot anterior mais próximo
+        somado às movimentações entre ele e ``momento``."""
+        produto_ids = list(produto_ids)
+        if not produto_ids:
+            return {}
+        bases = dict(
+            cls.objects.filter(id_produto__in=produto_ids, momento__lte=momento)
+            .order_by()
+            .values("id_produto")
+            .annotate(ultimo=Max("momento"))
+            .values_list("id_produto", "ultimo")
+        )
+        estoques = dict.fromkeys(produto_ids, 0)
+
+        snapshots = cls.objects.filter(
+            Q(*[Q(id_produto=p, momento=m) for p, m in bases.items()], _connector=Q.OR)
+        ) if bases else cls.objects.none()
+        movimentacoes = MovimentacaoEstoque.objects.filter(
+            Q(
+                *[
+                    Q(id_produto=p, movimentedAt__gte=bases[p]) if p in bases else Q(id_produto=p)
+                    for p in produto_ids
+                ],
+                _connector=Q.OR,
+            ),
+            movimentedAt__lt=momento,
+        )
+        if estoque is not None:
+            snapshots = snapshots.filter(id_estoque=estoque)
+            movimentacoes = movimentacoes.filter(id_estoque=estoque)
+
+        for linha in snapshots.order_by().values("id_produto").annotate(total=Sum("quantidade")):
+            estoques[linha["id_produto"]] += linha["total"]
+        for linha in movimentacoes.order_by().values("id_produto").annotate(total=saldo_movimentado()):
+            estoques[linha["id_produto"]] += linha["total"]
+        return estoques
+
+
+class ResumoDiario(models.Model):
+    """Movimentações somadas por dia e tipo no grão de ``dimensoes``.
+
+    Mantido junto com os saldos (save, exclusão e criar_em_lote) e reconstruído
+    pelo comando recalcular_resumos; o relatório de movimentações lê daqui em
+    vez de somar o histórico.
+    """
+
+    dia = models.DateField()
+    tipo = models.CharField(max_length=1, choices=MovimentacaoEstoque.TIPO_CHOICES)
+    quantidade = models.BigIntegerField(default=0)
+    ocorrencias = models.IntegerField(default=0)
+
+    dimensoes = ()
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def chave(cls, movimentacao):
+        valores = tuple(getattr(movimentacao, f"{campo}_id") for campo in cls.dimensoes)
+        if None in valores:
+            return None
+        return (*valores, dia_local(movimentacao.movimentedAt), movimentacao.tipo)
+
+    @classmethod
+    def registrar(cls, novas=(), removidas=()):
+        somas = {}
+        for sinal, movimentacoes in ((1, novas), (-1, removidas)):
+            for movimentacao in movimentacoes:
+                chave = cls.chave(movimentacao)
+                if chave is not None:
+                    quantidade, ocorrencias = somas.get(chave, (0, 0))
+                    somas[chave] = (
+                        quantidade + sinal * movimentacao.quantidade,
+                        ocorrencias + sinal,
+                    )
+        somas = sorted(item for item in somas.items() if any(item[1]))
+        novas = [(chave, soma) for chave, soma in somas if soma[1] > 0]
+        if novas and cls.somar_em_massa(novas):
+            somas = [(chave, soma) for chave, soma in somas if soma[1] <= 0]
+        for chave, (quantidade, ocorrencias) in somas:
+            cls.aplicar(chave, quantidade, ocorrencias)
+
+    @classmethod
+    def somar_em_massa(cls, somas, lote=500):
+        """Um INSERT ... ON CONFLICT que soma por lote de chaves, em vez de um UPDATE
+        (e um INSERT) por chave. Devolve False nos bancos sem upsert com soma."""
+        using = router.db_for_write(cls)
+        conexao = connections[using]
+        q = conexao.ops.quote_name
+        campos = [
+            cls._meta.get_field(nome)
+            for nome in (*cls.dimensoes, "dia", "tipo", "quantidade", "ocorrencias")
+        ]
+        somados = [q(campo.column) for campo in campos[-2:]]
+        if conexao.vendor == "mysql":
+            conflito = "ON DUPLICATE KEY UPDATE " + ", ".join(
+                f"{coluna} = {coluna} + VALUES({coluna})" for coluna in somados
+            )
+        elif conexao.vendor in ("postgresql", "sqlite"):
+            chave = ", ".join(q(campo.column) for campo in campos[:-2])
+            conflito = f"ON CONFLICT ({chave}) DO UPDATE SET " + ", ".join(
+                f"{coluna} = {q(cls._meta.db_table)}.{coluna} + excluded.{coluna}" for coluna in somados
+            )
+        else:
+            return False
+        linha = f"({', '.join(['%s'] * len(campos))})"
+        with conexao.cursor() as cursor:
+            for inicio in range(0, len(somas), lote):
+                parte = somas[inicio:inicio + lote]
+                cursor.execute(
+                    f"INSERT INTO {q(cls._meta.db_table)} ({', '.join(q(c.column) for c in campos)}) "
+                    f"VALUES {', '.join([linha] * len(parte))} {conflito}",
+                    [
+                        campo.get_db_prep_save(valor, conexao)
+                        for chave, soma in parte
+                        for campo, valor in zip(campos, (*chave, *soma))
+                    ],
+                )
+        return True
+
+    @classmethod
+    def aplicar(cls, chave, quantidade, ocorrencias):
+        filtro = dict(zip((*(f"{campo}_id" for campo in cls.dimensoes), "dia", "tipo"), chave))
+        linhas = cls.objects.filter(**filtro)
+        somar = {
+            "quantidade": F("quantidade") + quantidade,
+            "ocorrencias": F("ocorrencias") + ocorrencias,
+        }
+        if ocorrencias <= 0:
+            # só atualiza: a linha pode ter sido removida em cascata
+            linhas.update(**somar)
+            if ocorrencias < 0:
+                linhas.filter(ocorrencias__lte=0).delete()
+            return
+        if linhas.update(**somar):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**filtro, quantidade=quantidade, ocorrencias=ocorrencias)
+        except IntegrityError:
+            linhas.update(**somar)
+
+    @classmethod
+    def do_historico(cls):
+        """Linhas do resumo calculadas a partir das movimentações."""
+        return (
+            MovimentacaoEstoque.objects.filter(
+                **{f"{campo}__isnull": False for campo in cls.dimensoes}
+            )
+            .order_by()
+            .values(*cls.dimensoes, "tipo", dia=TruncDate("movimentedAt"))
+            .annotate(soma=Sum("quantidade"), total=Count("id"))
+        )
+
+
+class MovimentacaoDiaria(ResumoDiario):
+    dimensoes = ("id_produto", "id_estoque")
+
+    # a chave única e o índice por estoque já começam pelas FKs
+    id_produto = models.ForeignKey(Produto, on_delete=models.CASCADE, db_index=False)
+    id_estoque = models.ForeignKey(Estoque, on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["id_produto", "id_estoque", "dia", "tipo"], name="diaria_chave_unica"
+            ),
+        ]
+        verbose_name = "movimentação diária"
+        verbose_name_plural = "movimentações diárias"
+        indexes = [
+            models.Index(fields=["dia", "id_produto"], name="diaria_dia_produto_idx"),
+            models.Index(fields=["id_estoque", "dia"], name="diaria_estoque_dia_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.id_produto} em {self.id_estoque} ({self.dia}, {self.tipo}): {self.quantidade}"
+
+
+class MovimentacaoClienteDiaria(ResumoDiario):
+    """Movimentações com cliente por dia: o grão de MovimentacaoDiaria com o
+    cliente multiplicaria as linhas quase até o tamanho do histórico."""
+
+    dimensoes = ("id_cliente",)
+
+    id_cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["id_cliente", "dia", "tipo"], name="cliente_diaria_chave_unica"
+            ),
+        ]
+        verbose_name = "movimentação diária por cliente"
+        verbose_name_plural = "movimentações diárias por cliente"
+        indexes = [
+            models.Index(fields=["dia", "id_cliente"], name="cliente_diaria_dia_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.id_cliente} ({self.dia}, {self.tipo}): {self.quantidade}"
+
+
+RESUMOS = (MovimentacaoDiaria, MovimentacaoClienteDiaria)
+
+
+def registrar_resumos(novas=(), removidas=()):
+    for resumo in RESUMOS:
+        resumo.registrar(novas, removidas)
+
+
+class PrevisaoReposicao(models.Model):
+    """Demanda diária prevista e ponto de reposição sugerido, gravados pelo comando
+    calcular_reposicao (ver app/previsao.py)."""
+
+    id_produto = models.OneToOneField(Produto, on_delete=models.CASCADE, related_name="previsao")
+    demanda_diaria = models.FloatField()
+    desvio_diario = models.FloatField()
+    ponto_reposicao = models.PositiveIntegerField()
+    calculadoEm = models.DateTimeField()
+
+    class Meta:
+        verbose_name = "previsão de reposição"
+        verbose_name_plural = "previsões de reposição"
+
+    def __str__(self):
+        return f"{self.id_produto}: repor abaixo de {self.ponto_reposicao}"
+
+    @property
+    def dias_cobertura(self):
+        """Dias até o estoque atual acabar na demanda prevista; None sem demanda."""
+        if self.demanda_diaria <= 0:
+            return None
+        estoque = getattr(self.id_produto, "estoque_atual", None)
+        if estoque is None:
+            estoque = self.id_produto.calcular_estoque()
+        return max(estoque, 0) / self.demanda_diaria
+
+
+class ProdutoTermo(models.Model):
+    """Índice invertido da busca de produtos; ver app/busca.py."""
+
+    termo = models.CharField(max_length=64)
+    # o índice composto abaixo começa por id_produto e também serve à FK
+    id_produto = models.ForeignKey(Produto, on_delete=models.CASCADE, db_index=False)
+    peso = models.PositiveSmallIntegerField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["termo", "id_produto", "peso"], name="termo_produto_peso_idx"),
+            models.Index(fields=["id_produto", "termo", "peso"], name="produto_termo_peso_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.termo} -> {self.id_produto_id}"
+
+    @classmethod
+    def indexar(cls, produtos):
+        from .busca import termos_do_produto
+
+        produtos = list(produtos)
+        with transaction.atomic():
+            cls.objects.filter(id_produto__in=produtos).delete()
+            cls.objects.bulk_create(
+                [
+                    cls(termo=termo, id_produto_id=produto.pk, peso=peso)
+                    for produto in produtos
+                    for termo, peso in termos_do_produto(
+                        produto.nome, produto.descricao, produto.sku
+                    ).items()
+                ],
+                batch_size=1000,
+            )
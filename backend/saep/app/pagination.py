@@ -0,0 +1,137 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import date
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class CursorPaginacao(BasePagination):
+    """Paginação por cursor (keyset) na ordenação indexada declarada pela view.
+
+    As views informam a ordenação pelo atributo ``ordering`` (ou por
+    ``get_ordering()`` quando ela depende da requisição), sem campos nulos; ``id``
+    é acrescentado quando não é o último campo. O cursor guarda os valores de
+    todos os campos do último item e a próxima página filtra pela tupla
+    (``campo > v OR (campo = v AND id > pk)``), então empates no primeiro campo
+    não repetem nem pulam linhas.
+    """
+
+    ordering = ("id",)
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "page_size"
+    max_page_size = 500
+    cursor_query_param = "cursor"
+
+    def get_ordering(self, request, queryset, view):
+        if hasattr(view, "get_ordering"):
+            ordering = view.get_ordering()
+        else:
+            ordering = getattr(view, "ordering", None) or self.ordering
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        ordering = tuple(ordering)
+        if ordering[-1].lstrip("-") not in ("id", "pk"):
+            ordering += ("id",)
+        return ordering
+
+    def get_page_size(self, request):
+        try:
+            tamanho = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(tamanho, self.max_page_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.ordering = self.get_ordering(request, queryset, view)
+        tamanho = self.get_page_size(request)
+        valores, voltando = self.ler_cursor(request)
+
+        ordering = self.ordering
+        if voltando:
+            ordering = tuple(campo[1:] if campo[0] == "-" else f"-{campo}" for campo in ordering)
+        queryset = queryset.order_by(*ordering)
+        if valores is not None:
+            try:
+                queryset = queryset.filter(self.depois_de(ordering, valores))
+            except (TypeError, ValueError, DjangoValidationError):
+                raise ValidationError({"cursor": ["Cursor inválido."]})
+        itens = list(queryset[: tamanho + 1])
+        mais = len(itens) > tamanho
+        itens = itens[:tamanho]
+        if voltando:
+            itens.reverse()
+
+        self.proximo = self.anterior = None
+        if itens:
+            if mais or voltando:
+                self.proximo = self.montar_cursor(itens[-1], False)
+            if (mais and voltando) or (valores is not None and not voltando):
+                self.anterior = self.montar_cursor(itens[0], True)
+        return itens
+
+    def depois_de(self, ordering, valores):
+        condicao = Q()
+        iguais = {}
+        for campo, valor in zip(ordering, valores):
+            nome = campo.lstrip("-")
+            operador = "lt" if campo[0] == "-" else "gt"
+            condicao |= Q(**iguais, **{f"{nome}__{operador}": valor})
+            iguais[nome] = valor
+        return condicao
+
+    def ler_cursor(self, request):
+        texto = request.query_params.get(self.cursor_query_param)
+        if not texto:
+            return None, False
+        try:
+            valores, voltando = json.loads(urlsafe_b64decode(texto.encode()))
+        except (TypeError, ValueError):
+            valores = voltando = None
+        if (
+            not isinstance(valores, list)
+            or not isinstance(voltando, bool)
+            or len(valores) != len(self.ordering)
+            or not all(
+                isinstance(valor, (str, int, float)) and not isinstance(valor, bool)
+                for valor in valores
+            )
+        ):
+            raise ValidationError({"cursor": ["Cursor inválido."]})
+        return valores, voltando
+
+    def montar_cursor(self, item, voltando):
+        valores = []
+        for campo in self.ordering:
+            valor = item.serializable_value(campo.lstrip("-"))
+            # isoformat() mantém os microssegundos que o DjangoJSONEncoder corta
+            if isinstance(valor, date):
+                valor = valor.isoformat()
+            elif isinstance(valor, Decimal):
+                valor = str(valor)
+            valores.append(valor)
+        texto = urlsafe_b64encode(json.dumps([valores, voltando]).encode()).decode()
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.cursor_query_param, texto
+        )
+
+    def get_paginated_response(self, data):
+        return Response({"next": self.proximo, "previous": self.anterior, "results": data})
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "results": schema,
+            },
+        }
@@ -1,5 +1,15 @@
 from rest_framework.permissions import BasePermission
 
+from .authentication import TokenMetricasAuthentication
+
+
 class IsActiveUser(BasePermission):
     def has_permission(self, request, view):
-        return request.user and request.user.is_authenticated and request.user.is_active
\ No newline at end of file
+        return request.user and request.user.is_authenticated and request.user.is_active
+
+
+class PodeVerMetricas(BasePermission):
+    def has_permission(self, request, view):
+        if isinstance(request.successful_authenticator, TokenMetricasAuthentication):
+            return True
+        return bool(request.user and request.user.is_authenticated and request.user.is_staff)
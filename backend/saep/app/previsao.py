@@ -0,0 +1,183 @@
+"""Demanda prevista e ponto de reposição sugerido para cada produto.
+
+A demanda diária sai das saídas ("S") dos resumos diários dos últimos
+``DIAS`` dias: média simples ou suavização exponencial (mais peso aos dias
+recentes). O ponto de reposição cobre a demanda durante o prazo de entrega
+mais um estoque de segurança::
+
+    ponto = demanda * PRAZO_DIAS + Z * desvio * sqrt(PRAZO_DIAS)
+
+Os produtos são processados em lotes de ``LOTE``: as saídas do lote vêm do
+banco como colunas (produto, dia, quantidade), viram uma matriz produto x dia
+e todas as contas são feitas sobre a matriz inteira com NumPy. Sem NumPy
+instalado o mesmo cálculo roda em Python puro, bem mais devagar.
+"""
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import ajustes, cache_api
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+METODOS = ("media", "exponencial")
+
+
+def configuracao(**valores):
+    config = ajustes.ler("SAEP_PREVISAO")
+    config.update({chave: valor for chave, valor in valores.items() if valor is not None})
+    if config["METODO"] not in METODOS:
+        raise ValueError(f"Método de previsão desconhecido: {config['METODO']}.")
+    if config["DIAS"] < 1 or config["LOTE"] < 1:
+        raise ValueError("DIAS e LOTE devem ser positivos.")
+    if not 0 < config["ALFA"] <= 1:
+        raise ValueError("ALFA deve estar entre 0 e 1.")
+    return config
+
+
+def lotes_de_produtos(tamanho):
+    """Ids de todos os produtos em ordem, ``tamanho`` por vez (keyset no pk)."""
+    from .models import Produto
+
+    ultimo = 0
+    while True:
+        ids = list(
+            Produto.objects.filter(pk__gt=ultimo)
+            .order_by("pk")
+            .values_list("pk", flat=True)[:tamanho]
+        )
+        if not ids:
+            return
+        yield ids
+        ultimo = ids[-1]
+
+
+def saidas(ids, inicio, fim):
+    """Saídas diárias dos produtos de ``ids`` entre ``inicio`` e ``fim`` (exclusivo),
+    em colunas: (produtos, dias, quantidades). Estoques diferentes vêm em linhas
+    separadas e são somados na matriz."""
+    from .models import MovimentacaoDiaria
+
+    linhas = (
+        MovimentacaoDiaria.objects.filter(
+            id_produto__gte=ids[0],
+            id_produto__lte=ids[-1],
+            tipo="S",
+            dia__gte=inicio,
+            dia__lt=fim,
+        )
+        .order_by()
+        .values_list("id_produto", "dia", "quantidade")
+    )
+    colunas = tuple(zip(*linhas))
+    return colunas or ((), (), ())
+
+
+def calcular(ids, produtos, dias, quantidades, inicio, config):
+    """(demanda diária, desvio diário, ponto de reposição) de cada id, na ordem."""
+    if np is not None:
+        return _calcular_numpy(ids, produtos, dias, quantidades, inicio, config)
+    return _calcular_python(ids, produtos, dias, quantidades, inicio, config)
+
+
+def _calcular_numpy(ids, produtos, dias, quantidades, inicio, config):
+    total_dias = config["DIAS"]
+    matriz = np.zeros((len(ids), total_dias))
+    if produtos:
+        linhas = np.searchsorted(np.asarray(ids), np.asarray(produtos))
+        colunas = (
+            np.asarray(dias, dtype="datetime64[D]") - np.datetime64(inicio, "D")
+        ).astype(int)
+        np.add.at(matriz, (linhas, colunas), np.asarray(quantidades, dtype=float))
+
+    media = matriz.mean(axis=1)
+    desvio = matriz.std(axis=1)
+    if config["METODO"] == "exponencial":
+        # nível = alfa * x[t] + (1 - alfa) * nível[t-1] desenrolado num produto
+        # matriz x pesos, partindo da média da janela
+        restante = 1 - config["ALFA"]
+        pesos = config["ALFA"] * restante ** np.arange(total_dias - 1, -1, -1)
+        demanda = matriz @ pesos + restante**total_dias * media
+    else:
+        demanda = media
+    prazo = config["PRAZO_DIAS"]
+    # a folga evita que 14.000000000001 vire 15
+    ponto = np.ceil(demanda * prazo + config["Z"] * desvio * math.sqrt(prazo) - 1e-9)
+    return demanda.tolist(), desvio.tolist(), ponto.astype(int).tolist()
+
+
+def _calcular_python(ids, produtos, dias, quantidades, inicio, config):
+    total_dias = config["DIAS"]
+    posicao = {pk: indice for indice, pk in enumerate(ids)}
+    series = [[0.0] * total_dias for _ in ids]
+    for produto, dia, quantidade in zip(produtos, dias, quantidades):
+        series[posicao[produto]][(dia - inicio).days] += quantidade
+
+    restante = 1 - config["ALFA"]
+    pesos = [config["ALFA"] * restante ** (total_dias - 1 - t) for t in range(total_dias)]
+    prazo = config["PRAZO_DIAS"]
+    demandas, desvios, pontos = [], [], []
+    for serie in series:
+        media = sum(serie) / total_dias
+        desvio = math.sqrt(sum((x - media) ** 2 for x in serie) / total_dias)
+        if config["METODO"] == "exponencial":
+            demanda = sum(x * p for x, p in zip(serie, pesos)) + restante**total_dias * media
+        else:
+            demanda = media
+        demandas.append(demanda)
+        desvios.append(desvio)
+        pontos.append(math.ceil(demanda * prazo + config["Z"] * desvio * math.sqrt(prazo) - 1e-9))
+    return demandas, desvios, pontos
+
+
+def janela(hoje, config):
+    """Dias usados na previsão: os ``DIAS`` dias completos antes de ``hoje``."""
+    return hoje - timedelta(days=config["DIAS"]), hoje
+
+
+def recalcular(hoje=None, atualizar_minimo=False, **valores):
+    """Recalcula e grava a previsão de todos os produtos; devolve quantos foram.
+
+    ``atualizar_minimo`` também copia o ponto sugerido para ``estoque_minimo``.
+    """
+    from .models import PrevisaoReposicao, Produto
+
+    config = configuracao(**valores)
+    inicio, fim = janela(hoje or timezone.localdate(), config)
+    agora = timezone.now()
+    total = 0
+    for ids in lotes_de_produtos(config["LOTE"]):
+        demandas, desvios, pontos = calcular(ids, *saidas(ids, inicio, fim), inicio, config)
+        with transaction.atomic():
+            PrevisaoReposicao.objects.bulk_create(
+                [
+                    PrevisaoReposicao(
+                        id_produto_id=pk,
+                        demanda_diaria=demanda,
+                        desvio_diario=desvio,
+                        ponto_reposicao=ponto,
+                        calculadoEm=agora,
+                    )
+                    for pk, demanda, desvio, ponto in zip(ids, demandas, desvios, pontos)
+                ],
+                batch_size=1000,
+                update_conflicts=True,
+                unique_fields=["id_produto"],
+                update_fields=["demanda_diaria", "desvio_diario", "ponto_reposicao", "calculadoEm"],
+            )
+            if atualizar_minimo:
+                Produto.objects.bulk_update(
+                    [Produto(pk=pk, estoque_minimo=ponto) for pk, ponto in zip(ids, pontos)],
+                    ["estoque_minimo"],
+                    batch_size=1000,
+                )
+                Produto.objects.filter(pk__in=ids).marcar_abaixo_minimo()
+        total += len(ids)
+    # bulk_create/bulk_update não disparam os sinais que invalidam o cache
+    cache_api.invalidar("produtos", "movimentacoes")
+    return total
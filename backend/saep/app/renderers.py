@@ -0,0 +1,62 @@
+import json
+
+from rest_framework.utils import encoders
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# datas passam pelo encoder do DRF ("Z" em UTC, não "+00:00") para sair igual
+# ao JSONRenderer padrão; Decimal, UUID, lazy strings etc. também
+_codificador = encoders.JSONEncoder()
+OPCOES_ORJSON = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """JSONRenderer com orjson, com a mesma saída do padrão do DRF (exceto NaN e
+    infinito, que viram ``null`` em vez de erro).
+
+    Sem orjson instalado, ou em pedidos que ele não atende (``indent``, como na
+    API navegável, ou ``UNICODE_JSON``/``COMPACT_JSON`` desligados), cai no
+    ``json`` da stdlib.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (
+            data is None
+            or orjson is None
+            or self.ensure_ascii
+            or not self.compact
+            or self.get_indent(accepted_media_type, renderer_context or {}) is not None
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        conteudo = orjson.dumps(data, default=_codificador.default, option=OPCOES_ORJSON)
+        # como o DRF: U+2028/U+2029 escapados, válidos em JSON mas não em JS
+        if b"\xe2\x80\xa8" in conteudo or b"\xe2\x80\xa9" in conteudo:
+            conteudo = conteudo.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return conteudo
+
+
+class ExportacaoRenderer(BaseRenderer):
+    """Só serve para a negociação de ``?format=``: a exportação devolve um
+    StreamingHttpResponse. Respostas de erro saem como JSON."""
+
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b""
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+
+class CSVRenderer(ExportacaoRenderer):
+    media_type = "text/csv"
+    format = "csv"
+
+
+class NDJSONRenderer(ExportacaoRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
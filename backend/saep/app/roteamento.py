@@ -0,0 +1,116 @@
+"""Leituras pesadas na réplica, escritas e leituras sensíveis no primário.
+
+Com um alias ``replica`` em ``DATABASES`` e ``RoteadorReplica`` em
+``DATABASE_ROUTERS``, as ações das ViewSets listadas em ``acoes_na_replica``
+(``LeituraNaReplicaMixin``: listagens, busca, exportação e relatórios) leem da
+réplica. Todo o resto lê do primário, inclusive os detalhes (``retrieve``), que
+o cliente costuma pedir logo depois de gravar.
+
+A escolha vale por requisição e é "grudenta": depois da primeira escrita, as
+leituras seguintes da mesma requisição voltam para o primário, para que a
+resposta enxergue o que acabou de ser gravado.
+
+Para testar localmente, dois arquivos SQLite fazem o papel de primário e
+réplica::
+
+    DATABASES = {
+        "default": {"ENGINE": "django.db.backends.sqlite3", "NAME": "primario.sqlite3"},
+        "replica": {"ENGINE": "django.db.backends.sqlite3", "NAME": "replica.sqlite3"},
+    }
+
+(``migrate --database replica`` cria as tabelas na réplica; a cópia dos dados
+fica por conta de quem testa).
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.signals import request_finished, request_started
+from django.dispatch import receiver
+
+from . import ajustes
+
+PRIMARIO = "default"
+REPLICA = "replica"
+
+class Estado:
+    __slots__ = ("replica", "fixado")
+
+    def __init__(self):
+        self.replica = False
+        self.fixado = False
+
+
+_estado = ContextVar("saep_roteamento", default=None)
+
+
+def estado():
+    atual = _estado.get()
+    if atual is None:
+        atual = Estado()
+        _estado.set(atual)
+    return atual
+
+
+@receiver(request_started)
+@receiver(request_finished)
+def limpar_estado(**kwargs):
+    # sob WSGI a thread (e o contexto) é reaproveitada entre requisições
+    _estado.set(None)
+
+
+def replica_configurada():
+    return REPLICA in settings.DATABASES
+
+
+def ler_da_replica():
+    """Manda as leituras seguintes desta requisição para a réplica (até uma escrita)."""
+    estado().replica = True
+
+
+def banco_de_leitura():
+    if not replica_configurada():
+        return PRIMARIO
+    atual = _estado.get()
+    if atual is not None and atual.replica and not atual.fixado:
+        return REPLICA
+    return PRIMARIO
+
+
+class RoteadorReplica:
+    def db_for_read(self, model, **hints):
+        if not replica_configurada():
+            return None
+        # explícito mesmo no primário: senão o Django seguiria o banco da
+        # instância do hint, que pode ter vindo da réplica
+        return banco_de_leitura()
+
+    def db_for_write(self, model, **hints):
+        estado().fixado = True
+        return PRIMARIO if replica_configurada() else None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bancos = {PRIMARIO, REPLICA}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+
+class LeituraNaReplicaMixin:
+    """Manda as ações de leitura em ``acoes_na_replica`` de uma ViewSet para a réplica.
+
+    Vem antes do CacheRespostaMixin nas bases da ViewSet.
+    """
+
+    acoes_na_replica = ("list",)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in ("GET", "HEAD") and self.action in self.acoes_na_replica:
+            ler_da_replica()
+
+    def tempo_cache(self):
+        # a réplica pode ainda não ter a gravação que trocou a versão do recurso:
+        # o que foi lido dela fica pouco tempo no cache
+        if banco_de_leitura() == REPLICA:
+            return ajustes.ler("SAEP_REPLICA")["TTL_CACHE"]
+        return super().tempo_cache()
@@ -8,6 +8,8 @@ from .models import (
     Estoque,
     Categoria,
     MovimentacaoEstoque,
+    EstoqueInsuficiente,
+    SaldoEstoque,
 )
 
 Usuario = get_user_model()
@@ -40,6 +42,8 @@ class CustomLoginSerializer(TokenObtainPairSerializer):
         token = super().get_token(user)
         token["email"] = user.email
         token["nome"] = user.nome
+        token["is_active"] = user.is_active
+        token["is_staff"] = user.is_staff
         return token
 
     def validate(self, attrs):
@@ -73,6 +77,9 @@ class ProdutoSerializer(serializers.ModelSerializer):
         fields = ["id", "nome", "descricao", "sku", "estoque_minimo", "estoque_atual"]
 
     def get_estoque_atual(self, obj):
+        # querysets anotados com Produto.objects.com_estoque() evitam uma consulta por linha
+        if hasattr(obj, "estoque_atual"):
+            return obj.estoque_atual
         return obj.calcular_estoque()
 
     def create(self, validated_data):
@@ -82,19 +89,101 @@ class ProdutoSerializer(serializers.ModelSerializer):
         return produto
 
 
+class ReposicaoSerializer(serializers.ModelSerializer):
+    estoque_atual = serializers.IntegerField(read_only=True)
+    demanda_diaria = serializers.FloatField(source="previsao.demanda_diaria", read_only=True)
+    ponto_reposicao = serializers.IntegerField(source="previsao.ponto_reposicao", read_only=True)
+    dias_cobertura = serializers.SerializerMethodField()
+    calculadoEm = serializers.DateTimeField(source="previsao.calculadoEm", read_only=True)
+
+    class Meta:
+        model = Produto
+        fields = [
+            "id",
+            "nome",
+            "sku",
+            "estoque_minimo",
+            "estoque_atual",
+            "demanda_diaria",
+            "ponto_reposicao",
+            "dias_cobertura",
+            "calculadoEm",
+        ]
+
+    def get_dias_cobertura(self, obj):
+        dias = obj.previsao.dias_cobertura
+        return None if dias is None else round(dias, 1)
+
+
 class EstoqueSerializer(serializers.ModelSerializer):
     class Meta:
         model = Estoque
         fields = "__all__"
 
 
+class SaldoEstoqueSerializer(serializers.ModelSerializer):
+    sku = serializers.CharField(source="id_produto.sku", read_only=True)
+    produto = serializers.CharField(source="id_produto.nome", read_only=True)
+    setor = serializers.CharField(source="id_estoque.setor", read_only=True)
+
+    class Meta:
+        model = SaldoEstoque
+        fields = ["id_produto", "sku", "produto", "id_estoque", "setor", "quantidade"]
+
+
 class CategoriaSerializer(serializers.ModelSerializer):
     class Meta:
         model = Categoria
         fields = "__all__"
 
 
-class MovimentacaoEstoqueSerializer(serializers.ModelSerializer):
+class CamposDinamicosMixin:
+    """Aceita ``?fields=a,b`` para limitar os campos e ``?expand=x,y`` para
+    escolher quais relacionamentos aninhados entram na resposta.
+
+    Sem ``expand`` todos os aninhados são mantidos; ``?expand=`` vazio remove todos.
+    Só vale para leituras (GET), para não descartar campos de escrita.
+    """
+
+    # nome do campo aninhado -> FK de origem
+    campos_expansiveis = {}
+
+    @classmethod
+    def expansoes(cls, request):
+        if request is None or request.method != "GET":
+            return set(cls.campos_expansiveis)
+        params = request.query_params
+        expandir = set(cls.campos_expansiveis)
+        if "expand" in params:
+            expandir &= set(filter(None, params["expand"].split(",")))
+        if params.get("fields"):
+            expandir &= set(params["fields"].split(","))
+        return expandir
+
+    def get_fields(self):
+        fields = super().get_fields()
+        request = self.context.get("request")
+        if request is None or request.method != "GET":
+            return fields
+        expandir = self.expansoes(request)
+        for nome in self.campos_expansiveis:
+            if nome not in expandir:
+                fields.pop(nome)
+        if request.query_params.get("fields"):
+            permitidos = set(request.query_params["fields"].split(","))
+            for nome in list(fields):
+                if nome not in permitidos:
+                    fields.pop(nome)
+        return fields
+
+
+class MovimentacaoEstoqueSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
+    campos_expansiveis = {
+        "estoque": "id_estoque",
+        "produto": "id_produto",
+        "cliente": "id_cliente",
+    }
+
     estoque = EstoqueSerializer(source="id_estoque", read_only=True)
     produto = ProdutoSerializer(source="id_produto", read_only=True)
     cliente = ClienteSerializer(source="id_cliente", read_only=True)
@@ -113,3 +202,72 @@ class MovimentacaoEstoqueSerializer(serializers.ModelSerializer):
             "produto",
             "cliente",
         ]
+
+    def create(self, validated_data):
+        try:
+            return super().create(validated_data)
+        except EstoqueInsuficiente as exc:
+            raise serializers.ValidationError({"quantidade": [str(exc)]})
+
+    def update(self, instance, validated_data):
+        try:
+            return super().update(instance, validated_data)
+        except EstoqueInsuficiente as exc:
+            raise serializers.ValidationError({"quantidade": [str(exc)]})
+
+    def to_representation(self, instance):
+        # repassa o estoque anotado por com_estoque_produto() ao produto aninhado
+        if hasattr(instance, "estoque_produto"):
+            instance.id_produto.estoque_atual = instance.estoque_produto
+        return super().to_representation(instance)
+
+
+class MovimentacaoEstoqueLoteSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        attrs = super().to_internal_value(data)
+        # confere as chaves estrangeiras do lote inteiro com uma consulta por tabela
+        modelos = {"id_produto": Produto, "id_estoque": Estoque, "id_cliente": Cliente}
+        existentes = {
+            campo: set(
+                modelo.objects.filter(
+                    pk__in={item[campo] for item in attrs if item.get(campo) is not None}
+                ).values_list("pk", flat=True)
+            )
+            for campo, modelo in modelos.items()
+        }
+        erros = []
+        for item in attrs:
+            erro = {
+                campo: [f"Pk inválido \"{item[campo]}\" - objeto não existe."]
+                for campo in modelos
+                if item.get(campo) is not None and item[campo] not in existentes[campo]
+            }
+            erros.append(erro)
+        if any(erros):
+            raise serializers.ValidationError(erros)
+        return attrs
+
+
+class MovimentacaoEstoqueItemSerializer(serializers.Serializer):
+    """Item do lote validado sem consultas por linha; ver MovimentacaoEstoqueLoteSerializer."""
+
+    id_produto = serializers.IntegerField()
+    id_estoque = serializers.IntegerField()
+    id_cliente = serializers.IntegerField(required=False, allow_null=True)
+    # limite do PositiveIntegerField: acima dele o banco recusaria o lote inteiro (500)
+    quantidade = serializers.IntegerField(min_value=0, max_value=2147483647)
+    tipo = serializers.ChoiceField(choices=MovimentacaoEstoque.TIPO_CHOICES, default="E")
+    movimentedAt = serializers.DateTimeField(required=False)
+
+    class Meta:
+        list_serializer_class = MovimentacaoEstoqueLoteSerializer
+
+    def to_model(self, item):
+        return MovimentacaoEstoque(
+            id_produto_id=item["id_produto"],
+            id_estoque_id=item["id_estoque"],
+            id_cliente_id=item.get("id_cliente"),
+            quantidade=item["quantidade"],
+            tipo=item["tipo"],
+            **({"movimentedAt": item["movimentedAt"]} if "movimentedAt" in item else {}),
+        )
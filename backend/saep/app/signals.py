@@ -0,0 +1,72 @@
+from functools import partial
+
+from django.apps import apps
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from . import cache_api, eventos
+from .authentication import esquecer_usuario
+from .models import (
+    Estoque,
+    MovimentacaoEstoque,
+    Produto,
+    ProdutoTermo,
+    SaldoEstoque,
+    SaldoSnapshot,
+    Usuario,
+    registrar_resumos,
+)
+
+
+@receiver(post_delete, sender=MovimentacaoEstoque)
+def estornar_saldo(sender, instance, **kwargs):
+    # sem a linha de saldo o produto ou o estoque está sendo excluído em cascata e
+    # não há o que estornar (nem snapshot a corrigir); senão estornar uma entrada é
+    # uma saída e passa pela mesma checagem (EstoqueInsuficiente desfaz a exclusão)
+    if SaldoEstoque.objects.filter(
+        id_produto_id=instance.id_produto_id, id_estoque_id=instance.id_estoque_id
+    ).exists():
+        SaldoEstoque.aplicar(instance.id_produto_id, instance.id_estoque_id, -instance.delta)
+        SaldoSnapshot.aplicar([instance], sinal=-1)
+    registrar_resumos(removidas=[instance])
+
+
+@receiver(post_delete, sender=Estoque)
+def remarcar_abaixo_minimo(sender, instance, **kwargs):
+    # os saldos do estoque saíram em cascata, sem passar por SaldoEstoque.aplicar
+    Produto.objects.filter(estoque_minimo__gt=0).marcar_abaixo_minimo()
+
+
+@receiver(post_save, sender=MovimentacaoEstoque)
+def publicar_movimentacao(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(partial(eventos.publicar_movimentacoes, [instance.pk]))
+
+
+@receiver(post_save, sender=Produto)
+def indexar_produto(sender, instance, raw=False, **kwargs):
+    if not raw:
+        ProdutoTermo.indexar([instance])
+
+
+def invalidar_cache_api(sender, raw=False, **kwargs):
+    if not raw:
+        cache_api.invalidar_modelo(sender)
+
+
+# só os modelos que aparecem nas respostas: um receptor de post_delete num modelo
+# impede o fast delete dele (saldos, snapshots, termos e resumos são apagados em
+# massa, e quem faz isso invalida o cache por conta própria)
+for _nome in cache_api.DEPENDENCIAS:
+    _modelo = apps.get_model("app", _nome)
+    post_save.connect(invalidar_cache_api, sender=_modelo, dispatch_uid=f"invalidar_cache_api_{_nome}")
+    post_delete.connect(invalidar_cache_api, sender=_modelo, dispatch_uid=f"invalidar_cache_api_{_nome}")
+
+
+@receiver(post_save, sender=Usuario)
+@receiver(post_delete, sender=Usuario)
+def esquecer_usuario_autenticado(sender, instance, **kwargs):
+    # a chave do cache é o campo que o token identifica (USER_ID_FIELD)
+    esquecer_usuario(getattr(instance, api_settings.USER_ID_FIELD))
@@ -1,3 +1,1735 @@
-from django.test import TestCase
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from base64 import urlsafe_b64encode
+from contextlib import aclosing
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from importlib import import_module
+from io import BytesIO, StringIO
+from pathlib import Path
+from threading import Barrier, Thread
+from unittest import mock, skipUnless
+from uuid import UUID
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.apps import apps as django_apps
+from django.conf import settings
+from django.core.cache import cache
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command, CommandError
+from django.db import connection, connections, IntegrityError, OperationalError, transaction
+from django.db.models import F
+from django.db.migrations.executor import MigrationExecutor
+from django.db.models.deletion import Collector
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from saep import ambiente
+
+from . import busca, eventos, metricas, previsao, roteamento
+from .authentication import TokenStream, carregar_usuario, usuarios_em_cache
+from .models import (
+    Usuario,
+    Categoria,
+    Cliente,
+    Estoque,
+    Produto,
+    MovimentacaoEstoque,
+    MovimentacaoDiaria,
+    MovimentacaoClienteDiaria,
+    PrevisaoReposicao,
+    SaldoEstoque,
+    SaldoSnapshot,
+    ProdutoTermo,
+    EstoqueInsuficiente,
+)
+from .pagination import CursorPaginacao
+from .parsers import JSONRapidoParser
+from .renderers import JSONRapidoRenderer
+from .serializers import ProdutoSerializer
+from .views import MovimentacaoEstoqueViewSet, ProdutoViewSet, StreamIndisponivel
+
+
+SENHA = "senha123"
+
+
+def criar_usuario(email="teste@example.com", nome="Teste"):
+    return Usuario.objects.create_user(email, nome, SENHA)
+
+
+def cliente_api(usuario):
+    cliente = APIClient()
+    cliente.force_authenticate(usuario)
+    return cliente
+
+
+class DadosBase:
+    """Usuário, estoque "Central" e ``self.client`` autenticado, com os caches limpos."""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        usuarios_em_cache.clear()
+        self.usuario = criar_usuario()
+        self.estoque = Estoque.objects.create(setor="Central", descricao="Depósito")
+        self.client = cliente_api(self.usuario)
+
+    def criar_produto(self, sku="SKU-1", nome="Produto", **campos):
+        return Produto.objects.create(
+            nome=nome, descricao="", sku=sku, id_usuario=self.usuario, **campos
+        )
+
+
+class ApiTestCase(DadosBase, TestCase):
+    pass
+
+
+class SaldoEstoqueTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto()
+
+    def movimentar(self, quantidade, tipo="E", estoque=None):
+        return MovimentacaoEstoque.objects.create(
+            id_produto=self.produto,
+            id_estoque=estoque or self.estoque,
+            quantidade=quantidade,
+            tipo=tipo,
+        )
+
+    def test_saldo_acompanha_movimentacoes(self):
+        outro = Estoque.objects.create(setor="Loja", descricao="Loja 1")
+        self.movimentar(20)
+        self.movimentar(5, "S")
+        self.movimentar(7, estoque=outro)
+        with self.assertRaises(EstoqueInsuficiente):
+            self.movimentar(8, "S", estoque=outro)
+        self.assertEqual(self.produto.calcular_estoque(), 22)
+        self.assertEqual(self.produto.calcular_estoque(self.estoque), 15)
+        self.assertEqual(self.produto.calcular_estoque(outro), 7)
+
+    def test_edicao_e_exclusao_estornam_saldo(self):
+        movimentacao = self.movimentar(20)
+        self.movimentar(10)
+        movimentacao.quantidade = 8
+        movimentacao.tipo = "S"
+        movimentacao.save()
+        self.assertEqual(self.produto.calcular_estoque(), 2)
+        movimentacao.delete()
+        self.assertEqual(self.produto.calcular_estoque(), 10)
+
+    def test_saida_intercalada_nao_vende_a_mais(self):
+        # outra saída consome o saldo entre a validação e o UPDATE desta
+        self.movimentar(5)
+        aplicar = SaldoEstoque.aplicar.__func__
+        intercaladas = []
+
+        def aplicar_intercalado(cls, produto_id, estoque_id, delta):
+            if delta < 0 and not intercaladas:
+                intercaladas.append(delta)
+                SaldoEstoque.objects.filter(id_produto_id=produto_id, id_estoque_id=estoque_id).update(
+                    quantidade=F("quantidade") - 5
+                )
+            return aplicar(cls, produto_id, estoque_id, delta)
+
+        with mock.patch.object(SaldoEstoque, "aplicar", classmethod(aplicar_intercalado)):
+            with self.assertRaises(EstoqueInsuficiente):
+                self.movimentar(5, "S")
+        self.assertEqual(intercaladas, [-5])
+        self.assertFalse(MovimentacaoEstoque.objects.filter(tipo="S").exists())
+
+    def test_excluir_entrada_nao_deixa_saldo_negativo(self):
+        entrada = self.movimentar(10)
+        self.movimentar(6, "S")
+        with self.assertRaises(EstoqueInsuficiente):
+            with transaction.atomic():
+                entrada.delete()
+        self.assertTrue(MovimentacaoEstoque.objects.filter(pk=entrada.pk).exists())
+        self.assertEqual(self.produto.calcular_estoque(), 4)
+
+    def test_excluir_produto_em_cascata(self):
+        self.movimentar(10)
+        self.movimentar(6, "S")
+        self.produto.delete()
+        self.assertFalse(SaldoEstoque.objects.exists())
+        self.assertFalse(MovimentacaoEstoque.objects.exists())
+
+    def test_leitura_do_saldo_usa_uma_consulta(self):
+        self.movimentar(20)
+        with self.assertNumQueries(1):
+            self.produto.calcular_estoque()
+
+    def test_recalcular_saldos_reconstroi_e_confere(self):
+        self.movimentar(20)
+        self.movimentar(5, "S")
+        SaldoEstoque.objects.update(quantidade=999)
+        with self.assertRaises(CommandError):
+            call_command("recalcular_saldos", "--verificar", stdout=StringIO())
+        call_command("recalcular_saldos", stdout=StringIO())
+        self.assertEqual(self.produto.calcular_estoque(), 15)
+
+
+class ProdutoListagemTests(ApiTestCase):
+    def criar_produtos(self, quantidade):
+        inicio = Produto.objects.count()
+        for i in range(inicio, inicio + quantidade):
+            produto = Produto.objects.create(
+                nome=f"Produto {i}", descricao="", sku=f"SKU-{i}", id_usuario=self.usuario
+            )
+            MovimentacaoEstoque.objects.create(
+                id_produto=produto, id_estoque=self.estoque, quantidade=i + 1
+            )
+
+    def test_listagem_nao_consulta_estoque_por_produto(self):
+        self.criar_produtos(3)
+        with self.assertNumQueries(1):
+            self.client.get("/api/v1/produtos/")
+        self.criar_produtos(20)
+        with self.assertNumQueries(1):
+            resposta = self.client.get("/api/v1/produtos/")
+        estoques = {p["sku"]: p["estoque_atual"] for p in resposta.json()["results"]}
+        self.assertEqual(estoques["SKU-0"], 1)
+        self.assertEqual(len(estoques), 23)
+
+    def test_detalhe_usa_estoque_anotado(self):
+        self.criar_produtos(1)
+        produto = Produto.objects.get()
+        with self.assertNumQueries(1):
+            resposta = self.client.get(f"/api/v1/produtos/{produto.pk}/")
+        self.assertEqual(resposta.json()["estoque_atual"], 1)
+
+
+class PaginacaoTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto()
+
+    def movimentar(self, quantidade):
+        return MovimentacaoEstoque.objects.create(
+            id_produto=self.produto, id_estoque=self.estoque, quantidade=quantidade
+        )
+
+    def test_cursor_estavel_com_insercoes(self):
+        for i in range(5):
+            self.movimentar(i + 1)
+        pagina = self.client.get("/api/v1/movimentacoes/?page_size=2").json()
+        vistos = [m["id"] for m in pagina["results"]]
+        self.movimentar(99)
+        while pagina["next"]:
+            pagina = self.client.get(pagina["next"]).json()
+            vistos += [m["id"] for m in pagina["results"]]
+        esperado = list(
+            MovimentacaoEstoque.objects.order_by("movimentedAt", "id").values_list("id", flat=True)
+        )
+        self.assertEqual(vistos, esperado)
+
+    def percorrer(self, url):
+        paginas = [self.client.get(url).json()]
+        while paginas[-1]["next"]:
+            paginas.append(self.client.get(paginas[-1]["next"]).json())
+        return paginas
+
+    def test_empates_em_mais_de_uma_pagina(self):
+        for i in range(7):
+            Produto.objects.create(nome="Produto", descricao="", sku=f"SKU-E{i}", id_usuario=self.usuario)
+        momento = timezone.now()
+        for i in range(7):
+            MovimentacaoEstoque.objects.create(
+                id_produto=self.produto, id_estoque=self.estoque, quantidade=1, movimentedAt=momento
+            )
+        for url, modelo in (
+            ("/api/v1/produtos/?page_size=3", Produto),
+            ("/api/v1/movimentacoes/?page_size=3", MovimentacaoEstoque),
+        ):
+            paginas = self.percorrer(url)
+            vistos = [item["id"] for pagina in paginas for item in pagina["results"]]
+            self.assertEqual(vistos, sorted(modelo.objects.values_list("id", flat=True)))
+            self.assertEqual(len(paginas), 3)
+            anterior = self.client.get(paginas[-1]["previous"]).json()
+            self.assertEqual(anterior["results"], paginas[1]["results"])
+
+    def test_cursor_adulterado_devolve_400(self):
+        resposta = self.client.get("/api/v1/movimentacoes/", {"cursor": "bm9wZQ=="})
+        self.assertEqual(resposta.status_code, 400)
+        cursor = urlsafe_b64encode(json.dumps([["x", "y"], False]).encode()).decode()
+        resposta = self.client.get("/api/v1/movimentacoes/", {"cursor": cursor})
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_page_size_limitado(self):
+        for i in range(3):
+            self.movimentar(1)
+        with mock.patch.object(CursorPaginacao, "max_page_size", 2):
+            resposta = self.client.get("/api/v1/movimentacoes/?page_size=100000")
+        self.assertEqual(len(resposta.json()["results"]), 2)
+
+
+class MovimentacaoListagemTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cliente = Cliente.objects.create(nome="Cliente", email="c@example.com", telefone="1")
+
+    def criar_movimentacoes(self, quantidade):
+        inicio = Produto.objects.count()
+        for i in range(inicio, inicio + quantidade):
+            produto = Produto.objects.create(
+                nome=f"Produto {i}", descricao="", sku=f"SKU-{i}", id_usuario=self.usuario
+            )
+            MovimentacaoEstoque.objects.create(
+                id_produto=produto, id_estoque=self.estoque, id_cliente=self.cliente, quantidade=3
+            )
+
+    def test_listagem_aninhada_sem_n_mais_um(self):
+        self.criar_movimentacoes(2)
+        with self.assertNumQueries(1):
+            self.client.get("/api/v1/movimentacoes/")
+        self.criar_movimentacoes(15)
+        with self.assertNumQueries(1):
+            resposta = self.client.get("/api/v1/movimentacoes/")
+        primeira = resposta.json()["results"][0]
+        self.assertEqual(primeira["produto"]["estoque_atual"], 3)
+        self.assertEqual(primeira["cliente"]["nome"], "Cliente")
+
+    def test_expand_e_fields(self):
+        self.criar_movimentacoes(1)
+        primeira = self.client.get("/api/v1/movimentacoes/?expand=").json()["results"][0]
+        self.assertNotIn("produto", primeira)
+        self.assertIn("id_produto", primeira)
+        primeira = self.client.get("/api/v1/movimentacoes/?expand=estoque").json()["results"][0]
+        self.assertEqual(set(primeira) & {"estoque", "produto", "cliente"}, {"estoque"})
+        primeira = self.client.get("/api/v1/movimentacoes/?fields=id,quantidade").json()["results"][0]
+        self.assertEqual(set(primeira), {"id", "quantidade"})
+
+
+class IndicesMovimentacaoTests(ApiTestCase):
+    """Confere pelo EXPLAIN que as consultas quentes usam os índices compostos."""
+
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto()
+
+    def assertUsaIndice(self, queryset, indice, somente_indice=False):
+        plano = queryset.explain()
+        self.assertIn(indice, plano)
+        if connection.vendor == "sqlite":
+            self.assertIn("COVERING INDEX" if somente_indice else "USING", plano)
+        elif connection.vendor == "mysql" and somente_indice:
+            self.assertIn("Using index", plano)
+
+    def test_soma_por_produto_e_tipo_le_somente_o_indice(self):
+        qs = MovimentacaoEstoque.objects.filter(id_produto=self.produto, tipo="S").values("quantidade")
+        self.assertUsaIndice(qs, "mov_produto_tipo_qtd_idx", somente_indice=True)
+
+    def test_periodo_por_estoque_usa_faixa_do_indice(self):
+        agora = timezone.now()
+        qs = MovimentacaoEstoque.objects.filter(
+            id_estoque=self.estoque,
+            movimentedAt__gte=agora - timedelta(days=30),
+            movimentedAt__lt=agora,
+        )
+        self.assertUsaIndice(qs, "mov_estoque_data_idx")
+
+    def test_sku_unico(self):
+        with self.assertRaises(IntegrityError):
+            Produto.objects.create(nome="Outro", descricao="", sku="SKU-1", id_usuario=self.usuario)
+
+
+class MovimentacaoLoteTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.produtos = [
+            self.criar_produto(f"SKU-{i}", f"Produto {i}", estoque_minimo=10) for i in range(3)
+        ]
+
+    def test_lote_cria_movimentacoes_e_atualiza_saldos(self):
+        itens = [
+            {"id_produto": p.pk, "id_estoque": self.estoque.pk, "quantidade": 4}
+            for p in self.produtos
+            for _ in range(50)
+        ]
+        itens.append({"id_produto": self.produtos[0].pk, "id_estoque": self.estoque.pk,
+                      "quantidade": 195, "tipo": "S"})
+        with self.assertNoLogs("app.metricas", "WARNING"):
+            resposta = self.client.post("/api/v1/movimentacoes/bulk/", itens, format="json")
+        self.assertEqual(resposta.status_code, 201)
+        corpo = resposta.json()
+        self.assertEqual(corpo["criadas"], 151)
+        self.assertEqual(MovimentacaoEstoque.objects.count(), 151)
+        self.assertEqual(self.produtos[0].calcular_estoque(), 5)
+        self.assertEqual(self.produtos[1].calcular_estoque(), 200)
+        self.assertTrue(corpo["resultados"][0]["estoque_abaixo_minimo"])
+        self.assertFalse(corpo["resultados"][50]["estoque_abaixo_minimo"])
+
+    def test_ids_na_resposta_sem_returning(self):
+        # como no MySQL: o bulk_create não preenche os pks
+        MovimentacaoEstoque.objects.create(
+            id_produto=self.produtos[2], id_estoque=self.estoque, quantidade=1
+        )
+        itens = [
+            {"id_produto": p.pk, "id_estoque": self.estoque.pk, "quantidade": i + 1}
+            for i, p in enumerate(self.produtos * 2)
+        ]
+        with mock.patch.object(
+            type(connection.features), "can_return_rows_from_bulk_insert", False
+        ), self.captureOnCommitCallbacks(execute=True):
+            resposta = self.client.post("/api/v1/movimentacoes/bulk/", itens, format="json")
+        self.assertEqual(resposta.status_code, 201)
+        ids = [resultado["id"] for resultado in resposta.json()["resultados"]]
+        self.assertNotIn(None, ids)
+        self.assertEqual(
+            list(MovimentacaoEstoque.objects.filter(pk__in=ids).order_by("pk").values_list("quantidade", flat=True)),
+            [1, 2, 3, 4, 5, 6],
+        )
+        self.assertEqual(ids, sorted(ids))
+
+    def test_saida_confere_saldo_na_ordem_do_lote(self):
+        produto = self.produtos[0].pk
+        MovimentacaoEstoque.objects.create(
+            id_produto_id=produto, id_estoque=self.estoque, quantidade=5
+        )
+        item = {"id_produto": produto, "id_estoque": self.estoque.pk}
+        resposta = self.client.post(
+            "/api/v1/movimentacoes/bulk/",
+            [{**item, "quantidade": 8, "tipo": "S"}, {**item, "quantidade": 10}],
+            format="json",
+        )
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(MovimentacaoEstoque.objects.count(), 1)
+        self.assertEqual(self.produtos[0].calcular_estoque(), 5)
+        resposta = self.client.post(
+            "/api/v1/movimentacoes/bulk/",
+            [{**item, "quantidade": 10}, {**item, "quantidade": 8, "tipo": "S"}],
+            format="json",
+        )
+        self.assertEqual(resposta.status_code, 201)
+        self.assertEqual(self.produtos[0].calcular_estoque(), 7)
+
+    def test_quantidade_acima_do_limite_do_campo(self):
+        resposta = self.client.post(
+            "/api/v1/movimentacoes/bulk/",
+            [{"id_produto": self.produtos[0].pk, "id_estoque": self.estoque.pk,
+              "quantidade": 2**31}],
+            format="json",
+        )
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("quantidade", resposta.json()[0])
+
+    def test_lote_invalido_nao_grava_nada(self):
+        itens = [
+            {"id_produto": self.produtos[0].pk, "id_estoque": self.estoque.pk, "quantidade": 1},
+            {"id_produto": 9999, "id_estoque": self.estoque.pk, "quantidade": 1},
+        ]
+        resposta = self.client.post("/api/v1/movimentacoes/bulk/", itens, format="json")
+        self.assertEqual(resposta.status_code, 400)
+        self.assertEqual(resposta.json()[0], {})
+        self.assertIn("id_produto", resposta.json()[1])
+        self.assertEqual(MovimentacaoEstoque.objects.count(), 0)
+
+
+class MigracaoSkuUnicoTests(TransactionTestCase):
+    antes = [("app", "0005_indices_paginacao")]
+    depois = [("app", "0006_indices_movimentacao_sku_unico")]
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_sku_duplicado_para_a_migracao_com_mensagem(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.antes)
+        modelos = executor.loader.project_state(self.antes).apps
+        Usuario = modelos.get_model("app", "Usuario")
+        Produto = modelos.get_model("app", "Produto")
+        usuario = Usuario.objects.create(email="teste@example.com", nome="Teste")
+        for sku in ("SKU-1", "SKU-1", "SKU-2"):
+            Produto.objects.create(nome="P", descricao="", sku=sku, id_usuario=usuario)
+
+        executor = MigrationExecutor(connection)
+        with self.assertRaisesMessage(CommandError, "'SKU-1' (2 produtos)"):
+            executor.migrate(self.depois)
+
+        Produto.objects.filter(sku="SKU-1").latest("id").delete()
+        MigrationExecutor(connection).migrate(self.depois)
+
+
+class SaidaConcorrenteTests(DadosBase, TransactionTestCase):
+    """Várias threads retirando do mesmo saldo ao mesmo tempo nunca vendem a mais."""
+
+    THREADS = 8
+    TENTATIVAS = 10
+
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto()
+        self.outro = self.criar_produto("SKU-2", "Outro")
+        for produto in (self.produto, self.outro):
+            MovimentacaoEstoque.objects.create(
+                id_produto=produto, id_estoque=self.estoque, quantidade=30
+            )
+
+    def retirar(self, produto):
+        try:
+            MovimentacaoEstoque.objects.create(
+                id_produto=produto, id_estoque=self.estoque, quantidade=1, tipo="S"
+            )
+            return True
+        except EstoqueInsuficiente:
+            return False
+        except OperationalError:
+            # o SQLite recusa escritores simultâneos em vez de esperar; tenta de novo
+            return self.retirar(produto)
+
+    def test_saidas_concorrentes_nao_divergem_do_historico(self):
+        if not connection.features.test_db_allows_multiple_connections and not (
+            connection.vendor == "sqlite" and not connection.is_in_memory_db()
+        ):
+            self.skipTest("Banco de teste em memória: rode com SAEP_DB_TEST_NAME.")
+        largada = Barrier(self.THREADS)
+        sucessos = []
+
+        def trabalhador(indice):
+            produto = self.produto if indice % 2 else self.outro
+            largada.wait()
+            try:
+                for _ in range(self.TENTATIVAS):
+                    if self.retirar(produto):
+                        sucessos.append(produto.pk)
+            finally:
+                connections.close_all()
+
+        threads = [Thread(target=trabalhador, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for produto in (self.produto, self.outro):
+            self.assertEqual(sucessos.count(produto.pk), 30)
+            self.assertEqual(produto.calcular_estoque(), 0)
+        call_command("recalcular_saldos", "--verificar", stdout=StringIO())
+
+
+class AbaixoMinimoTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.central = self.estoque
+        self.loja = Estoque.objects.create(setor="Loja", descricao="Loja 1")
+
+    def produto(self, sku, minimo, **saldos):
+        produto = self.criar_produto(sku, sku, estoque_minimo=minimo)
+        for setor, quantidade in saldos.items():
+            MovimentacaoEstoque.objects.create(
+                id_produto=produto, id_estoque=getattr(self, setor), quantidade=quantidade
+            )
+        return produto
+
+    def skus(self, url):
+        with self.assertNumQueries(1):
+            resposta = self.client.get(url)
+        return [p["sku"] for p in resposta.json()["results"]]
+
+    def test_lista_produtos_abaixo_do_minimo(self):
+        self.produto("A", 10, central=3)
+        self.produto("B", 10, central=8, loja=8)
+        self.produto("C", 5)
+        self.produto("D", 0)
+        self.assertEqual(self.skus("/api/v1/produtos/abaixo-minimo/"), ["A", "C"])
+        self.assertEqual(
+            self.skus(f"/api/v1/produtos/abaixo-minimo/?estoque={self.loja.pk}"), ["A", "B", "C"]
+        )
+
+    def test_marcacao_acompanha_saldo_e_minimo(self):
+        def marcados():
+            return set(
+                Produto.objects.filter(abaixo_minimo=True).values_list("sku", flat=True)
+            )
+
+        a = self.produto("A", 10, central=3)
+        b = self.produto("B", 5, loja=8)
+        self.assertEqual(marcados(), {"A"})
+        MovimentacaoEstoque.objects.create(id_produto=a, id_estoque=self.central, quantidade=7)
+        MovimentacaoEstoque.objects.create(
+            id_produto=b, id_estoque=self.loja, quantidade=4, tipo="S"
+        )
+        self.assertEqual(marcados(), {"B"})
+        a.estoque_minimo = 11
+        a.save()
+        self.assertEqual(marcados(), {"A", "B"})
+        MovimentacaoEstoque.objects.criar_em_lote([
+            MovimentacaoEstoque(id_produto=a, id_estoque=self.loja, quantidade=1),
+            MovimentacaoEstoque(id_produto=b, id_estoque=self.central, quantidade=1),
+        ])
+        self.assertEqual(marcados(), set())
+        self.loja.delete()
+        self.assertEqual(marcados(), {"A", "B"})
+        sql = str(Produto.objects.abaixo_minimo().query).split(" WHERE ")[-1]
+        self.assertNotIn("SELECT", sql)
+
+
+class ExportacaoTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto()
+        inicio = timezone.make_aware(datetime(2025, 1, 1))
+        for dia in range(10):
+            MovimentacaoEstoque.objects.create(
+                id_produto=self.produto, id_estoque=self.estoque,
+                quantidade=dia + 1, movimentedAt=inicio + timedelta(days=dia),
+            )
+
+    def conteudo(self, url):
+        resposta = self.client.get(url)
+        self.assertEqual(resposta.status_code, 200)
+        return b"".join(resposta.streaming_content).decode()
+
+    def test_exporta_csv_em_lotes(self):
+        with mock.patch.object(MovimentacaoEstoqueViewSet, "lote_exportacao", 3):
+            linhas = self.conteudo("/api/v1/movimentacoes/export/?format=csv").splitlines()
+        self.assertEqual(linhas[0].split(","), list(MovimentacaoEstoqueViewSet.campos_exportacao))
+        self.assertEqual(len(linhas), 11)
+        self.assertIn("2025-01-01T00:00:00+00:00", linhas[1])
+
+    def test_exporta_ndjson_com_periodo(self):
+        conteudo = self.conteudo(
+            "/api/v1/movimentacoes/export/?format=ndjson&from=2025-01-03&to=2025-01-05"
+        )
+        quantidades = [json.loads(linha)["quantidade"] for linha in conteudo.splitlines()]
+        self.assertEqual(quantidades, [3, 4, 5])
+
+    def test_periodo_invalido(self):
+        resposta = self.client.get("/api/v1/movimentacoes/export/?format=ndjson&from=ontem")
+        self.assertEqual(resposta.status_code, 400)
+
+    async def test_asgi_le_lote_a_lote(self):
+        lotes = []
+        ler_lote = MovimentacaoEstoqueViewSet.ler_lote
+
+        def contar(view, qs, ultimo):
+            lotes.append(ultimo)
+            return ler_lote(view, qs, ultimo)
+
+        token = f"Bearer {AccessToken.for_user(self.usuario)}"
+        with mock.patch.object(MovimentacaoEstoqueViewSet, "lote_exportacao", 3), \
+                mock.patch.object(MovimentacaoEstoqueViewSet, "ler_lote", contar):
+            resposta = await self.async_client.get(
+                "/api/v1/movimentacoes/export/", {"format": "ndjson"},
+                headers={"authorization": token},
+            )
+            self.assertEqual(resposta.status_code, 200)
+            self.assertTrue(resposta.is_async)
+            partes = aiter(resposta.streaming_content)
+            await anext(partes)
+            await anext(partes)
+            self.assertEqual(len(lotes), 1)
+            resto = [parte async for parte in partes]
+        self.assertEqual(len(resto), 9)
+        self.assertEqual(len(lotes), 4)
+        self.assertEqual(json.loads(resto[-1])["quantidade"], 10)
+
+
+class SaldoSnapshotTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto()
+        self.inicio = timezone.make_aware(datetime(2025, 1, 1))
+
+    def movimentar(self, dia, quantidade, tipo="E"):
+        MovimentacaoEstoque.objects.create(
+            id_produto=self.produto, id_estoque=self.estoque, quantidade=quantidade,
+            tipo=tipo, movimentedAt=self.inicio + timedelta(days=dia, hours=12),
+        )
+
+    def estoque_em(self, data):
+        resposta = self.client.get(f"/api/v1/produtos/{self.produto.pk}/?as_of={data}")
+        return resposta.json()["estoque_atual"]
+
+    def test_estoque_em_data_com_e_sem_snapshot(self):
+        self.movimentar(0, 10)
+        self.movimentar(40, 5, "S")
+        self.movimentar(70, 8)
+        self.assertEqual(self.estoque_em("2025-01-31"), 10)
+        call_command("gerar_snapshots", "--periodo", "mensal", "--data", "2025-02-10", stdout=StringIO())
+        call_command("gerar_snapshots", "--data", "2025-03-01", stdout=StringIO())
+        self.assertEqual(SaldoSnapshot.objects.count(), 2)
+        self.assertEqual(self.estoque_em("2025-01-31"), 10)
+        self.assertEqual(self.estoque_em("2025-02-10"), 5)
+        self.assertEqual(self.estoque_em("2025-03-15"), 13)
+        resposta = self.client.get("/api/v1/produtos/?as_of=2025-02-10")
+        self.assertEqual(resposta.json()["results"][0]["estoque_atual"], 5)
+
+    def snapshots(self):
+        # mês do corte -> quantidade do produto
+        return dict(
+            SaldoSnapshot.objects.filter(id_produto=self.produto).values_list("momento__month", "quantidade")
+        )
+
+    def test_movimentacao_retroativa_atualiza_snapshots_do_par(self):
+        outro = Produto.objects.create(nome="Outro", descricao="", sku="SKU-2", id_usuario=self.usuario)
+        MovimentacaoEstoque.objects.create(
+            id_produto=outro, id_estoque=self.estoque, quantidade=7, movimentedAt=self.inicio
+        )
+        self.movimentar(0, 10)
+        call_command("gerar_snapshots", "--periodo", "mensal", "--data", "2025-02-01", stdout=StringIO())
+        call_command("gerar_snapshots", "--periodo", "mensal", "--data", "2025-03-01", stdout=StringIO())
+        self.movimentar(40, 4)
+        self.assertEqual(self.snapshots(), {2: 10, 3: 14})
+        self.movimentar(20, 3, "S")
+        self.assertEqual(self.snapshots(), {2: 7, 3: 11})
+        self.assertEqual(
+            list(SaldoSnapshot.objects.filter(id_produto=outro).values_list("quantidade", flat=True)),
+            [7, 7],
+        )
+        self.assertEqual(self.estoque_em("2025-03-01"), 11)
+
+        movimentacao = MovimentacaoEstoque.objects.get(tipo="S")
+        movimentacao.quantidade = 1
+        movimentacao.save()
+        self.assertEqual(self.snapshots(), {2: 9, 3: 13})
+        movimentacao.delete()
+        self.assertEqual(self.snapshots(), {2: 10, 3: 14})
+        self.assertEqual(self.estoque_em("2025-02-05"), 10)
+        self.assertEqual(self.estoque_em("2025-02-15"), 14)
+
+    def test_par_sem_linha_no_snapshot_ganha_a_linha(self):
+        loja = Estoque.objects.create(setor="Loja", descricao="Loja 1")
+        self.movimentar(0, 10)
+        call_command("gerar_snapshots", "--data", "2025-03-01", stdout=StringIO())
+        MovimentacaoEstoque.objects.create(
+            id_produto=self.produto, id_estoque=loja, quantidade=5,
+            movimentedAt=self.inicio + timedelta(days=20),
+        )
+        self.assertEqual(
+            dict(SaldoSnapshot.objects.values_list("id_estoque", "quantidade")),
+            {self.estoque.pk: 10, loja.pk: 5},
+        )
+        # o próximo corte parte deste, que continua completo
+        self.movimentar(70, 3)
+        call_command("gerar_snapshots", "--data", "2025-04-01", stdout=StringIO())
+        self.assertEqual(self.estoque_em("2025-04-15"), 18)
+        SaldoSnapshot.objects.filter(momento__lt=timezone.make_aware(datetime(2025, 4, 1))).delete()
+        self.assertEqual(self.estoque_em("2025-04-15"), 18)
+
+    def test_excluir_produto_com_snapshots(self):
+        self.movimentar(0, 10)
+        call_command("gerar_snapshots", "--data", "2025-03-01", stdout=StringIO())
+        self.produto.delete()
+        self.assertFalse(SaldoSnapshot.objects.exists())
+
+    def test_as_of_invalido(self):
+        resposta = self.client.get(f"/api/v1/produtos/{self.produto.pk}/?as_of=ontem")
+        self.assertEqual(resposta.status_code, 400)
+
+
+class SaldosPorEstoqueTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.central = self.estoque
+        self.loja = Estoque.objects.create(setor="Loja", descricao="Loja 1")
+        self.produtos = [self.criar_produto(f"SKU-{i}", f"P{i}") for i in range(5)]
+        for i, produto in enumerate(self.produtos):
+            MovimentacaoEstoque.objects.create(
+                id_produto=produto, id_estoque=self.central, quantidade=10 + i
+            )
+            MovimentacaoEstoque.objects.create(id_produto=produto, id_estoque=self.loja, quantidade=i + 1)
+
+    def test_saldos_do_produto_por_estoque(self):
+        produto = self.produtos[2]
+        with self.assertNumQueries(2):
+            resposta = self.client.get(f"/api/v1/produtos/{produto.pk}/saldos/")
+        saldos = {s["setor"]: s["quantidade"] for s in resposta.json()}
+        self.assertEqual(saldos, {"Central": 12, "Loja": 3})
+
+    def test_saldos_do_estoque_sem_consulta_por_produto(self):
+        with self.assertNumQueries(2):
+            resposta = self.client.get(f"/api/v1/estoques/{self.loja.pk}/saldos/")
+        saldos = {s["sku"]: s["quantidade"] for s in resposta.json()["results"]}
+        self.assertEqual(saldos, {f"SKU-{i}": i + 1 for i in range(5)})
+
+
+class BuscaProdutoTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        for sku, nome, descricao in (
+            ("TV-001", "Smart TV Zeta", "Televisão 50 polegadas"),
+            ("NOTE-001", "Notebook Ômega", "Notebook com tela de 15 polegadas"),
+            ("SMART-001", "Smartphone X", "Celular de entrada"),
+        ):
+            Produto.objects.create(nome=nome, descricao=descricao, sku=sku, id_usuario=self.usuario)
+
+    def skus(self, params):
+        resposta = self.client.get("/api/v1/produtos/", params)
+        return [p["sku"] for p in resposta.json()["results"]]
+
+    def test_busca_por_prefixo_sem_acento_ordenada_por_relevancia(self):
+        self.assertEqual(self.skus({"search": "smart"}), ["SMART-001", "TV-001"])
+        self.assertEqual(self.skus({"search": "polegadas"}), ["TV-001", "NOTE-001"])
+        self.assertEqual(self.skus({"search": "omega tela"}), ["NOTE-001"])
+        self.assertEqual(self.skus({"search": "omega celular"}), [])
+        pagina = self.client.get("/api/v1/produtos/", {"search": "smart", "page_size": 1}).json()
+        segunda = self.client.get(pagina["next"]).json()
+        self.assertEqual(
+            [p["sku"] for p in pagina["results"] + segunda["results"]], ["SMART-001", "TV-001"]
+        )
+
+    def test_indice_acompanha_edicao(self):
+        produto = Produto.objects.get(sku="TV-001")
+        produto.nome = "Monitor Zeta"
+        produto.save()
+        self.assertEqual(self.skus({"search": "smart"}), ["SMART-001"])
+        self.assertEqual(self.skus({"search": "monitor"}), ["TV-001"])
+
+    def test_sku_exato_e_prefixo(self):
+        self.assertEqual(self.skus({"sku": "NOTE-001"}), ["NOTE-001"])
+        self.assertEqual(self.skus({"sku": "NOTE"}), [])
+        self.assertEqual(self.skus({"sku_prefixo": "SMART-"}), ["SMART-001"])
+        self.assertEqual(self.skus({"sku_prefixo": "smart-"}), ["SMART-001"])
+        self.assertEqual(self.skus({"sku_prefixo": "Note"}), ["NOTE-001"])
+
+    def test_busca_usa_faixa_do_indice(self):
+        plano = ProdutoTermo.objects.filter(busca.faixa_prefixo("smart")).explain()
+        self.assertIn("termo_produto_peso_idx", plano)
+
+    def test_trabalho_limitado_pelo_termo_mais_raro(self):
+        for i in range(5):
+            Produto.objects.create(nome=f"Smart {i}", descricao="", sku=f"S-{i}", id_usuario=self.usuario)
+        with mock.patch.object(busca, "LIMITE_VARREDURA", 3), mock.patch.object(busca, "MAXIMO_CANDIDATOS", 2):
+            self.assertEqual(len(self.skus({"search": "smart"})), 2)
+            # "polegadas" é o mais raro: a varredura parte dele e acha o TV-001
+            self.assertEqual(self.skus({"search": "smart polegadas"}), ["TV-001"])
+            self.assertEqual(self.skus({"search": "polegadas smart"}), ["TV-001"])
+
+    def test_migracao_indexa_em_lotes_como_o_sinal(self):
+        indexados = set(ProdutoTermo.objects.values_list("id_produto", "termo", "peso"))
+        ProdutoTermo.objects.all().delete()
+        migracao = import_module("app.migrations.0008_produtotermo")
+        migracao.indexar_produtos(django_apps, None, lote=2)
+        self.assertEqual(set(ProdutoTermo.objects.values_list("id_produto", "termo", "peso")), indexados)
+
+    def test_benchmark_acima_do_p95_falha(self):
+        with self.assertRaises(CommandError):
+            call_command(
+                "benchmark_busca", "--produtos", "20", "--consultas", "5", "--vocabulario", "50",
+                "--p95-maximo", "0", stdout=StringIO(),
+            )
+
+
+class CacheRespostaTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.categoria = Categoria.objects.create(nome="Smartphones", descricao="Celulares")
+
+    def test_segunda_leitura_nao_consulta_o_banco(self):
+        primeira = self.client.get("/api/v1/categorias/")
+        with self.assertNumQueries(0):
+            segunda = self.client.get("/api/v1/categorias/")
+        self.assertEqual(primeira.content, segunda.content)
+        self.assertEqual(primeira["ETag"], segunda["ETag"])
+
+    def test_gravacao_invalida_o_recurso(self):
+        self.client.get("/api/v1/categorias/")
+        self.categoria.nome = "Celulares"
+        self.categoria.save()
+        resposta = self.client.get("/api/v1/categorias/")
+        self.assertEqual(resposta.json()["results"][0]["nome"], "Celulares")
+
+    def test_movimentacao_invalida_estoque_do_produto(self):
+        estoque = self.estoque
+        produto = self.criar_produto()
+        url = f"/api/v1/produtos/{produto.pk}/"
+        self.assertEqual(self.client.get(url).json()["estoque_atual"], 0)
+        MovimentacaoEstoque.objects.create(id_produto=produto, id_estoque=estoque, quantidade=4)
+        self.assertEqual(self.client.get(url).json()["estoque_atual"], 4)
+
+    def test_if_none_match_devolve_304(self):
+        etag = self.client.get("/api/v1/categorias/")["ETag"]
+        with self.assertNumQueries(0):
+            resposta = self.client.get("/api/v1/categorias/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 304)
+        self.assertEqual(resposta.content, b"")
+
+    def test_cache_nao_dispensa_autenticacao(self):
+        self.client.get("/api/v1/categorias/")
+        self.assertEqual(APIClient().get("/api/v1/categorias/").status_code, 401)
+
+    def test_tabelas_auxiliares_continuam_com_fast_delete(self):
+        coletor = Collector(using="default")
+        for modelo in (SaldoEstoque, SaldoSnapshot, ProdutoTermo, MovimentacaoDiaria):
+            self.assertTrue(coletor.can_fast_delete(modelo.objects.all()), modelo.__name__)
+
+    def test_recalcular_saldos_invalida_produtos(self):
+        estoque = self.estoque
+        produto = self.criar_produto()
+        url = f"/api/v1/produtos/{produto.pk}/"
+        self.assertEqual(self.client.get(url).json()["estoque_atual"], 0)
+        # bulk_create direto, como no seed: sem saldo e sem invalidar o cache
+        MovimentacaoEstoque.objects.bulk_create(
+            [MovimentacaoEstoque(id_produto=produto, id_estoque=estoque, quantidade=9)]
+        )
+        call_command("recalcular_saldos", stdout=StringIO())
+        self.assertEqual(self.client.get(url).json()["estoque_atual"], 9)
+
+
+class AutenticacaoEmCacheTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        resposta = self.client.post(
+            "/api/v1/login/", {"email": self.usuario.email, "password": SENHA}
+        )
+        self.token = resposta.json()["access"]
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {self.token}")
+
+    def test_token_traz_is_active(self):
+        self.assertIs(AccessToken(self.token)["is_active"], True)
+
+    def test_requisicoes_seguintes_nao_consultam_o_usuario(self):
+        self.api.get("/api/v1/logs/")
+        cache.clear()
+        with self.assertNumQueries(1):
+            resposta = self.api.get("/api/v1/logs/")
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_desativacao_vale_logo_apos_o_save(self):
+        self.assertEqual(self.api.get("/api/v1/logs/").status_code, 200)
+        self.usuario.is_active = False
+        self.usuario.save()
+        self.assertEqual(self.api.get("/api/v1/logs/").status_code, 401)
+
+    def test_entrada_expira_pelo_ttl(self):
+        self.api.get("/api/v1/logs/")
+        Usuario.objects.filter(pk=self.usuario.pk).update(is_active=False)
+        self.assertEqual(self.api.get("/api/v1/logs/").status_code, 200)
+        with mock.patch("app.authentication.time.monotonic", return_value=time.monotonic() + 31):
+            self.assertEqual(self.api.get("/api/v1/logs/").status_code, 401)
+
+    def test_troca_de_senha_revoga_token(self):
+        # o simplejwt não relê SIMPLE_JWT com override_settings
+        with mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True):
+            token = AccessToken.for_user(self.usuario)
+            self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(self.api.get("/api/v1/logs/").status_code, 200)
+            self.usuario.set_password("outra456")
+            self.usuario.save()
+            resposta = self.api.get("/api/v1/logs/")
+            self.assertEqual(resposta.status_code, 401)
+            self.assertEqual(resposta.json()["code"], "password_changed")
+
+    def test_usuario_pelo_user_id_field(self):
+        with mock.patch.object(api_settings, "USER_ID_FIELD", "email"):
+            token = AccessToken.for_user(self.usuario)
+            self.assertEqual(token["user_id"], "teste@example.com")
+            self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {token}")
+            self.assertEqual(self.api.get("/api/v1/logs/").status_code, 200)
+            self.usuario.is_active = False
+            self.usuario.save()
+            self.assertEqual(self.api.get("/api/v1/logs/").status_code, 401)
+
+    def test_usuario_em_cache_nao_sobrescreve_senha(self):
+        usuario = carregar_usuario(self.usuario.pk)
+        usuario.nome = "Outro"
+        usuario.save()
+        self.usuario.refresh_from_db()
+        self.assertEqual(self.usuario.nome, "Outro")
+        self.assertTrue(self.usuario.check_password(SENHA))
+
+
+class BenchmarkApiTests(TestCase):
+    escala = {"produtos": 20, "movimentacoes": 200, "clientes": 3, "repeticoes": 1}
+
+    def benchmark(self, orcamento, **opcoes):
+        saida = StringIO()
+        call_command(
+            "benchmark_api", banco_atual=True, orcamento=orcamento, tolerancia=100,
+            stdout=saida, **self.escala, **opcoes,
+        )
+        return saida.getvalue()
+
+    def test_n_mais_um_estoura_orcamento_de_consultas(self):
+        with tempfile.TemporaryDirectory() as pasta:
+            orcamento = Path(pasta) / "orcamento.json"
+            self.benchmark(orcamento, atualizar=True)
+            self.assertIn("produtos-list", json.loads(orcamento.read_text())["endpoints"])
+            self.assertIn("dentro do orçamento", self.benchmark(orcamento))
+
+            with mock.patch.object(
+                ProdutoSerializer, "get_estoque_atual", lambda self, obj: obj.calcular_estoque()
+            ), self.assertLogs("app.metricas", "WARNING"):
+                with self.assertRaisesMessage(CommandError, "produtos-list"):
+                    self.benchmark(orcamento)
+
+
+class SeedTests(TestCase):
+    opcoes = {"produtos": 20, "movimentacoes": 300, "clientes": 5, "seed": 7, "lote": 64, "dias": 30}
+    prefixo = "LOAD7-"
+
+    def gerar(self):
+        # desfeito ao final: a mesma semente não roda duas vezes no mesmo banco
+        agora = timezone.make_aware(datetime(2025, 6, 1, 12))
+        with transaction.atomic(), mock.patch("django.utils.timezone.now", return_value=agora):
+            call_command("seed", stdout=StringIO(), **self.opcoes)
+            call_command("recalcular_saldos", verificar=True, stdout=StringIO())
+            movimentacoes = MovimentacaoEstoque.objects.filter(id_produto__sku__startswith=self.prefixo)
+            resultado = {
+                "produtos": list(
+                    Produto.objects.filter(sku__startswith=self.prefixo)
+                    .order_by("sku").values_list("sku", "estoque_minimo", "abaixo_minimo")
+                ),
+                "clientes": list(
+                    Cliente.objects.filter(email__startswith=self.prefixo.lower())
+                    .order_by("email").values_list("email", "telefone")
+                ),
+                "movimentacoes": list(
+                    movimentacoes.order_by("movimentedAt", "id").values_list(
+                        "id_produto__sku", "id_estoque__setor", "id_cliente__email",
+                        "tipo", "quantidade", "movimentedAt",
+                    )
+                ),
+                "saldos": sorted(
+                    SaldoEstoque.objects.filter(id_produto__sku__startswith=self.prefixo)
+                    .values_list("id_produto__sku", "id_estoque__setor", "quantidade")
+                ),
+            }
+            with self.assertRaisesMessage(CommandError, "--seed 7"):
+                call_command("seed", stdout=StringIO(), **self.opcoes)
+            transaction.set_rollback(True)
+        return resultado
+
+    def test_mesma_semente_gera_a_mesma_carga_no_volume_pedido(self):
+        primeira = self.gerar()
+        self.assertFalse(Produto.objects.filter(sku__startswith=self.prefixo).exists())
+        self.assertEqual(self.gerar(), primeira)
+
+        self.assertEqual(len(primeira["produtos"]), 20)
+        self.assertEqual(len(primeira["clientes"]), 5)
+        self.assertEqual(len(primeira["movimentacoes"]), 300)
+        momentos = [m[-1] for m in primeira["movimentacoes"]]
+        self.assertGreaterEqual(min(momentos), timezone.make_aware(datetime(2025, 5, 2, 12)))
+        self.assertLess(max(momentos), timezone.make_aware(datetime(2025, 6, 1, 12)))
+        self.assertTrue(all(quantidade >= 0 for *_, quantidade in primeira["saldos"]))
+        # a popularidade segue a Zipf: o primeiro produto é o mais movimentado
+        contagem = {}
+        for sku, *_ in primeira["movimentacoes"]:
+            contagem[sku] = contagem.get(sku, 0) + 1
+        self.assertEqual(max(contagem, key=contagem.get), f"{self.prefixo}00000000")
+
+
+class MetricasTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        metricas.registro.limpar()
+
+    def test_server_timing_com_tempo_de_banco_e_consultas(self):
+        resposta = self.client.get("/api/v1/logs/")
+        self.assertRegex(
+            resposta["Server-Timing"], r'^total;dur=[\d.]+, db;dur=[\d.]+, sql;desc="1 consultas"$'
+        )
+
+    def test_metricas_no_formato_prometheus(self):
+        self.client.get("/api/v1/logs/")
+        self.usuario.is_staff = True
+        self.usuario.save()
+        resposta = self.client.get("/api/v1/metrics/")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue(resposta["Content-Type"].startswith("text/plain; version=0.0.4"))
+        texto = resposta.content.decode()
+        self.assertIn('saep_requisicao_segundos_bucket{rota="logs-list",metodo="GET",le="+Inf"} 1', texto)
+        self.assertIn('saep_consultas_por_requisicao_sum{rota="logs-list",metodo="GET"} 1', texto)
+        self.assertIn('saep_requisicoes_total{rota="logs-list",metodo="GET",status="200"} 1', texto)
+
+    def test_metricas_exigem_staff_ou_token(self):
+        self.assertEqual(self.client.get("/api/v1/metrics/").status_code, 403)
+        anonimo = APIClient()
+        with override_settings(SAEP_METRICAS={"TOKEN": "segredo"}):
+            self.assertEqual(
+                anonimo.get("/api/v1/metrics/", HTTP_AUTHORIZATION="Bearer segredo").status_code, 200
+            )
+            self.assertEqual(
+                anonimo.get("/api/v1/metrics/", HTTP_AUTHORIZATION="Bearer outro").status_code, 401
+            )
+
+    def test_n_mais_um_vai_para_o_log(self):
+        for i in range(3):
+            Produto.objects.create(nome=f"P{i}", descricao="", sku=f"SKU-{i}", id_usuario=self.usuario)
+        with mock.patch.object(
+            ProdutoSerializer, "get_estoque_atual", lambda self, obj: obj.calcular_estoque()
+        ), override_settings(SAEP_METRICAS={"MAX_SEMELHANTES": 2}):
+            with self.assertLogs("app.metricas", "WARNING") as logs:
+                self.client.get("/api/v1/produtos/")
+        self.assertIn("SQL semelhante executado 3 vezes", logs.output[0])
+
+    def test_sql_repetido_poucas_vezes_nao_vai_para_o_log(self):
+        coletor = metricas.ColetorSQL()
+        for _ in range(3):
+            coletor(lambda *args: None, "SELECT 1 WHERE id = %s", (1,), False, {})
+        self.assertIsNone(coletor.repetidas(10))
+        self.assertEqual(coletor.repetidas(2), ("SELECT 1 WHERE id = %s", 3, True))
+        coletor(lambda *args: None, "SELECT 1 WHERE id = %s", (2,), False, {})
+        self.assertEqual(coletor.repetidas(2), ("SELECT 1 WHERE id = %s", 4, False))
+
+
+class PainelAsyncTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.outro = Estoque.objects.create(setor="Loja", descricao="Loja 1")
+        self.produtos = [
+            self.criar_produto(f"SKU-{i}", f"Produto {i}", estoque_minimo=10) for i in range(3)
+        ]
+        self.token = f"Bearer {AccessToken.for_user(self.usuario)}"
+        inicio = timezone.make_aware(datetime(2025, 1, 1))
+        for dia, (produto, estoque, quantidade) in enumerate(
+            [(0, self.estoque, 8), (0, self.outro, 5), (1, self.estoque, 3), (2, self.estoque, 9)]
+        ):
+            MovimentacaoEstoque.objects.create(
+                id_produto=self.produtos[produto], id_estoque=estoque,
+                quantidade=quantidade, movimentedAt=inicio + timedelta(days=dia),
+            )
+
+    async def get(self, url, **params):
+        return await self.async_client.get(url, params, headers={"authorization": self.token})
+
+    async def test_estoque_do_produto(self):
+        resposta = await self.get(f"/api/v1/painel/produtos/{self.produtos[0].pk}/estoque/")
+        self.assertEqual(resposta.status_code, 200)
+        dados = resposta.json()
+        self.assertEqual(dados["estoque_atual"], 13)
+        self.assertFalse(dados["estoque_abaixo_minimo"])
+        self.assertEqual(
+            dados["saldos"],
+            [
+                {"id_estoque": self.estoque.pk, "quantidade": 8},
+                {"id_estoque": self.outro.pk, "quantidade": 5},
+            ],
+        )
+        self.assertIn("db;dur=", resposta["Server-Timing"])
+        resposta = await self.get("/api/v1/painel/produtos/999999/estoque/")
+        self.assertEqual(resposta.status_code, 404)
+
+    async def test_abaixo_minimo_paginado_por_cursor(self):
+        resposta = await self.get("/api/v1/painel/produtos/abaixo-minimo/", page_size=1)
+        dados = resposta.json()
+        self.assertEqual([p["sku"] for p in dados["results"]], ["SKU-1"])
+        resposta = await self.async_client.get(dados["next"], headers={"authorization": self.token})
+        dados = resposta.json()
+        self.assertEqual([p["sku"] for p in dados["results"]], ["SKU-2"])
+        self.assertIsNone(dados["next"])
+        resposta = await self.get("/api/v1/painel/produtos/abaixo-minimo/", estoque=self.outro.pk)
+        self.assertEqual([p["estoque_atual"] for p in resposta.json()["results"]], [5, 0, 0])
+
+    async def test_feed_de_movimentacoes(self):
+        resposta = await self.get("/api/v1/painel/movimentacoes/", page_size=3)
+        dados = resposta.json()
+        self.assertEqual([m["quantidade"] for m in dados["results"]], [9, 3, 5])
+        resposta = await self.async_client.get(dados["next"], headers={"authorization": self.token})
+        self.assertEqual([m["quantidade"] for m in resposta.json()["results"]], [8])
+        resposta = await self.get("/api/v1/painel/movimentacoes/", produto=self.produtos[0].pk)
+        self.assertEqual([m["quantidade"] for m in resposta.json()["results"]], [5, 8])
+
+    async def test_erros(self):
+        resposta = await self.async_client.get("/api/v1/painel/movimentacoes/")
+        self.assertEqual(resposta.status_code, 401)
+        resposta = await self.get("/api/v1/painel/movimentacoes/", estoque="x")
+        self.assertEqual(resposta.status_code, 400)
+        resposta = await self.get("/api/v1/painel/movimentacoes/", cursor="nada")
+        self.assertEqual(resposta.status_code, 400)
+
+    async def test_cursor_forjado_devolve_400(self):
+        def cursor(valores):
+            return urlsafe_b64encode(json.dumps(valores).encode()).decode()
+
+        for url, valores in (
+            ("/api/v1/painel/movimentacoes/", ["2025-01-01T00:00:00Z", "x"]),
+            ("/api/v1/painel/movimentacoes/", ["2025-13-01T00:00:00Z", 1]),
+            ("/api/v1/painel/movimentacoes/", [None, 1]),
+            ("/api/v1/painel/produtos/abaixo-minimo/", [{"a": 1}, "x"]),
+            ("/api/v1/painel/produtos/abaixo-minimo/", ["Produto 1", True]),
+        ):
+            resposta = await self.get(url, cursor=cursor(valores))
+            self.assertEqual(resposta.status_code, 400, (url, valores))
+            self.assertEqual(resposta.json(), {"cursor": ["Cursor inválido."]})
+        resposta = await self.async_client.post(
+            "/api/v1/painel/movimentacoes/", headers={"authorization": self.token}
+        )
+        self.assertEqual(resposta.status_code, 405)
+
+
+class StreamMovimentacoesTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto(estoque_minimo=10)
+        self.movimentacoes = [self.movimentar(quantidade) for quantidade in (4, 3, 2)]
+
+    def movimentar(self, quantidade):
+        with self.captureOnCommitCallbacks(execute=True):
+            return MovimentacaoEstoque.objects.create(
+                id_produto=self.produto, id_estoque=self.estoque, quantidade=quantidade
+            )
+
+    def evento(self, texto):
+        linhas = dict(linha.split(": ", 1) for linha in texto.strip().splitlines())
+        return linhas["event"], int(linhas["id"]), json.loads(linhas["data"])
+
+    async def test_retoma_com_last_event_id(self):
+        async with aclosing(eventos.fluxo(self.movimentacoes[0].pk)) as fluxo:
+            self.assertEqual(await anext(fluxo), "retry: 3000\n\n")
+            tipo, pk, dados = self.evento(await anext(fluxo))
+            self.assertEqual((tipo, pk), ("movimentacao", self.movimentacoes[1].pk))
+            self.assertEqual(dados["quantidade"], 3)
+            self.assertEqual(dados["estoque_atual"], 9)
+            self.assertTrue(dados["estoque_abaixo_minimo"])
+            _, pk, _ = self.evento(await anext(fluxo))
+            self.assertEqual(pk, self.movimentacoes[2].pk)
+
+    async def test_publica_movimentacao_nova_com_saldo(self):
+        async with aclosing(eventos.fluxo()) as fluxo:
+            await anext(fluxo)
+            self.assertTrue(eventos.broker().ativo())
+            nova = await sync_to_async(self.movimentar)(5)
+            _, pk, dados = self.evento(await anext(fluxo))
+            self.assertEqual(pk, nova.pk)
+            self.assertEqual(dados["estoque_atual"], 14)
+            self.assertFalse(dados["estoque_abaixo_minimo"])
+        self.assertFalse(eventos.broker().ativo())
+
+    async def test_reset_quando_perdeu_eventos_demais(self):
+        with override_settings(SAEP_EVENTOS={"MAX_REPLAY": 1}):
+            async with aclosing(eventos.fluxo(0)) as fluxo:
+                await anext(fluxo)
+                self.assertTrue((await anext(fluxo)).startswith("event: reset"))
+
+    async def test_broker_banco(self):
+        with override_settings(SAEP_EVENTOS={"BROKER": "app.eventos.BrokerBanco", "INTERVALO": 0.01}):
+            async with aclosing(eventos.fluxo()) as fluxo:
+                await anext(fluxo)
+                nova = await sync_to_async(MovimentacaoEstoque.objects.create)(
+                    id_produto=self.produto, id_estoque=self.estoque, quantidade=1
+                )
+                _, pk, _ = self.evento(await anext(fluxo))
+                self.assertEqual(pk, nova.pk)
+
+    async def test_endpoint_aceita_token_de_stream_na_url(self):
+        resposta = await self.async_client.get("/api/v1/movimentacoes/stream/")
+        self.assertEqual(resposta.status_code, 401)
+        acesso = AccessToken.for_user(self.usuario)
+        resposta = await self.async_client.get(f"/api/v1/movimentacoes/stream/?token={acesso}")
+        self.assertEqual(resposta.status_code, 401)
+        resposta = await self.async_client.post(
+            "/api/v1/movimentacoes/stream/token/", headers={"authorization": f"Bearer {acesso}"}
+        )
+        self.assertEqual(resposta.status_code, 200)
+        token = resposta.json()["token"]
+        resposta = await self.async_client.get(f"/api/v1/movimentacoes/stream/?token={token}")
+        self.assertEqual(resposta.status_code, 200)
+        self.assertEqual(resposta["Content-Type"], "text/event-stream")
+        self.assertTrue(resposta.streaming)
+        await resposta.streaming_content.aclose()
+        # e não serve como access token no resto da API
+        resposta = await self.async_client.get(
+            "/api/v1/produtos/", headers={"authorization": f"Bearer {token}"}
+        )
+        self.assertEqual(resposta.status_code, 401)
+
+    def test_fora_do_asgi_devolve_501(self):
+        token = TokenStream.for_user(self.usuario)
+        resposta = self.client.get(f"/api/v1/movimentacoes/stream/?token={token}")
+        self.assertEqual(resposta.status_code, 501)
+        self.assertEqual(resposta.json()["detail"], StreamIndisponivel.default_detail)
+
+
+class RelatorioMovimentacoesTests(ApiTestCase):
+    def setUp(self):
+        super().setUp()
+        self.loja = Estoque.objects.create(setor="Loja", descricao="Loja 1")
+        self.cliente = Cliente.objects.create(nome="C", email="c@example.com", telefone="1")
+        self.produtos = [self.criar_produto(f"SKU-{i}", f"P{i}") for i in range(2)]
+
+    def movimentar(self, dia, quantidade, tipo="E", produto=0, estoque=None, cliente=None):
+        return MovimentacaoEstoque.objects.create(
+            id_produto=self.produtos[produto],
+            id_estoque=estoque or self.estoque,
+            id_cliente=cliente,
+            quantidade=quantidade,
+            tipo=tipo,
+            movimentedAt=timezone.make_aware(datetime(2025, 1, dia, 12)),
+        )
+
+    def relatorio(self, **params):
+        resposta = self.client.get("/api/v1/relatorios/movimentacoes/", params)
+        self.assertEqual(resposta.status_code, 200, resposta.content)
+        return resposta.json()
+
+    def test_resumos_acompanham_gravacoes(self):
+        primeira = self.movimentar(6, 10)
+        self.movimentar(6, 5)
+        saida = self.movimentar(7, 3, "S", cliente=self.cliente)
+        MovimentacaoEstoque.objects.criar_em_lote([
+            MovimentacaoEstoque(
+                id_produto=self.produtos[1], id_estoque=self.loja, quantidade=2,
+                movimentedAt=timezone.make_aware(datetime(2025, 1, 6, 9)),
+            )
+            for _ in range(3)
+        ])
+        primeira.quantidade = 4
+        primeira.movimentedAt = timezone.make_aware(datetime(2025, 1, 20, 12))
+        primeira.save()
+        saida.delete()
+        self.assertEqual(
+            sorted(MovimentacaoDiaria.objects.values_list(
+                "id_produto", "id_estoque", "dia", "tipo", "quantidade", "ocorrencias"
+            )),
+            sorted([
+                (self.produtos[0].pk, self.estoque.pk, date(2025, 1, 6), "E", 5, 1),
+                (self.produtos[0].pk, self.estoque.pk, date(2025, 1, 20), "E", 4, 1),
+                (self.produtos[1].pk, self.loja.pk, date(2025, 1, 6), "E", 6, 3),
+            ]),
+        )
+        self.assertFalse(MovimentacaoClienteDiaria.objects.exists())
+        call_command("recalcular_resumos", "--verificar", stdout=StringIO())
+
+    def test_lote_retroativo_grava_resumos_num_insert(self):
+        movimentacoes = lambda: [
+            MovimentacaoEstoque(
+                id_produto=self.produtos[i % 2], id_estoque=self.estoque, id_cliente=self.cliente,
+                quantidade=2, movimentedAt=timezone.make_aware(datetime(2025, 1, 1 + i % 20, 12)),
+            )
+            for i in range(40)
+        ]
+        with CaptureQueriesContext(connection) as consultas:
+            MovimentacaoEstoque.objects.criar_em_lote(movimentacoes())
+        resumos = [c["sql"] for c in consultas.captured_queries if "diaria" in c["sql"]]
+        self.assertEqual(len(resumos), 2)
+        with mock.patch.object(connection, "vendor", "outro"):
+            MovimentacaoEstoque.objects.criar_em_lote(movimentacoes())
+        self.assertEqual(MovimentacaoDiaria.objects.count(), 20)
+        self.assertEqual(
+            set(MovimentacaoDiaria.objects.values_list("quantidade", "ocorrencias")), {(8, 4)}
+        )
+        call_command("recalcular_resumos", "--verificar", stdout=StringIO())
+
+    def test_recalcular_resumos_reconstroi_e_confere(self):
+        self.movimentar(6, 10, cliente=self.cliente)
+        MovimentacaoDiaria.objects.update(quantidade=999)
+        MovimentacaoClienteDiaria.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command("recalcular_resumos", "--verificar", stdout=StringIO())
+        call_command("recalcular_resumos", stdout=StringIO())
+        self.assertEqual(MovimentacaoDiaria.objects.get().quantidade, 10)
+        self.assertEqual(MovimentacaoClienteDiaria.objects.get().quantidade, 10)
+
+    def test_periodos_derivados_dos_dias(self):
+        # 6 e 7/jan na mesma semana, 13/jan na seguinte, 3/fev em outro mês
+        self.movimentar(6, 10)
+        self.movimentar(7, 4, "S")
+        self.movimentar(13, 2, produto=1, estoque=self.loja)
+        MovimentacaoEstoque.objects.create(
+            id_produto=self.produtos[0], id_estoque=self.estoque, quantidade=1,
+            movimentedAt=timezone.make_aware(datetime(2025, 2, 3, 12)),
+        )
+        with CaptureQueriesContext(connection) as consultas:
+            semanas = self.relatorio(periodo="semana")["results"]
+        self.assertNotIn(MovimentacaoEstoque._meta.db_table, " ".join(c["sql"] for c in consultas))
+        self.assertEqual(semanas, [
+            {"periodo": "2025-01-06", "entradas": 10, "saidas": 4, "movimentacoes": 2},
+            {"periodo": "2025-01-13", "entradas": 2, "saidas": 0, "movimentacoes": 1},
+            {"periodo": "2025-02-03", "entradas": 1, "saidas": 0, "movimentacoes": 1},
+        ])
+        meses = self.relatorio(agrupar="estoque", to="2025-01-31")["results"]
+        self.assertEqual(meses, [
+            {"id_estoque": self.estoque.pk, "periodo": "2025-01-01", "entradas": 10, "saidas": 4, "movimentacoes": 2},
+            {"id_estoque": self.loja.pk, "periodo": "2025-01-01", "entradas": 2, "saidas": 0, "movimentacoes": 1},
+        ])
+        dias = self.relatorio(periodo="dia", produto=self.produtos[0].pk, **{"from": "2025-01-07"})
+        self.assertEqual([linha["periodo"] for linha in dias["results"]], ["2025-01-07", "2025-02-03"])
+
+    def test_agrupamento_por_cliente(self):
+        self.movimentar(6, 10)
+        self.movimentar(6, 10, produto=1)
+        self.movimentar(7, 4, "S", cliente=self.cliente)
+        self.movimentar(8, 1, "S", produto=1, cliente=self.cliente)
+        self.assertEqual(self.relatorio(agrupar="cliente")["results"], [
+            {"id_cliente": self.cliente.pk, "periodo": "2025-01-01", "entradas": 0, "saidas": 5, "movimentacoes": 2},
+        ])
+        resposta = self.client.get(
+            "/api/v1/relatorios/movimentacoes/", {"agrupar": "cliente", "produto": self.produtos[0].pk}
+        )
+        self.assertEqual(resposta.status_code, 400)
+
+    def test_paginacao_por_cursor(self):
+        for dia in range(1, 8):
+            self.movimentar(dia, dia)
+            self.movimentar(dia, dia, produto=1)
+        vistos = []
+        params = {"periodo": "dia", "agrupar": "produto", "page_size": 4}
+        url = "/api/v1/relatorios/movimentacoes/"
+        while url:
+            dados = self.client.get(url, params).json()
+            vistos += [(linha["id_produto"], linha["periodo"]) for linha in dados["results"]]
+            url, params = dados["next"], None
+        esperado = [(p.pk, f"2025-01-0{dia}") for p in self.produtos for dia in range(1, 8)]
+        self.assertEqual(vistos, esperado)
+
+    def test_parametros_invalidos(self):
+        url = "/api/v1/relatorios/movimentacoes/"
+        for params in (
+            {"periodo": "ano"},
+            {"agrupar": "categoria"},
+            {"from": "ontem"},
+            {"produto": "x"},
+            {"cursor": "lixo"},
+        ):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
+
+
+class PrevisaoReposicaoTests(ApiTestCase):
+    hoje = date(2025, 3, 1)
+
+    def setUp(self):
+        super().setUp()
+        self.produtos = [self.criar_produto(f"SKU-{i}", f"P{i}") for i in range(3)]
+
+    def saida(self, produto, dias_atras, quantidade):
+        # direto no resumo: a previsão só lê as saídas diárias
+        MovimentacaoDiaria.objects.create(
+            id_produto=produto, id_estoque=self.estoque, tipo="S",
+            dia=self.hoje - timedelta(days=dias_atras), quantidade=quantidade, ocorrencias=1,
+        )
+
+    def calcular(self, *args):
+        call_command("calcular_reposicao", "--dias", "10", "--hoje", self.hoje.isoformat(), *args, stdout=StringIO())
+        return {p.id_produto_id: p for p in PrevisaoReposicao.objects.all()}
+
+    def test_demanda_constante(self):
+        for dias_atras in range(1, 11):
+            self.saida(self.produtos[0], dias_atras, 2)
+        # fora da janela: hoje (incompleto) e 11 dias atrás
+        self.saida(self.produtos[0], 0, 50)
+        self.saida(self.produtos[0], 11, 50)
+        for metodo in previsao.METODOS:
+            resultado = self.calcular("--metodo", metodo)
+            self.assertAlmostEqual(resultado[self.produtos[0].pk].demanda_diaria, 2)
+            self.assertAlmostEqual(resultado[self.produtos[0].pk].desvio_diario, 0)
+            self.assertEqual(resultado[self.produtos[0].pk].ponto_reposicao, 14)
+            self.assertEqual(resultado[self.produtos[1].pk].ponto_reposicao, 0)
+
+    def test_suavizacao_pesa_os_dias_recentes(self):
+        self.saida(self.produtos[0], 1, 10)
+        self.saida(self.produtos[1], 10, 10)
+        resultado = self.calcular("--metodo", "exponencial", "--lote", "2")
+        self.assertGreater(
+            resultado[self.produtos[0].pk].demanda_diaria, resultado[self.produtos[1].pk].demanda_diaria
+        )
+        media = self.calcular("--metodo", "media")
+        self.assertAlmostEqual(media[self.produtos[0].pk].demanda_diaria, 1)
+        self.assertAlmostEqual(media[self.produtos[1].pk].demanda_diaria, 1)
+        self.assertEqual(len(media), 3)
+
+    @skipUnless(previsao.np is not None, "NumPy não instalado")
+    def test_numpy_e_python_concordam(self):
+        config = previsao.configuracao(DIAS=10)
+        inicio, fim = previsao.janela(self.hoje, config)
+        for i, produto in enumerate(self.produtos):
+            for dias_atras in range(1, 11, i + 1):
+                self.saida(produto, dias_atras, dias_atras * (i + 1))
+        ids = [p.pk for p in self.produtos]
+        colunas = previsao.saidas(ids, inicio, fim)
+        vetorial = previsao._calcular_numpy(ids, *colunas, inicio, config)
+        python = previsao._calcular_python(ids, *colunas, inicio, config)
+        for a, b in zip(vetorial[:2], python[:2]):
+            for x, y in zip(a, b):
+                self.assertAlmostEqual(x, y)
+        self.assertEqual(vetorial[2], python[2])
+
+    def test_endpoint_e_atualizacao_do_minimo(self):
+        MovimentacaoEstoque.objects.create(id_produto=self.produtos[0], id_estoque=self.estoque, quantidade=10)
+        MovimentacaoEstoque.objects.create(id_produto=self.produtos[1], id_estoque=self.estoque, quantidade=100)
+        for dias_atras in range(1, 11):
+            self.saida(self.produtos[0], dias_atras, 4)
+            self.saida(self.produtos[1], dias_atras, 4)
+        self.calcular("--atualizar-minimo")
+        self.produtos[0].refresh_from_db()
+        self.assertEqual(self.produtos[0].estoque_minimo, 28)
+        self.assertTrue(self.produtos[0].abaixo_minimo)
+
+        dados = self.client.get("/api/v1/produtos/reposicao/").json()["results"]
+        self.assertEqual(
+            [(p["sku"], p["ponto_reposicao"], p["dias_cobertura"]) for p in dados],
+            [("SKU-0", 28, 2.5), ("SKU-1", 28, 25.0), ("SKU-2", 0, None)],
+        )
+        abaixo = self.client.get("/api/v1/produtos/reposicao/", {"abaixo": "true"}).json()["results"]
+        self.assertEqual([p["sku"] for p in abaixo], ["SKU-0"])
+
+    def test_parametros_invalidos(self):
+        with self.assertRaises(CommandError):
+            call_command("calcular_reposicao", "--alfa", "2", stdout=StringIO())
+
+
+class RoteamentoReplicaTests(TestCase):
+    def setUp(self):
+        roteamento.limpar_estado()
+        self.roteador = roteamento.RoteadorReplica()
+
+    def tearDown(self):
+        roteamento.limpar_estado()
+
+    @mock.patch.object(roteamento, "replica_configurada", return_value=False)
+    def test_sem_replica_nao_opina(self, _):
+        roteamento.ler_da_replica()
+        self.assertIsNone(self.roteador.db_for_read(Produto))
+        self.assertIsNone(self.roteador.db_for_write(Produto))
+
+    @mock.patch.object(roteamento, "replica_configurada", return_value=True)
+    def test_leitura_na_replica_ate_a_primeira_escrita(self, _):
+        self.assertEqual(self.roteador.db_for_read(Produto), "default")
+        roteamento.ler_da_replica()
+        self.assertEqual(self.roteador.db_for_read(Produto), "replica")
+        self.assertEqual(self.roteador.db_for_write(MovimentacaoEstoque), "default")
+        self.assertEqual(self.roteador.db_for_read(Produto), "default")
+        roteamento.ler_da_replica()
+        self.assertEqual(self.roteador.db_for_read(Produto), "default")
+        # nova requisição, estado novo
+        roteamento.limpar_estado()
+        roteamento.ler_da_replica()
+        self.assertEqual(self.roteador.db_for_read(Produto), "replica")
+
+    @mock.patch.object(roteamento, "replica_configurada", return_value=True)
+    def test_acoes_da_viewset(self, _):
+        usuario = criar_usuario()
+        bancos = {}
+
+        def registrar(viewset):
+            original = viewset.finalize_response
+
+            def finalize_response(self, request, response, *args, **kwargs):
+                bancos[self.action] = (roteamento.banco_de_leitura(), self.tempo_cache())
+                return original(self, request, response, *args, **kwargs)
+            return mock.patch.object(viewset, "finalize_response", finalize_response)
+
+        cliente = cliente_api(usuario)
+        produto = Produto.objects.create(nome="P", descricao="", sku="SKU-1", id_usuario=usuario)
+        with registrar(ProdutoViewSet), mock.patch.object(
+            roteamento.RoteadorReplica, "db_for_read", return_value=None
+        ):
+            cliente.get("/api/v1/produtos/")
+            cliente.get(f"/api/v1/produtos/{produto.pk}/")
+            cliente.get("/api/v1/produtos/abaixo-minimo/")
+            cliente.patch(f"/api/v1/produtos/{produto.pk}/", {"estoque_minimo": 1}, format="json")
+        self.assertEqual(
+            bancos,
+            {
+                "list": ("replica", 5),
+                "retrieve": ("default", DEFAULT_TIMEOUT),
+                "abaixo_minimo": ("replica", 5),
+                "partial_update": ("default", DEFAULT_TIMEOUT),
+            },
+        )
+
+
+@skipUnless(
+    "replica" in settings.DATABASES
+    and not settings.DATABASES["replica"].get("TEST", {}).get("MIRROR"),
+    "sem réplica separada: rode com SAEP_REPLICA_NAME e SAEP_REPLICA_MIRROR=false",
+)
+class ReplicaSQLiteTests(DadosBase, TransactionTestCase):
+    """Com dois bancos de verdade (ex.: dois arquivos SQLite, ver app/roteamento.py)."""
+
+    # "__all__" e não {"default", "replica"}: sem réplica a classe é pulada, mas o
+    # runner ainda confere os bancos declarados
+    databases = "__all__"
+
+    def setUp(self):
+        super().setUp()
+        self.produto = self.criar_produto(nome="P")
+
+    def test_listagem_le_da_replica_e_escrita_do_primario(self):
+        self.assertEqual(self.client.get("/api/v1/produtos/").json()["results"], [])
+        self.assertEqual(self.client.get(f"/api/v1/produtos/{self.produto.pk}/").status_code, 200)
+
+        resposta = self.client.post(
+            "/api/v1/movimentacoes/",
+            {"id_produto": self.produto.pk, "id_estoque": self.estoque.pk, "quantidade": 5, "tipo": "E"},
+            format="json",
+        )
+        self.assertEqual(resposta.status_code, 201, resposta.content)
+        self.assertEqual(resposta.json()["estoque_atual"], 5)
+        self.assertFalse(MovimentacaoEstoque.objects.using("replica").exists())
+        self.assertEqual(self.client.get("/api/v1/movimentacoes/").json()["results"], [])
+
+
+class AmbienteTests(TestCase):
+    def test_padroes_e_conversoes(self):
+        with mock.patch.dict(os.environ, {
+            "SAEP_T_VAZIO": " ",
+            "SAEP_T_BOOL": "Sim",
+            "SAEP_T_INT": "30",
+            "SAEP_T_NONE": "none",
+            "SAEP_T_MODO": "pool",
+            "SAEP_T_LISTA": "api.exemplo.com, ,localhost",
+        }):
+            self.assertEqual(ambiente.texto("SAEP_T_VAZIO", "padrão"), "padrão")
+            self.assertIs(ambiente.booleano("SAEP_T_BOOL", False), True)
+            self.assertIs(ambiente.booleano("SAEP_T_AUSENTE", True), True)
+            self.assertEqual(ambiente.inteiro("SAEP_T_INT", 60), 30)
+            self.assertIsNone(ambiente.inteiro("SAEP_T_NONE", 60, nulo="none"))
+            self.assertEqual(ambiente.opcao("SAEP_T_MODO", "persistente", ("persistente", "pool")), "pool")
+            self.assertEqual(ambiente.lista("SAEP_T_LISTA"), ["api.exemplo.com", "localhost"])
+            self.assertEqual(ambiente.lista("SAEP_T_AUSENTE"), [])
+
+    def test_valor_invalido_nao_cai_no_padrao(self):
+        with mock.patch.dict(os.environ, {"SAEP_T_BOOL": "talvez", "SAEP_T_INT": "x"}):
+            with self.assertRaises(ImproperlyConfigured):
+                ambiente.booleano("SAEP_T_BOOL", False)
+            with self.assertRaises(ImproperlyConfigured):
+                ambiente.inteiro("SAEP_T_INT", 60)
+            with self.assertRaises(ImproperlyConfigured):
+                ambiente.opcao("SAEP_T_INT", "a", ("a", "b"))
+
+
+class PerfilProducaoTests(TestCase):
+    """As settings são lidas uma vez por processo: cada perfil sobe num processo novo."""
+
+    SCRIPT = """
+import json
+from saep import wsgi
+from django.conf import settings
+print(json.dumps({
+    "debug": settings.DEBUG,
+    "apps": settings.INSTALLED_APPS,
+    "middleware": settings.MIDDLEWARE,
+    "loaders": settings.TEMPLATES[0]["OPTIONS"].get("loaders"),
+    "replica": settings.DATABASES.get("replica"),
+    "numeros": wsgi.numeros,
+}))
+"""
+
+    def subir(self, **variaveis):
+        ambiente_filho = {
+            chave: valor for chave, valor in os.environ.items()
+            if chave not in ("SAEP_PERFIL", "SAEP_DEBUG", "SAEP_ADMIN", "SAEP_SECRET_KEY", "SAEP_ALLOWED_HOSTS")
+            and not chave.startswith("SAEP_REPLICA_")
+        }
+        ambiente_filho.update(variaveis)
+        return subprocess.run(
+            [sys.executable, "-c", self.SCRIPT],
+            cwd=settings.BASE_DIR,
+            env=ambiente_filho,
+            capture_output=True,
+            text=True,
+        )
+
+    def test_producao_desliga_debug_e_enxuga_a_api(self):
+        resultado = self.subir(
+            SAEP_PERFIL="producao", SAEP_SECRET_KEY="chave", SAEP_ALLOWED_HOSTS="api.exemplo.com"
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        dados = json.loads(resultado.stdout)
+        self.assertFalse(dados["debug"])
+        self.assertNotIn("django.contrib.admin", dados["apps"])
+        self.assertNotIn("django.contrib.sessions.middleware.SessionMiddleware", dados["middleware"])
+        self.assertNotIn("django.contrib.messages.middleware.MessageMiddleware", dados["middleware"])
+        self.assertEqual(dados["middleware"][0], "app.metricas.MetricasMiddleware")
+        self.assertEqual(dados["loaders"][0][0], "django.template.loaders.cached.Loader")
+        self.assertGreater(dados["numeros"]["pronto_ms"], 0)
+        self.assertIn("wsgi pronto (perfil producao", resultado.stderr)
+
+    def test_producao_com_admin_mantem_sessoes(self):
+        resultado = self.subir(
+            SAEP_PERFIL="producao", SAEP_SECRET_KEY="chave", SAEP_ALLOWED_HOSTS="admin.exemplo.com",
+            SAEP_ADMIN="true",
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        dados = json.loads(resultado.stdout)
+        self.assertIn("django.contrib.admin", dados["apps"])
+        self.assertIn("django.contrib.sessions.middleware.SessionMiddleware", dados["middleware"])
+
+    def test_replica_por_nome_sem_espelho(self):
+        resultado = self.subir(
+            DJANGO_SETTINGS_MODULE="saep.settings",
+            SAEP_DB_ENGINE="django.db.backends.sqlite3",
+            SAEP_REPLICA_NAME="replica.sqlite3",
+            SAEP_REPLICA_MIRROR="false",
+        )
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        replica = json.loads(resultado.stdout)["replica"]
+        self.assertEqual(replica["NAME"], "replica.sqlite3")
+        self.assertIsNone(replica["TEST"]["MIRROR"])
+        resultado = self.subir(
+            DJANGO_SETTINGS_MODULE="saep.settings",
+            SAEP_DB_ENGINE="django.db.backends.sqlite3",
+            SAEP_REPLICA_HOST="replica.interna",
+        )
+        replica = json.loads(resultado.stdout)["replica"]
+        self.assertEqual(replica["HOST"], "replica.interna")
+        self.assertEqual(replica["TEST"]["MIRROR"], "default")
+
+    def test_producao_exige_chave_e_hosts(self):
+        resultado = self.subir(SAEP_PERFIL="producao")
+        self.assertNotEqual(resultado.returncode, 0)
+        self.assertIn("SAEP_SECRET_KEY", resultado.stderr)
+
+    def test_desenvolvimento_continua_igual(self):
+        resultado = self.subir()
+        self.assertEqual(resultado.returncode, 0, resultado.stderr)
+        dados = json.loads(resultado.stdout)
+        self.assertTrue(dados["debug"])
+        self.assertIn("django.contrib.admin", dados["apps"])
+        self.assertIn("django.middleware.csrf.CsrfViewMiddleware", dados["middleware"])
+
+
+class JSONRapidoTests(TestCase):
+    DADOS = {
+        "movimentedAt": datetime(2025, 3, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        "dia": date(2025, 3, 1),
+        "preco": Decimal("10.50"),
+        "id": UUID("12345678-1234-5678-1234-567812345678"),
+        "mensagem": gettext_lazy("This field is required."),
+        "texto": "ação\u2028fim",
+        "lista": [1, 2.5, None, True],
+        3: "chave inteira",
+    }
+
+    def test_mesma_saida_do_renderer_padrao(self):
+        esperado = JSONRenderer().render(self.DADOS)
+        self.assertEqual(JSONRapidoRenderer().render(self.DADOS), esperado)
+        self.assertIn(b'"2025-03-01T12:30:15.123456Z"', esperado)
+        with mock.patch("app.renderers.orjson", None):
+            self.assertEqual(JSONRapidoRenderer().render(self.DADOS), esperado)
+
+    def test_indent_usa_a_stdlib(self):
+        contexto = {"indent": 4}
+        self.assertEqual(
+            JSONRapidoRenderer().render({"a": [1]}, renderer_context=contexto),
+            JSONRenderer().render({"a": [1]}, renderer_context=contexto),
+        )
+
+    def test_parser(self):
+        parser = JSONRapidoParser()
+        corpo = '{"nome": "ação", "quantidade": 3}'.encode()
+        self.assertEqual(parser.parse(BytesIO(corpo), "application/json", {}), {"nome": "ação", "quantidade": 3})
+        latin1 = '{"nome": "ação"}'.encode("latin-1")
+        self.assertEqual(
+            parser.parse(BytesIO(latin1), "application/json", {"encoding": "latin-1"}),
+            JSONParser().parse(BytesIO(latin1), "application/json", {"encoding": "latin-1"}),
+        )
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"nome": '), "application/json", {})
+        with self.assertRaises(ParseError):
+            parser.parse(BytesIO(b'{"valor": NaN}'), "application/json", {})
+
+    def test_api_responde_e_rejeita_json_invalido(self):
+        client = cliente_api(criar_usuario("json@example.com", "Json"))
+        resposta = client.post("/api/v1/categorias/", data=b"{", content_type="application/json")
+        self.assertEqual(resposta.status_code, 400)
+        self.assertIn("JSON parse error", resposta.json()["detail"])
+        resposta = client.post("/api/v1/categorias/", {"nome": "Ferramentas", "descricao": "Ação"}, format="json")
+        self.assertEqual(resposta.status_code, 201, resposta.content)
+        self.assertEqual(resposta.json()["nome"], "Ferramentas")
@@ -2,6 +2,7 @@ from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     LoginView,
+    MetricasView,
     UsuarioCreateView,
     ClienteViewSet,
     LogViewSet,
@@ -9,6 +10,12 @@ from .views import (
     EstoqueViewSet,
     CategoriaViewSet,
     MovimentacaoEstoqueViewSet,
+    RelatorioMovimentacoesViewSet,
+    painel_abaixo_minimo,
+    painel_estoque_produto,
+    painel_movimentacoes,
+    stream_movimentacoes,
+    StreamTokenView,
 )
 
 router = DefaultRouter()
@@ -18,9 +25,25 @@ router.register(r"produtos", ProdutoViewSet, basename="produtos")
 router.register(r"estoques", EstoqueViewSet, basename="estoques")
 router.register(r"categorias", CategoriaViewSet, basename="categorias")
 router.register(r"movimentacoes", MovimentacaoEstoqueViewSet, basename="movimentacoes")
+router.register(
+    r"relatorios/movimentacoes",
+    RelatorioMovimentacoesViewSet,
+    basename="relatorios-movimentacoes",
+)
 
 urlpatterns = [
     path("login/", LoginView.as_view(), name="login_view"),
     path("create/user/", UsuarioCreateView.as_view(), name="create-user"),
+    path("metrics/", MetricasView.as_view(), name="metrics"),
+    path(
+        "painel/produtos/<int:pk>/estoque/",
+        painel_estoque_produto,
+        name="painel-estoque-produto",
+    ),
+    path("painel/produtos/abaixo-minimo/", painel_abaixo_minimo, name="painel-abaixo-minimo"),
+    path("painel/movimentacoes/", painel_movimentacoes, name="painel-movimentacoes"),
+    # antes do router, senão "stream" vira o pk de movimentacoes-detail
+    path("movimentacoes/stream/", stream_movimentacoes, name="movimentacoes-stream"),
+    path("movimentacoes/stream/token/", StreamTokenView.as_view(), name="movimentacoes-stream-token"),
     path("", include(router.urls)),
 ]
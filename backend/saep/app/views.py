@@ -1,11 +1,45 @@
+import csv
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, time, timedelta
+from functools import partial, wraps
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import get_user_model
-from django.db.models import Q
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek, Upper
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.views.decorators.http import require_GET
 from rest_framework import generics, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import (
+    APIException,
+    NotAuthenticated,
+    NotFound,
+    ParseError,
+    ValidationError,
+)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
-from .permissions import IsActiveUser
+from . import busca, eventos, metricas
+from .authentication import (
+    JWTAuthenticationEmCache,
+    TokenMetricasAuthentication,
+    TokenStream,
+    TokenStreamAuthentication,
+)
+from .cache_api import CacheRespostaMixin
+from .pagination import CursorPaginacao
+from .permissions import IsActiveUser, PodeVerMetricas
+from .roteamento import LeituraNaReplicaMixin, banco_de_leitura
+from .renderers import CSVRenderer, NDJSONRenderer
 from .models import (
     Cliente,
     Log,
@@ -13,6 +47,11 @@ from .models import (
     Estoque,
     Categoria,
     MovimentacaoEstoque,
+    MovimentacaoDiaria,
+    MovimentacaoClienteDiaria,
+    EstoqueInsuficiente,
+    SaldoEstoque,
+    SaldoSnapshot,
 )
 from .serializers import (
     UsuarioCreateSerializer,
@@ -23,11 +62,35 @@ from .serializers import (
     EstoqueSerializer,
     CategoriaSerializer,
     MovimentacaoEstoqueSerializer,
+    MovimentacaoEstoqueItemSerializer,
+    ReposicaoSerializer,
+    SaldoEstoqueSerializer,
 )
 
 Usuario = get_user_model()
 
 
+class Eco:
+    """Buffer falso para o csv.writer devolver a linha em vez de gravá-la."""
+
+    def write(self, value):
+        return value
+
+
+def parse_data_parametro(valor, fim=False):
+    """Aceita data ou data/hora ISO; uma data em ``fim`` cobre o dia inteiro."""
+    dia = parse_date(valor)
+    if dia is not None:
+        momento = datetime.combine(dia + timedelta(days=1) if fim else dia, time.min)
+    else:
+        momento = parse_datetime(valor)
+        if momento is None:
+            raise ValueError(valor)
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
 class UsuarioCreateView(generics.CreateAPIView):
     queryset = Usuario.objects.all()
     permission_classes = [AllowAny]
@@ -39,7 +102,31 @@ class LoginView(TokenObtainPairView):
     permission_classes = [AllowAny]
 
 
-class ClienteViewSet(viewsets.ModelViewSet):
+class MetricasView(APIView):
+    """Histogramas por rota do MetricasMiddleware, no formato texto do Prometheus."""
+
+    authentication_classes = [TokenMetricasAuthentication, *APIView.authentication_classes]
+    permission_classes = [PodeVerMetricas]
+
+    def get(self, request):
+        return HttpResponse(
+            metricas.registro.exportar(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
+class StreamTokenView(APIView):
+    """Emite o ``TokenStream`` para abrir ``movimentacoes/stream/?token=``; o
+    cliente pede outro a cada (re)conexão."""
+
+    permission_classes = [IsActiveUser]
+
+    def post(self, request):
+        token = TokenStream.for_user(request.user)
+        return Response({"token": str(token), "expira_em": int(TokenStream.lifetime.total_seconds())})
+
+
+class ClienteViewSet(LeituraNaReplicaMixin, CacheRespostaMixin, viewsets.ModelViewSet):
+    recurso_cache = "clientes"
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
     permission_classes = [IsActiveUser]
@@ -51,28 +138,108 @@ class ClienteViewSet(viewsets.ModelViewSet):
         )
 
 
-class ProdutoViewSet(viewsets.ModelViewSet):
+class ProdutoViewSet(LeituraNaReplicaMixin, CacheRespostaMixin, viewsets.ModelViewSet):
+    recurso_cache = "produtos"
+    acoes_em_cache = ("list", "retrieve", "abaixo_minimo", "saldos", "reposicao")
+    acoes_na_replica = ("list", "abaixo_minimo", "reposicao")
     serializer_class = ProdutoSerializer
     permission_classes = [IsAuthenticated]
+    ordering = ("nome", "id")
 
     def get_queryset(self):
-        qs = Produto.objects.all()
-        search = self.request.query_params.get("search")
-        if search:
-            qs = qs.filter(
-                Q(nome__icontains=search)
-                | Q(descricao__icontains=search)
-                | Q(sku__icontains=search)
-            )
-        return qs.order_by("nome")
+        if self.momento_consulta() is None:
+            qs = Produto.objects.com_estoque()
+        else:
+            qs = Produto.objects.all()
+        params = self.request.query_params
+        if params.get("sku"):
+            qs = qs.filter(sku=params["sku"])
+        if params.get("sku_prefixo"):
+            prefixo = params["sku_prefixo"].upper()
+            # faixa no índice de UPPER(sku): sem diferenciar maiúsculas, como antes
+            qs = qs.alias(sku_maiusculo=Upper("sku")).filter(sku_maiusculo__gte=prefixo)
+            if prefixo[-1] != chr(0x10FFFF):
+                qs = qs.filter(sku_maiusculo__lt=prefixo[:-1] + chr(ord(prefixo[-1]) + 1))
+        if self.action == "list" and params.get("search"):
+            qs = busca.buscar(qs, params["search"])
+        return qs.order_by(*self.get_ordering())
+
+    def get_ordering(self):
+        if self.action == "list" and self.request.query_params.get("search"):
+            return ("-relevancia", "id")
+        return self.ordering
 
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context["request"] = self.request
         return context
 
+    def momento_consulta(self):
+        """``?as_of=`` (data ou data/hora ISO) pede o estoque naquele momento."""
+        if not hasattr(self, "_momento_consulta"):
+            as_of = self.request.query_params.get("as_of")
+            self._momento_consulta = None
+            if as_of:
+                try:
+                    self._momento_consulta = parse_data_parametro(as_of, fim=True)
+                except ValueError:
+                    raise ValidationError({"as_of": ["Informe uma data ISO."]})
+        return self._momento_consulta
+
+    def anotar_estoque_em(self, produtos):
+        momento = self.momento_consulta()
+        if momento is not None and produtos:
+            estoques = SaldoSnapshot.estoques_em([p.pk for p in produtos], momento)
+            for produto in produtos:
+                produto.estoque_atual = estoques[produto.pk]
+        return produtos
 
-class EstoqueViewSet(viewsets.ModelViewSet):
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            self.anotar_estoque_em(page)
+        return page
+
+    def get_object(self):
+        return self.anotar_estoque_em([super().get_object()])[0]
+
+    @action(detail=False, methods=["get"], url_path="abaixo-minimo")
+    def abaixo_minimo(self, request):
+        estoque = request.query_params.get("estoque")
+        if estoque is not None and not estoque.isdigit():
+            return Response(
+                {"detail": "Parâmetro 'estoque' deve ser um id numérico."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        qs = Produto.objects.abaixo_minimo(estoque).order_by(*self.ordering)
+        page = self.paginate_queryset(qs)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def reposicao(self, request):
+        """Ponto de reposição sugerido (comando calcular_reposicao) e dias de
+        cobertura do estoque atual; ``?abaixo=true`` só os que já devem ser repostos."""
+        qs = Produto.objects.com_estoque().select_related("previsao").filter(previsao__isnull=False)
+        if request.query_params.get("abaixo", "").lower() in ("1", "true"):
+            qs = qs.filter(estoque_atual__lt=F("previsao__ponto_reposicao"))
+        page = self.paginate_queryset(qs.order_by(*self.ordering))
+        return self.get_paginated_response(ReposicaoSerializer(page, many=True).data)
+
+    @action(detail=True, methods=["get"])
+    def saldos(self, request, pk=None):
+        # uma linha por estoque: poucos registros, sem paginação
+        saldos = (
+            SaldoEstoque.objects.filter(id_produto=self.get_object())
+            .select_related("id_produto", "id_estoque")
+            .order_by("id_estoque")
+        )
+        return Response(SaldoEstoqueSerializer(saldos, many=True).data)
+
+
+class EstoqueViewSet(LeituraNaReplicaMixin, CacheRespostaMixin, viewsets.ModelViewSet):
+    recurso_cache = "estoques"
+    acoes_em_cache = ("list", "retrieve", "saldos")
     queryset = Estoque.objects.all()
     serializer_class = EstoqueSerializer
     permission_classes = [IsActiveUser]
@@ -83,8 +250,18 @@ class EstoqueViewSet(viewsets.ModelViewSet):
             status=status.HTTP_405_METHOD_NOT_ALLOWED,
         )
 
+    @action(detail=True, methods=["get"])
+    def saldos(self, request, pk=None):
+        saldos = SaldoEstoque.objects.filter(id_estoque=self.get_object()).select_related(
+            "id_produto", "id_estoque"
+        )
+        page = self.paginate_queryset(saldos)
+        serializer = SaldoEstoqueSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(LeituraNaReplicaMixin, CacheRespostaMixin, viewsets.ModelViewSet):
+    recurso_cache = "categorias"
     queryset = Categoria.objects.all()
     serializer_class = CategoriaSerializer
     permission_classes = [IsActiveUser]
@@ -96,17 +273,46 @@ class CategoriaViewSet(viewsets.ModelViewSet):
         )
 
 
-class MovimentacaoEstoqueViewSet(viewsets.ModelViewSet):
-    queryset = MovimentacaoEstoque.objects.all()
+class MovimentacaoEstoqueViewSet(LeituraNaReplicaMixin, CacheRespostaMixin, viewsets.ModelViewSet):
+    recurso_cache = "movimentacoes"
+    acoes_na_replica = ("list", "export")
     serializer_class = MovimentacaoEstoqueSerializer
     permission_classes = [IsActiveUser]
+    ordering = ("movimentedAt", "id")
+    limite_lote = 10000
+    campos_exportacao = (
+        "id",
+        "movimentedAt",
+        "tipo",
+        "quantidade",
+        "id_produto",
+        "id_produto__sku",
+        "id_estoque",
+        "id_cliente",
+    )
+    lote_exportacao = 2000
+
+    def get_queryset(self):
+        qs = MovimentacaoEstoque.objects.all()
+        expandir = MovimentacaoEstoqueSerializer.expansoes(self.request)
+        relacionados = [
+            MovimentacaoEstoqueSerializer.campos_expansiveis[nome] for nome in expandir
+        ]
+        if relacionados:
+            qs = qs.select_related(*relacionados)
+        if "produto" in expandir:
+            qs = qs.com_estoque_produto()
+        return qs
 
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        movimentacao = serializer.save()
-        produto = movimentacao.id_produto
-        estoque_atual = produto.calcular_estoque()
+        with transaction.atomic():
+            movimentacao = serializer.save()
+            produto = movimentacao.id_produto
+            estoque_atual = produto.calcular_estoque()
+        # o produto aninhado na resposta reaproveita o saldo em vez de recalcular
+        produto.estoque_atual = estoque_atual
         data = self.get_serializer(movimentacao).data
         data["estoque_atual"] = estoque_atual
         data["estoque_minimo"] = produto.estoque_minimo
@@ -114,6 +320,124 @@ class MovimentacaoEstoqueViewSet(viewsets.ModelViewSet):
         headers = self.get_success_headers(serializer.data)
         return Response(data, status=status.HTTP_201_CREATED, headers=headers)
 
+    @action(detail=False, methods=["post"], url_path="bulk")
+    def bulk(self, request):
+        serializer = MovimentacaoEstoqueItemSerializer(
+            data=request.data, many=True, allow_empty=False, max_length=self.limite_lote
+        )
+        serializer.is_valid(raise_exception=True)
+        item_serializer = serializer.child
+        movimentacoes = [item_serializer.to_model(item) for item in serializer.validated_data]
+        try:
+            with transaction.atomic():
+                criadas = MovimentacaoEstoque.objects.criar_em_lote(movimentacoes)
+                produtos = {
+                    p["id"]: p
+                    for p in Produto.objects.filter(
+                        pk__in={m.id_produto_id for m in criadas}
+                    ).com_estoque().values("id", "estoque_minimo", "estoque_atual")
+                }
+        except EstoqueInsuficiente as exc:
+            return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+        resultados = []
+        for movimentacao in criadas:
+            produto = produtos[movimentacao.id_produto_id]
+            resultados.append({
+                "id": movimentacao.pk,
+                "id_produto": movimentacao.id_produto_id,
+                "id_estoque": movimentacao.id_estoque_id,
+                "estoque_atual": produto["estoque_atual"],
+                "estoque_minimo": produto["estoque_minimo"],
+                "estoque_abaixo_minimo": produto["estoque_atual"] < produto["estoque_minimo"],
+            })
+        return Response(
+            {"criadas": len(criadas), "resultados": resultados},
+            status=status.HTTP_201_CREATED,
+        )
+
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path="export",
+        renderer_classes=[CSVRenderer, NDJSONRenderer],
+    )
+    def export(self, request):
+        qs = MovimentacaoEstoque.objects.order_by()
+        try:
+            if request.query_params.get("from"):
+                qs = qs.filter(movimentedAt__gte=parse_data_parametro(request.query_params["from"]))
+            if request.query_params.get("to"):
+                qs = qs.filter(
+                    movimentedAt__lt=parse_data_parametro(request.query_params["to"], fim=True)
+                )
+        except ValueError:
+            return Response(
+                {"detail": "Parâmetros 'from' e 'to' devem ser datas ISO."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        formato = request.accepted_renderer.format
+        campos = self.campos_exportacao
+        if formato == "csv":
+            escritor = csv.writer(Eco())
+            cabecalho = escritor.writerow(campos)
+
+            def formatar(linha):
+                return escritor.writerow(
+                    [v.isoformat() if isinstance(v, datetime) else v for v in linha]
+                )
+        else:
+            cabecalho = ""
+
+            def formatar(linha):
+                return json.dumps(dict(zip(campos, linha)), cls=DjangoJSONEncoder) + "\n"
+
+        # fixa o banco agora: o corpo é lido depois que a view retorna
+        qs = qs.using(banco_de_leitura())
+        if isinstance(request._request, ASGIRequest):
+            # sob ASGI um gerador síncrono seria lido inteiro para a memória
+            # (sync_to_async(list)) antes do primeiro byte; o async lê lote a lote
+            async def linhas():
+                yield cabecalho
+                ultimo = None
+                while True:
+                    lote = await sync_to_async(self.ler_lote)(qs, ultimo)
+                    for linha in lote:
+                        yield formatar(linha)
+                    if len(lote) < self.lote_exportacao:
+                        return
+                    ultimo = lote[-1]
+        else:
+            def linhas():
+                yield cabecalho
+                for linha in self.exportar_linhas(qs):
+                    yield formatar(linha)
+
+        response = StreamingHttpResponse(linhas(), content_type=request.accepted_media_type)
+        response["Content-Disposition"] = f'attachment; filename="movimentacoes.{formato}"'
+        return response
+
+    def exportar_linhas(self, qs):
+        ultimo = None
+        while True:
+            lote = self.ler_lote(qs, ultimo)
+            yield from lote
+            if len(lote) < self.lote_exportacao:
+                return
+            ultimo = lote[-1]
+
+    def ler_lote(self, qs, ultimo):
+        # paginação por chave em (movimentedAt, id): memória constante mesmo no MySQL,
+        # cujo driver carregaria o resultado inteiro de um único cursor
+        if ultimo is not None:
+            qs = qs.filter(
+                Q(movimentedAt__gt=ultimo[1]) | Q(movimentedAt=ultimo[1], id__gt=ultimo[0])
+            )
+        return list(
+            qs.order_by("movimentedAt", "id")
+            .values_list(*self.campos_exportacao)[: self.lote_exportacao]
+        )
+
     def destroy(self, request, *args, **kwargs):
         return Response(
             {"detail": "Operação de delete não permitida."},
@@ -121,7 +445,94 @@ class MovimentacaoEstoqueViewSet(viewsets.ModelViewSet):
         )
 
 
-class LogViewSet(viewsets.ModelViewSet):
+class RelatorioMovimentacoesViewSet(
+    LeituraNaReplicaMixin, CacheRespostaMixin, viewsets.GenericViewSet
+):
+    """Entradas e saídas por período, somadas dos resumos diários.
+
+    ``periodo``: dia, semana (começa na segunda) ou mes; ``agrupar``: produto,
+    estoque, os dois separados por vírgula, ou cliente; ``from`` e ``to`` são
+    datas inclusivas. Semanas e meses saem das linhas diárias, então o primeiro
+    e o último período podem ser parciais.
+    """
+
+    recurso_cache = "movimentacoes"
+    permission_classes = [IsActiveUser]
+    periodos = {"dia": None, "semana": TruncWeek, "mes": TruncMonth}
+    agrupamentos = {"produto": "id_produto", "estoque": "id_estoque", "cliente": "id_cliente"}
+
+    def list(self, request):
+        params = request.query_params
+        periodo = params.get("periodo", "mes")
+        if periodo not in self.periodos:
+            raise ValidationError({"periodo": [f"Use {', '.join(self.periodos)}."]})
+        nomes = {nome for nome in params.get("agrupar", "").split(",") if nome}
+        if nomes - self.agrupamentos.keys():
+            raise ValidationError({"agrupar": [f"Use {', '.join(self.agrupamentos)}."]})
+        campos = [campo for nome, campo in self.agrupamentos.items() if nome in nomes]
+        filtros = {
+            campo: valor
+            for nome, campo in self.agrupamentos.items()
+            if (valor := parametro_id(request, nome))
+        }
+        por_cliente = "id_cliente" in {*campos, *filtros}
+        if por_cliente and {*campos, *filtros} != {"id_cliente"}:
+            raise ValidationError({"agrupar": ["Cliente não combina com produto ou estoque."]})
+
+        resumo = MovimentacaoClienteDiaria if por_cliente else MovimentacaoDiaria
+        qs = resumo.objects.filter(**filtros)
+        try:
+            if params.get("from"):
+                qs = qs.filter(dia__gte=self.data(params["from"]))
+            if params.get("to"):
+                qs = qs.filter(dia__lte=self.data(params["to"]))
+        except ValueError:
+            raise ParseError("Parâmetros 'from' e 'to' devem ser datas ISO.")
+        truncar = self.periodos[periodo]
+        qs = qs.annotate(periodo=truncar("dia") if truncar else F("dia"))
+
+        ordem = [*campos, "periodo"]
+        cursor = ler_cursor(request, (*(int for _ in campos), str))
+        if cursor:
+            *valores, dia = cursor
+            try:
+                dia = self.data(dia)
+            except ValueError:
+                dia = None
+            if dia is None:
+                raise ValidationError({"cursor": ["Cursor inválido."]})
+            depois = Q()
+            iguais = {}
+            for campo, valor in zip(ordem, [*valores, dia]):
+                depois |= Q(**iguais, **{f"{campo}__gt": valor})
+                iguais[campo] = valor
+            qs = qs.filter(depois)
+
+        qs = (
+            qs.order_by(*ordem)
+            .values(*ordem)
+            .annotate(
+                entradas=Sum("quantidade", filter=Q(tipo="E"), default=0),
+                saidas=Sum("quantidade", filter=Q(tipo="S"), default=0),
+                movimentacoes=Sum("ocorrencias"),
+            )
+        )
+        tamanho = tamanho_pagina(request)
+        itens = list(qs[: tamanho + 1])
+        return Response(
+            dados_pagina(request, itens, tamanho, lambda linha: [linha[campo] for campo in ordem])
+        )
+
+    @staticmethod
+    def data(valor):
+        dia = parse_date(valor)
+        if dia is None:
+            raise ValueError(valor)
+        return dia
+
+
+class LogViewSet(LeituraNaReplicaMixin, CacheRespostaMixin, viewsets.ModelViewSet):
+    recurso_cache = "logs"
     queryset = Log.objects.all()
     serializer_class = LogSerializer
     permission_classes = [IsActiveUser]
@@ -147,3 +558,182 @@ class LogViewSet(viewsets.ModelViewSet):
         log.save()
         serializer = self.get_serializer(log)
         return Response(serializer.data, status=status.HTTP_200_OK)
+
+
+# ---------- Leituras async (painel) ----------
+# Views async sem DRF para as leituras mais quentes: sob ASGI não ocupam uma
+# thread do pool durante a requisição; só as consultas passam pela thread do
+# ORM (o ORM async do Django ainda roda o driver via sync_to_async).
+
+
+class StreamIndisponivel(APIException):
+    status_code = status.HTTP_501_NOT_IMPLEMENTED
+    default_detail = "O stream de eventos só funciona com o servidor ASGI (saep.asgi)."
+    default_code = "stream_indisponivel"
+
+
+def leitura_assincrona(view=None, *, token_na_url=False):
+    """Autenticação JWT e erros no formato das ViewSets para uma view async.
+
+    ``token_na_url`` aceita no ``?token=`` um ``TokenStream`` quando não há
+    Authorization: o EventSource do navegador não envia cabeçalhos.
+    """
+    if view is None:
+        return partial(leitura_assincrona, token_na_url=token_na_url)
+
+    @require_GET
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if token_na_url and "HTTP_AUTHORIZATION" not in request.META:
+            autenticacao = TokenStreamAuthentication()
+        else:
+            autenticacao = JWTAuthenticationEmCache()
+        try:
+            autenticado = await autenticacao.aauthenticate(request)
+            if autenticado is None:
+                raise NotAuthenticated()
+            request.user = autenticado[0]
+            return await view(request, *args, **kwargs)
+        except APIException as exc:
+            corpo = exc.detail if isinstance(exc.detail, dict) else {"detail": exc.detail}
+            resposta = JsonResponse(corpo, status=exc.status_code)
+            if exc.status_code == status.HTTP_401_UNAUTHORIZED:
+                resposta["WWW-Authenticate"] = 'Bearer realm="api"'
+            return resposta
+
+    return wrapper
+
+
+def tamanho_pagina(request):
+    try:
+        tamanho = int(request.GET.get("page_size", CursorPaginacao.page_size))
+    except ValueError:
+        tamanho = CursorPaginacao.page_size
+    return max(1, min(tamanho, CursorPaginacao.max_page_size))
+
+
+def ler_cursor(request, tipos):
+    """Cursor opaco com os valores da ordenação do último item da página; ``tipos``
+    é o tipo esperado de cada valor (o cursor vem do cliente e vai para o filtro)."""
+    texto = request.GET.get("cursor")
+    if not texto:
+        return None
+    try:
+        valores = json.loads(urlsafe_b64decode(texto.encode()))
+    except ValueError:
+        valores = None
+    if (
+        not isinstance(valores, list)
+        or len(valores) != len(tipos)
+        or not all(
+            isinstance(valor, tipo) and not isinstance(valor, bool)
+            for valor, tipo in zip(valores, tipos)
+        )
+    ):
+        raise ValidationError({"cursor": ["Cursor inválido."]})
+    return valores
+
+
+def dados_pagina(request, itens, tamanho, chave):
+    proxima = None
+    if len(itens) > tamanho:
+        itens = itens[:tamanho]
+        params = request.GET.copy()
+        params["cursor"] = urlsafe_b64encode(
+            json.dumps(chave(itens[-1]), cls=DjangoJSONEncoder).encode()
+        ).decode()
+        proxima = request.build_absolute_uri(f"{request.path}?{params.urlencode()}")
+    return {"next": proxima, "results": itens}
+
+
+def pagina(request, itens, tamanho, chave):
+    return JsonResponse(dados_pagina(request, itens, tamanho, chave))
+
+
+def parametro_id(request, nome):
+    valor = request.GET.get(nome)
+    if valor is not None and not valor.isdigit():
+        raise ParseError(f"Parâmetro '{nome}' deve ser um id numérico.")
+    return valor
+
+
+@leitura_assincrona
+async def painel_estoque_produto(request, pk):
+    try:
+        produto = await Produto.objects.values("id", "nome", "sku", "estoque_minimo").aget(pk=pk)
+    except Produto.DoesNotExist:
+        raise NotFound()
+    saldos = [
+        saldo
+        async for saldo in SaldoEstoque.objects.filter(id_produto=pk)
+        .order_by("id_estoque")
+        .values("id_estoque", "quantidade")
+    ]
+    produto["estoque_atual"] = sum(saldo["quantidade"] for saldo in saldos)
+    produto["estoque_abaixo_minimo"] = produto["estoque_atual"] < produto["estoque_minimo"]
+    produto["saldos"] = saldos
+    return JsonResponse(produto)
+
+
+@leitura_assincrona
+async def painel_abaixo_minimo(request):
+    qs = (
+        Produto.objects.abaixo_minimo(parametro_id(request, "estoque"))
+        .order_by("nome", "id")
+        .values("id", "nome", "sku", "estoque_minimo", "estoque_atual")
+    )
+    cursor = ler_cursor(request, (str, int))
+    if cursor:
+        nome, pk = cursor
+        qs = qs.filter(Q(nome__gt=nome) | Q(nome=nome, id__gt=pk))
+    tamanho = tamanho_pagina(request)
+    itens = [produto async for produto in qs[: tamanho + 1]]
+    return pagina(request, itens, tamanho, lambda produto: [produto["nome"], produto["id"]])
+
+
+@leitura_assincrona
+async def painel_movimentacoes(request):
+    """Feed das movimentações, das mais recentes para as mais antigas."""
+    qs = MovimentacaoEstoque.objects.order_by("-movimentedAt", "-id").values(
+        *MovimentacaoEstoqueViewSet.campos_exportacao
+    )
+    produto = parametro_id(request, "produto")
+    if produto:
+        qs = qs.filter(id_produto=produto)
+    estoque = parametro_id(request, "estoque")
+    if estoque:
+        qs = qs.filter(id_estoque=estoque)
+    cursor = ler_cursor(request, (str, int))
+    if cursor:
+        try:
+            momento = parse_datetime(cursor[0])
+        except ValueError:
+            momento = None
+        if momento is None:
+            raise ValidationError({"cursor": ["Cursor inválido."]})
+        qs = qs.filter(Q(movimentedAt__lt=momento) | Q(movimentedAt=momento, id__lt=cursor[1]))
+    tamanho = tamanho_pagina(request)
+    itens = [movimentacao async for movimentacao in qs[: tamanho + 1]]
+    # isoformat() com microssegundos: o DjangoJSONEncoder corta em milissegundos
+    return pagina(
+        request,
+        itens,
+        tamanho,
+        lambda movimentacao: [movimentacao["movimentedAt"].isoformat(), movimentacao["id"]],
+    )
+
+
+@leitura_assincrona(token_na_url=True)
+async def stream_movimentacoes(request):
+    """Server-Sent Events com cada movimentação nova e o estoque resultante."""
+    if not isinstance(request, ASGIRequest):
+        # num worker WSGI a conexão prenderia o worker inteiro enquanto durasse
+        raise StreamIndisponivel()
+    desde = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+    if desde is not None and not desde.isdigit():
+        raise ParseError("Last-Event-ID deve ser o id numérico do último evento.")
+    return StreamingHttpResponse(
+        eventos.fluxo(int(desde) if desde else None),
+        content_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
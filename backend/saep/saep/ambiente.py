@@ -0,0 +1,60 @@
+"""Leitura das variáveis de ambiente usadas em settings.py.
+
+Variável ausente ou vazia usa o padrão; valor inválido interrompe a
+inicialização com ImproperlyConfigured em vez de cair num padrão silencioso.
+"""
+import os
+
+from django.core.exceptions import ImproperlyConfigured
+
+VERDADEIROS = {"1", "true", "sim", "yes", "on"}
+FALSOS = {"0", "false", "nao", "não", "no", "off"}
+
+
+def _valor(nome):
+    valor = os.environ.get(nome, "").strip()
+    return valor or None
+
+
+def texto(nome, padrao=None):
+    valor = _valor(nome)
+    return padrao if valor is None else valor
+
+
+def booleano(nome, padrao):
+    valor = _valor(nome)
+    if valor is None:
+        return padrao
+    if valor.lower() in VERDADEIROS:
+        return True
+    if valor.lower() in FALSOS:
+        return False
+    raise ImproperlyConfigured(f"{nome} deve ser verdadeiro ou falso, não {valor!r}.")
+
+
+def inteiro(nome, padrao, nulo=None):
+    """Inteiro; ``nulo`` é o texto aceito para None (ex.: CONN_MAX_AGE sem limite)."""
+    valor = _valor(nome)
+    if valor is None:
+        return padrao
+    if nulo is not None and valor.lower() == nulo:
+        return None
+    try:
+        return int(valor)
+    except ValueError:
+        raise ImproperlyConfigured(f"{nome} deve ser um número inteiro, não {valor!r}.")
+
+
+def lista(nome, padrao=()):
+    """Itens separados por vírgula (ex.: SAEP_ALLOWED_HOSTS)."""
+    valor = _valor(nome)
+    if valor is None:
+        return list(padrao)
+    return [item.strip() for item in valor.split(",") if item.strip()]
+
+
+def opcao(nome, padrao, opcoes):
+    valor = texto(nome, padrao)
+    if valor not in opcoes:
+        raise ImproperlyConfigured(f"{nome} deve ser um de {', '.join(opcoes)}, não {valor!r}.")
+    return valor
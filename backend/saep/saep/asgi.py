@@ -8,9 +8,20 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 """
 
 import os
+import time
 
-from django.core.asgi import get_asgi_application
+inicio = time.perf_counter()
+
+import django
+from django.core.handlers.asgi import ASGIHandler
+
+from saep import inicializacao
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saep.settings')
 
-application = get_asgi_application()
+# o mesmo que get_asgi_application(), com o setup medido à parte
+django.setup(set_prefix=False)
+setup = time.perf_counter()
+application = ASGIHandler()
+
+numeros = inicializacao.medir('asgi', inicio, setup)
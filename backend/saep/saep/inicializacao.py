@@ -0,0 +1,57 @@
+"""Tempo de subida e memória de cada worker, registrados no log quando ele fica pronto.
+
+``importacao`` é o tempo desde o início do módulo de entrada (wsgi.py/asgi.py)
+até o ``django.setup()`` terminar: imports do Django, das apps e dos models.
+``pronto`` inclui a montagem do handler e da cadeia de middlewares.
+"""
+import logging
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+
+def rss_mb():
+    """Memória residente atual do processo em MB (o pico, fora do Linux)."""
+    try:
+        with open("/proc/self/statm") as arquivo:
+            paginas = int(arquivo.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # KB no Linux, bytes no macOS
+    return pico / 2**20 if sys.platform == "darwin" else pico / 2**10
+
+
+def medir(tipo, inicio, setup):
+    """Registra a subida de um worker ``tipo`` (wsgi/asgi) e devolve os números."""
+    from django.conf import settings
+
+    fim = time.perf_counter()
+    numeros = {
+        "importacao_ms": (setup - inicio) * 1000,
+        "pronto_ms": (fim - inicio) * 1000,
+        "rss_mb": rss_mb(),
+        "modulos": len(sys.modules),
+    }
+    memoria = "-" if numeros["rss_mb"] is None else f"{numeros['rss_mb']:.1f}MB"
+    logger.info(
+        "%s pronto (perfil %s, pid %s): importacao %.0fms, total %.0fms, RSS %s, %d modulos",
+        tipo,
+        settings.SAEP_PERFIL,
+        os.getpid(),
+        numeros["importacao_ms"],
+        numeros["pronto_ms"],
+        memoria,
+        numeros["modulos"],
+    )
+    return numeros
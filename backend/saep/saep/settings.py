@@ -12,6 +12,10 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from datetime import timedelta
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
+from . import ambiente
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -19,13 +23,31 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.2/howto/deployment/checklist/
 
+# Perfil (SAEP_PERFIL): "desenvolvimento" (padrão) ou "producao". Produção
+# desliga o DEBUG (com ele ligado o Django guarda cada SQL em connection.queries
+# e o worker só cresce), exige SAEP_SECRET_KEY e SAEP_ALLOWED_HOSTS, fixa o cache
+# de templates e deixa fora do processo da API o admin, sessões e mensagens, que
+# clientes JWT não usam. SAEP_ADMIN=true traz o admin de volta (num processo
+# separado, por exemplo). O tempo de subida e a memória de cada worker saem no
+# log "saep.inicializacao" (saep/wsgi.py, saep/asgi.py).
+SAEP_PERFIL = ambiente.opcao('SAEP_PERFIL', 'desenvolvimento', ('desenvolvimento', 'producao'))
+PRODUCAO = SAEP_PERFIL == 'producao'
+
 # SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-218mr@a@(u*!q(*x+g3vnt@8wg6&(sbedwz(yp$b@co^mxs846'
+SECRET_KEY = ambiente.texto(
+    'SAEP_SECRET_KEY',
+    None if PRODUCAO else 'django-insecure-218mr@a@(u*!q(*x+g3vnt@8wg6&(sbedwz(yp$b@co^mxs846',
+)
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = ambiente.booleano('SAEP_DEBUG', not PRODUCAO)
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = ambiente.lista('SAEP_ALLOWED_HOSTS')
+
+if PRODUCAO and (not SECRET_KEY or not ALLOWED_HOSTS):
+    raise ImproperlyConfigured('O perfil producao exige SAEP_SECRET_KEY e SAEP_ALLOWED_HOSTS.')
+
+SAEP_ADMIN = ambiente.booleano('SAEP_ADMIN', not PRODUCAO)
 
 
 # Application definition
@@ -54,6 +76,7 @@ CORS_ALLOWED_ORIGIN = [
 ]
 
 MIDDLEWARE = [
+    'app.metricas.MetricasMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -81,22 +104,119 @@ TEMPLATES = [
     },
 ]
 
+if not SAEP_ADMIN:
+    # a API autentica só por JWT (DRF põe o usuário em request.user) e as views
+    # do DRF já dispensam CSRF, que só protege login por cookie de sessão
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS
+        if app not in ('django.contrib.admin', 'django.contrib.sessions', 'django.contrib.messages')
+    ]
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE
+        if middleware not in (
+            'django.contrib.sessions.middleware.SessionMiddleware',
+            'django.middleware.csrf.CsrfViewMiddleware',
+            'django.contrib.auth.middleware.AuthenticationMiddleware',
+            'django.contrib.messages.middleware.MessageMiddleware',
+        )
+    ]
+    TEMPLATES[0]['OPTIONS']['context_processors'].remove(
+        'django.contrib.messages.context_processors.messages'
+    )
+
+if PRODUCAO:
+    # templates (API navegável do DRF, admin) compilados uma vez por processo
+    TEMPLATES[0]['APP_DIRS'] = False
+    TEMPLATES[0]['OPTIONS']['loaders'] = [
+        ('django.template.loaders.cached.Loader', [
+            'django.template.loaders.filesystem.Loader',
+            'django.template.loaders.app_directories.Loader',
+        ]),
+    ]
+
 WSGI_APPLICATION = 'saep.wsgi.application'
 
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Conexão configurada pelo ambiente (SAEP_DB_*); os padrões são os do banco de
+# desenvolvimento. Reuso de conexões (SAEP_DB_CONEXOES):
+#   persistente     a conexão da thread fica aberta entre requisições por
+#                   SAEP_DB_CONN_MAX_AGE segundos ("none" = sem limite) e é
+#                   conferida antes do reuso se SAEP_DB_HEALTH_CHECKS (WSGI)
+#   por_requisicao  uma conexão nova por requisição
+#   pool            ASGI, onde cada requisição roda numa thread nova e a conexão
+#                   persistente não seria reaproveitada. PostgreSQL usa o pool do
+#                   psycopg (SAEP_DB_POOL_MIN/MAX); no MySQL aponte SAEP_DB_HOST
+#                   para um pool externo (ProxySQL, MySQL Router)
+SAEP_DB_CONEXOES = ambiente.opcao(
+    'SAEP_DB_CONEXOES', 'persistente', ('persistente', 'por_requisicao', 'pool')
+)
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'saep_2',
-        'USER': 'root',
-        'PASSWORD': 'senai',
-        'HOST': 'localhost',
-        'PORT': '3306'
+        'ENGINE': ambiente.texto('SAEP_DB_ENGINE', 'django.db.backends.mysql'),
+        'NAME': ambiente.texto('SAEP_DB_NAME', 'saep_2'),
+        'USER': ambiente.texto('SAEP_DB_USER', 'root'),
+        'PASSWORD': ambiente.texto('SAEP_DB_PASSWORD', 'senai'),
+        'HOST': ambiente.texto('SAEP_DB_HOST', 'localhost'),
+        'PORT': ambiente.texto('SAEP_DB_PORT', '3306'),
+        'CONN_MAX_AGE': 0,
+        'CONN_HEALTH_CHECKS': False,
+        # SQLite testa em memória, onde várias conexões não enxergam o mesmo banco;
+        # com um arquivo aqui os testes com threads (SaidaConcorrenteTests) rodam
+        'TEST': {'NAME': ambiente.texto('SAEP_DB_TEST_NAME')},
+    }
+}
+if SAEP_DB_CONEXOES == 'persistente':
+    DATABASES['default']['CONN_MAX_AGE'] = ambiente.inteiro('SAEP_DB_CONN_MAX_AGE', 60, nulo='none')
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = ambiente.booleano('SAEP_DB_HEALTH_CHECKS', True)
+elif SAEP_DB_CONEXOES == 'pool' and 'postgresql' in DATABASES['default']['ENGINE']:
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': ambiente.inteiro('SAEP_DB_POOL_MIN', 2),
+            'max_size': ambiente.inteiro('SAEP_DB_POOL_MAX', 10),
+        },
+    }
+
+# Réplica de leitura opcional (app/roteamento.py): listagens, buscas, exportações
+# e relatórios leem dela; escritas e o resto das leituras ficam no primário.
+# SAEP_REPLICA_HOST aponta outro servidor com o mesmo banco; SAEP_REPLICA_NAME, outro
+# banco (ou arquivo: dois SQLite locais fazem primário e réplica).
+# Nos testes a réplica espelha o banco de teste do primário (SAEP_REPLICA_MIRROR,
+# padrão) e a suíte roda sem réplica, porque os TestCase só liberam o "default".
+# Com SAEP_REPLICA_MIRROR=false a réplica ganha um banco de teste próprio
+# (SAEP_REPLICA_TEST_NAME) e roda o teste de roteamento com dois bancos:
+#   SAEP_DB_ENGINE=django.db.backends.sqlite3 SAEP_DB_NAME=primario.sqlite3 \
+#   SAEP_REPLICA_NAME=replica.sqlite3 SAEP_REPLICA_MIRROR=false \
+#   python manage.py test app.tests.ReplicaSQLiteTests
+if ambiente.texto('SAEP_REPLICA_HOST') or ambiente.texto('SAEP_REPLICA_NAME'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'NAME': ambiente.texto('SAEP_REPLICA_NAME', DATABASES['default']['NAME']),
+        'HOST': ambiente.texto('SAEP_REPLICA_HOST', DATABASES['default']['HOST']),
+        'PORT': ambiente.texto('SAEP_REPLICA_PORT', DATABASES['default']['PORT']),
+        'TEST': (
+            {'MIRROR': 'default'}
+            if ambiente.booleano('SAEP_REPLICA_MIRROR', True)
+            else {'NAME': ambiente.texto('SAEP_REPLICA_TEST_NAME')}
+        ),
+    }
+
+DATABASE_ROUTERS = ['app.roteamento.RoteadorReplica']
+
+# Cache das respostas de leitura da API (app/cache_api.py). Em produção aponte
+# para um backend compartilhado entre os processos, ex.: Redis ou Memcached.
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'TIMEOUT': 300,
     }
 }
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -129,11 +249,23 @@ USE_TZ = True
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'app.authentication.JWTAuthenticationEmCache',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    'DEFAULT_PAGINATION_CLASS': 'app.pagination.CursorPaginacao',
+    'PAGE_SIZE': 50,
+    # orjson quando instalado, json da stdlib senão (app/renderers.py, app/parsers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'app.renderers.JSONRapidoRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'app.parsers.JSONRapidoParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 
@@ -161,3 +293,21 @@ SIMPLE_JWT = {
     "BLACKLIST_AFTER_ROTATION": True,
     "AUTH_HEADER_TYPES": ("Bearer",),
 }
+
+# Ajustes do app (SAEP_CACHE_USUARIO, SAEP_METRICAS, SAEP_EVENTOS, SAEP_PREVISAO,
+# SAEP_REPLICA): os padrões e o que cada chave faz estão em app/ajustes.py; declare
+# aqui só as chaves que mudam, ex.:
+#   SAEP_EVENTOS = {"BROKER": "app.eventos.BrokerBanco"}
+
+# Só o log de inicialização dos workers (saep/wsgi.py, saep/asgi.py); o resto
+# segue o padrão do Django
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "saep.inicializacao": {"handlers": ["console"], "level": "INFO", "propagate": False},
+    },
+}
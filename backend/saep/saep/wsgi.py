@@ -8,9 +8,20 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/wsgi/
 """
 
 import os
+import time
 
-from django.core.wsgi import get_wsgi_application
+inicio = time.perf_counter()
+
+import django
+from django.core.handlers.wsgi import WSGIHandler
+
+from saep import inicializacao
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'saep.settings')
 
-application = get_wsgi_application()
+# o mesmo que get_wsgi_application(), com o setup medido à parte
+django.setup(set_prefix=False)
+setup = time.perf_counter()
+application = WSGIHandler()
+
+numeros = inicializacao.medir('wsgi', inicio, setup)